@@ -0,0 +1,136 @@
+"""
+Tabla de alias entre idiomas para ampliar las búsquedas locales.
+
+La ontología poblada ya contiene las traducciones: cada ingrediente
+Ing_*_xx lleva su :nombre traducido y su :nombre en inglés (el mismo
+concepto que usa pantry_index.py), y las seis versiones de un postre
+apuntan al mismo recurso de DBpedia con rdfs:seeAlso. Al cargar se
+agrupan esos nombres por concepto y se indexan por su forma normalizada,
+así "apple" lleva a "manzana", "pomme", "mela"... sin traducir nada en
+la petición.
+
+Los nombres de ingredientes que son listas ("Flour, Eggs, Sugar" /
+"Harina, Huevos, Azúcar") se alinean además elemento a elemento cuando
+las dos listas tienen el mismo número de elementos.
+"""
+import re
+
+from rdflib import RDFS, Literal
+
+from pantry_index import ingredient_concept
+from text_utils import normalize_text
+
+# Palabras máximas de una forma buscada dentro del término
+MAX_ALIAS_WORDS = 4
+# Alias añadidos como mucho a una búsqueda
+MAX_EXPANSIONS = 8
+
+_LIST_SEPARATOR = re.compile(r"\s*[,;]\s*")
+
+
+def _clean(text):
+    """Nombre tal como se compara en la búsqueda: minúsculas, sin espacios ni punto final"""
+    return " ".join(str(text).lower().split()).rstrip(" .")
+
+
+def _list_items(text):
+    return [item for item in (_clean(part) for part in _LIST_SEPARATOR.split(str(text))) if item]
+
+
+class AliasIndex:
+    """Formas equivalentes de ingredientes y postres en todos los idiomas"""
+
+    def __init__(self, groups, by_form):
+        self._groups = groups        # grupo -> {idioma: [formas]}
+        self._by_form = by_form      # forma normalizada -> (grupos)
+
+    @classmethod
+    def from_store(cls, store, ns, languages):
+        groups = {}
+
+        def add(key, language, form):
+            if language in languages and form:
+                forms = groups.setdefault(key, {}).setdefault(language, [])
+                if form not in forms:
+                    forms.append(form)
+
+        # Ingredientes: todas las versiones de un concepto (mismo nombre en inglés)
+        for ingredient in {node for _, node in store.subject_objects(ns.tieneIngrediente)}:
+            concept = ingredient_concept(store, ns, ingredient)
+            labels = [v for v in store.objects(ingredient, ns.nombre) if isinstance(v, Literal)]
+            for value in labels:
+                add(f"ing:{concept}", value.language, _clean(value))
+
+            # Listas alineadas elemento a elemento con su versión inglesa
+            english = [_list_items(v) for v in labels if v.language == 'en']
+            if not english or len(english[0]) < 2:
+                continue
+            for value in labels:
+                items = _list_items(value)
+                if value.language == 'en' or len(items) != len(english[0]):
+                    continue
+                for item_en, item in zip(english[0], items):
+                    key = f"ing:{normalize_text(item_en)}"
+                    add(key, 'en', item_en)
+                    add(key, value.language, item)
+
+        # Postres: versiones de cada idioma que comparten recurso de DBpedia
+        for dessert, resource in store.subject_objects(RDFS.seeAlso):
+            for value in store.objects(dessert, ns.nombre):
+                if isinstance(value, Literal):
+                    add(f"see:{resource}", value.language, _clean(value))
+
+        by_form = {}
+        for key, forms in groups.items():
+            if len(forms) < 2:
+                continue        # Sin equivalentes en otro idioma
+            for language_forms in forms.values():
+                for form in language_forms:
+                    by_form.setdefault(normalize_text(form), set()).add(key)
+
+        groups = {key: forms for key, forms in groups.items() if len(forms) >= 2}
+        return cls(groups, {form: tuple(sorted(keys)) for form, keys in by_form.items()})
+
+    def aliases(self, text, language):
+        """Formas en 'language' equivalentes a un texto en cualquier idioma"""
+        forms = []
+        for key in self._by_form.get(normalize_text(text), ()):
+            for form in self._groups[key].get(language, ()):
+                if form not in forms:
+                    forms.append(form)
+        return forms
+
+    def expand(self, term, language, tokens=()):
+        """
+        Alias en 'language' de las formas conocidas dentro del término, como
+        (alias, cubre_todo): cubre_todo indica que el alias traduce el
+        término entero ("apple" → "manzana") y no solo una parte ("crème"
+        de "crème brûlée" → "crema"). Se buscan primero los tramos más
+        largos ("brown sugar" antes que "sugar") y se omiten los alias que
+        ya están escritos tal cual en la búsqueda (sí se añade "azúcar" a
+        quien escribe "azucar").
+        """
+        raw_words = term.lower().split()
+        words = normalize_text(term).split()
+        known = {token.lower() for token in tokens}
+        expansions = []
+        whole = []
+        covered = set()
+        for size in range(min(MAX_ALIAS_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                span = range(start, start + size)
+                if covered.intersection(span):
+                    continue
+                forms = self.aliases(" ".join(words[start:start + size]), language)
+                if not forms:
+                    continue
+                covered.update(span)
+                written = " ".join(raw_words[start:start + size])
+                for form in forms:
+                    if form != written and form not in known and form not in expansions:
+                        expansions.append(form)
+                        whole.append(size == len(words))
+        return list(zip(expansions, whole))[:MAX_EXPANSIONS]
+
+    def stats(self):
+        return {"groups": len(self._groups), "forms": len(self._by_form)}
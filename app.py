@@ -1,14 +1,48 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, has_request_context
+from flask import Response, make_response, stream_with_context
+from flask import g as request_state
 from rdflib import Graph, RDFS, RDF, Namespace, Literal
 from SPARQLWrapper import SPARQLWrapper, JSON
-from deep_translator import GoogleTranslator
+from SPARQLWrapper.SPARQLExceptions import QueryBadFormed
+import hashlib
+import itertools
+import json
 import re
 
+from suggest_index import SuggestIndex
+from fuzzy_index import TrigramIndex
+from vector_index import VectorIndex
+from triple_store import CompactTripleStore
+from ontology_state import OntologyManager, OntologySnapshot
+from result_cache import LRUCache
+from language_partitions import build_language_partitions, partition_sizes
+from facets import FacetIndex, FACETS
+from pantry_index import PantryIndex
+from related_index import RelatedIndex
+from alias_index import AliasIndex
+import http_cache
+from dbpedia_pages import BlockPager
+from string_heap import HeapText, externalize_long_literals
+from sqlite_store import is_store_file, open_graph, read_revision
+from circuit_breaker import BreakerRegistry, CircuitOpenError, OPEN, HALF_OPEN
+from dbpedia_mirror import DBpediaMirror, DEFAULT_MIRROR_FILE
+from query_log import QueryLog, top_queries
+from dbpedia_text import TextIndexCapabilities, label_filter
+import os
+
 app = Flask(__name__)
 
-# Cargar ontología local
-g = Graph()
-g.parse("reposteria_poblada_google.rdf", format="xml")
+# Huellas de estáticos (?v=), cache larga y compresión gzip/brotli
+static_fingerprints = http_cache.init_app(app)
+template_fingerprints = http_cache.FileFingerprints(os.path.join(app.root_path, app.template_folder))
+
+def ui_build_id():
+    """Versión de la interfaz: cambia si cambian la plantilla, el JS o el CSS"""
+    return (template_fingerprints.get("index.html")
+            + static_fingerprints.build_id("js/main.js", "css/styles.css", "Fondo2.jpg"))
+
+# Ontología local (se carga más abajo, junto con sus índices)
+ONTOLOGY_FILE = "reposteria_poblada_google.rdf"
 
 NS = Namespace("http://www.semanticweb.org/ontologies/reposteria#")
 
@@ -30,27 +64,156 @@ LANGUAGES = {
 # Idiomas habilitados para DBpedia
 DBPEDIA_ENABLED_LANGUAGES = ['es', 'en', 'fr']
 
-# Cache de traductores
-translators_cache = {}
+# ===============================================
+# ÍNDICES DERIVADOS Y RECARGA EN CALIENTE
+# ===============================================
+# Búsqueda tolerante a errores: solo se usa si la búsqueda exacta
+# devuelve menos de 'min_results' resultados
+FUZZY_CONFIG = {
+    'min_results': 1,
+    'min_similarity': 0.45,
+    'max_edit_distance': 2,
+    'short_word_length': 5,
+    'max_candidates': 50,
+    'latency_budget_ms': 5.0,   # Presupuesto de latencia añadida (ver bench_fuzzy.py)
+}
 
-def get_translator(source_lang, target_lang):
-    """Obtener traductor del cache o crear uno nuevo"""
-    key = f"{source_lang}_{target_lang}"
-    if key not in translators_cache:
-        translators_cache[key] = GoogleTranslator(source=source_lang, target=target_lang)
-    return translators_cache[key]
+# Alias entre idiomas (alias_index.py): puntúan menos que las palabras
+# escritas (nombre ×5, ingrediente ×3) y solo en nombres. Una instancia que
+# solo coincide por alias entra si el alias traduce el término entero
+ALIAS_CONFIG = {
+    'name_weight': 2,
+    'ingredient_weight': 1,
+}
 
-def translate_text(text, source_lang, target_lang):
-    """Traducir texto entre idiomas"""
-    if source_lang == target_lang or not text:
-        return text
-    
-    try:
-        translator = get_translator(source_lang, target_lang)
-        return translator.translate(text)
-    except Exception as e:
-        print(f"Error traduciendo '{text}': {e}")
-        return text
+# Directorio de los índices en disco (embeddings memoria mapeados)
+INDEX_DIR = "indices"
+
+# Literales de al menos 'min_length' caracteres de estas propiedades van al
+# montón de textos mapeado de INDEX_DIR (string_heap.py); None los deja en memoria.
+# Solo compensa con muchos textos: por debajo de 'min_total_bytes' (la
+# ontología incluida tiene ~15 KB, ver bench_text_heap.py) se quedan en memoria
+TEXT_HEAP_CONFIG = {
+    'min_length': 48,
+    'properties': ['descripcion'],
+    'min_total_bytes': 1024 * 1024,
+}
+
+def _file_signature(path):
+    """Hash del fichero RDF: identifica su contenido entre reinicios"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_snapshot(source, version):
+    """Parsear la ontología (o abrir el almacén SQLite) y construir todos sus índices derivados"""
+    if is_store_file(source):
+        # Almacén persistente: nada que parsear; todos los índices se
+        # construyen sobre la misma revisión confirmada
+        graph = open_graph(source, read_only=True)
+        with graph.store.read_snapshot():
+            return _snapshot_from_graph(graph, source, version, graph.store.signature())
+
+    graph = Graph()
+    graph.parse(source, format="xml")
+    return _snapshot_from_graph(graph, source, version, _file_signature(source))
+
+def _snapshot_from_graph(graph, source, version, signature):
+    # Almacén compacto de ids enteros para todas las lecturas de la búsqueda;
+    # los textos largos quedan en el montón mapeado y se leen al usarlos
+    min_length = TEXT_HEAP_CONFIG['min_length']
+    externalize = None
+    if min_length:
+        predicates = {NS[name] for name in TEXT_HEAP_CONFIG['properties']}
+        externalize = lambda terms, triples: externalize_long_literals(
+            terms, triples, min_length, predicates, INDEX_DIR,
+            min_total_bytes=TEXT_HEAP_CONFIG.get('min_total_bytes', 0))
+    store = CompactTripleStore.from_graph(graph, externalize)
+
+    # Instancias agrupadas por idioma: cada búsqueda solo recorre la suya
+    partitions = build_language_partitions(store, NS, LANGUAGES)
+    print(f"  Particiones por idioma: {partition_sizes(partitions)}")
+
+    return OntologySnapshot(
+        version, source, graph,
+        # Identidad del contenido para los ETag: 'version' es un contador
+        # del proceso y vuelve a 1 en cada arranque
+        content_id=signature,
+        store=store,
+        partitions=partitions,
+        # Bitsets por valor de faceta (clase, tipo de ingrediente, país)
+        facet_index=FacetIndex.from_store(store, NS, partitions),
+        # Matriz postre × ingrediente para "¿qué puedo hornear con esto?"
+        pantry_index=PantryIndex.from_store(store, NS),
+        # Vecinos y maridajes precalculados (ingredientes, herramientas, técnicas)
+        related_index=RelatedIndex.from_store(store, NS),
+        # Nombres equivalentes en los seis idiomas (ingredientes y versiones
+        # de cada postre): amplían la búsqueda sin traducir en la petición
+        alias_index=AliasIndex.from_store(store, NS, LANGUAGES),
+        suggest_index=SuggestIndex.from_graph(graph, NS, LANGUAGES),
+        fuzzy_index=TrigramIndex.from_graph(graph, NS, LANGUAGES, FUZZY_CONFIG),
+        # Embeddings locales (TF-IDF con hashing trick) guardados en disco y
+        # abiertos con memoria mapeada para compartirlos entre procesos
+        vector_index=VectorIndex.load_or_build(graph, NS, LANGUAGES, source, INDEX_DIR, signature),
+    )
+
+# Almacén SQLite persistente (ONTOLOGY_STORE=ontologia.sqlite) en lugar del RDF/XML:
+# se abre en solo lectura y las confirmaciones del poblador se recogen por revisión
+ONTOLOGY_STORE = os.environ.get("ONTOLOGY_STORE")
+# Cada versión se precalienta con las consultas más frecuentes antes de
+# activarse (warm_up_caches, más abajo)
+if ONTOLOGY_STORE:
+    ontology = OntologyManager(ONTOLOGY_STORE, build_snapshot, revision=read_revision,
+                               warmer=lambda snapshot: warm_up_caches(snapshot))
+else:
+    ontology = OntologyManager(ONTOLOGY_FILE, build_snapshot,
+                               warmer=lambda snapshot: warm_up_caches(snapshot))
+
+# Resultados de búsqueda local por (versión, término, idioma)
+search_cache = LRUCache(max_entries=512)
+# Tarjetas completas ya serializadas por (versión, elemento, idioma)
+item_cache = LRUCache(max_entries=4096)
+
+def _invalidate_caches(old_snapshot, new_snapshot):
+    """
+    Al cambiar de versión, los resultados cacheados dejan de ser válidos;
+    se conservan los de la versión nueva, que vienen del precalentamiento
+    """
+    search_cache.retain(lambda key: key[0] == new_snapshot.version)
+    item_cache.retain(lambda key: key[0] == new_snapshot.version)
+
+ontology.add_listener(_invalidate_caches)
+
+# Registro muestreado de consultas (QUERY_LOG='' lo desactiva); sus
+# consultas más frecuentes precalientan la cache de cada versión nueva
+QUERY_LOG_CONFIG = {
+    'path': os.environ.get("QUERY_LOG", os.path.join("logs", "queries.jsonl")),
+    'sample_rate': float(os.environ.get("QUERY_LOG_SAMPLE", "0.1")),
+    'max_bytes': 5 * 1024 * 1024,
+    'backups': 3,
+    'warmup_top': int(os.environ.get("WARMUP_TOP", "50")),
+    # Orígenes que se vuelven a ejecutar; 'dbpedia' añade consultas remotas al arrancar
+    'warmup_sources': ('page', 'api'),
+}
+query_log = QueryLog(QUERY_LOG_CONFIG['path'], QUERY_LOG_CONFIG['sample_rate'],
+                     QUERY_LOG_CONFIG['max_bytes'], QUERY_LOG_CONFIG['backups'])
+
+def log_query(term, language, source):
+    """Anotar la consulta normalizada (palabras en minúsculas) si entra en la muestra"""
+    query_log.record(term.lower().split(), language, source)
+
+def current_snapshot():
+    """
+    Versión de la ontología para la petición actual. Se fija al empezar
+    la petición, así que una recarga no cambia los datos a mitad de camino.
+    """
+    if has_request_context():
+        if "snapshot" not in request_state:
+            request_state.snapshot = ontology.current
+        return request_state.snapshot
+    return ontology.current
 
 # ===============================================
 # TOKENIZACIÓN INTELIGENTE
@@ -84,363 +247,480 @@ def tokenize_search_term(term):
 # ===============================================
 # FUNCIONES DE ONTOLOGÍA
 # ===============================================
-def get_all_subclasses(cls):
-    subclasses = set()
-    for sub in g.subjects(RDFS.subClassOf, cls):
-        subclasses.add(sub)
-        subclasses |= get_all_subclasses(sub)
-    return subclasses
-
-def get_all_superclasses(cls):
-    superclasses = set()
-    for sup in g.objects(cls, RDFS.subClassOf):
-        superclasses.add(sup)
-        superclasses |= get_all_superclasses(sup)
-    return superclasses
-
-def get_instances_of_class(cls):
-    subclasses = {cls} | get_all_subclasses(cls)
-    instances = set()
-    for c in subclasses:
-        for inst in g.subjects(RDF.type, c):
-            instances.add(inst)
-    return list(instances)
-
-def get_literal_by_language(inst, prop, preferred_lang='es'):
+def get_all_subclasses(cls, snapshot=None):
+    snapshot = snapshot or current_snapshot()
+    return set(snapshot.store.subclasses(cls))
+
+def get_all_superclasses(cls, snapshot=None):
+    snapshot = snapshot or current_snapshot()
+    return set(snapshot.store.superclasses(cls))
+
+def get_instances_of_class(cls, snapshot=None):
+    snapshot = snapshot or current_snapshot()
+    return list(snapshot.store.instances_of_class(cls))
+
+def get_literal_by_language(inst, prop, preferred_lang='es', snapshot=None):
     """
     Obtener un literal en el idioma preferido
     Si no existe, buscar en inglés, y si no, retornar el primero disponible
     """
-    values = list(g.objects(inst, prop))
+    snapshot = snapshot or current_snapshot()
+    values = list(snapshot.store.objects(inst, prop))
     
     if not values:
         return None
     
     # Buscar en el idioma preferido
     for value in values:
-        if isinstance(value, Literal) and hasattr(value, 'language'):
+        if isinstance(value, (Literal, HeapText)) and hasattr(value, 'language'):
             if value.language == preferred_lang:
                 return str(value)
     
     # Buscar en inglés como fallback
     for value in values:
-        if isinstance(value, Literal) and hasattr(value, 'language'):
+        if isinstance(value, (Literal, HeapText)) and hasattr(value, 'language'):
             if value.language == 'en':
                 return str(value)
     
     # Retornar el primero disponible
     return str(values[0])
 
-def get_all_literals_by_language(inst, prop, preferred_lang='es'):
+def get_all_literals_by_language(inst, prop, preferred_lang='es', snapshot=None):
     """
     Obtener todos los literales en el idioma preferido
     """
-    values = list(g.objects(inst, prop))
+    snapshot = snapshot or current_snapshot()
+    values = list(snapshot.store.objects(inst, prop))
     results = []
     
     # Primero buscar en el idioma preferido
     for value in values:
-        if isinstance(value, Literal) and hasattr(value, 'language'):
+        if isinstance(value, (Literal, HeapText)) and hasattr(value, 'language'):
             if value.language == preferred_lang:
                 results.append(str(value))
     
     # Si no hay resultados, buscar en inglés
     if not results:
         for value in values:
-            if isinstance(value, Literal) and hasattr(value, 'language'):
+            if isinstance(value, (Literal, HeapText)) and hasattr(value, 'language'):
                 if value.language == 'en':
                     results.append(str(value))
     
     # Si aún no hay resultados, tomar todos
     if not results:
-        results = [str(v) for v in values if isinstance(v, Literal)]
+        results = [str(v) for v in values if isinstance(v, (Literal, HeapText))]
     
     return results
 
 # ===============================================
 # BÚSQUEDA LOCAL MEJORADA CON MULTIIDIOMA
 # ===============================================
-def search_instances(term, language='es'):
+def search_instances(term, language='es', snapshot=None):
     """Búsqueda mejorada con soporte multi-idioma"""
+    results = list(iter_instances(term, language, snapshot))
+    results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+    return results
+
+def iter_instances(term, language='es', snapshot=None):
+    """
+    Generador de instancias coincidentes (resumen y relevancia), en el
+    orden de la partición y según se puntúan (sin ordenar por relevancia)
+    """
     tokens = tokenize_search_term(term)
     
     if not tokens:
-        return []
+        return
     
-    results = []
-    seen = set()
+    snapshot = snapshot or current_snapshot()
+    # Equivalentes en el idioma pedido ("apple" → "manzana") de la tabla de alias
+    aliases = snapshot.alias_index.expand(term, language, tokens)
 
-    for inst in g.subjects(RDF.type, None):
-        if inst in seen:
-            continue
+    # Solo las instancias del idioma pedido (partición calculada al cargar)
+    for inst in snapshot.partitions.get(language, ()):
+        result = score_instance(inst, tokens, language, snapshot, aliases)
+        if result is not None:
+            yield result
 
-        # Obtener todos los literales de idioma que coincidan con el idioma de búsqueda
-        inst_idioma_literal = [
-            str(v) for v in g.objects(inst, NS.idioma)
-            if isinstance(v, Literal) and getattr(v, 'language', None) == language
-        ]
-
-        # Si la instancia tiene idioma y no coincide con el deseado, se ignora
-        if inst_idioma_literal:
-            if inst_idioma_literal[0].lower() != LANGUAGES[language]['name'].lower():
-                continue
-
-
-        # ============================================
-        # ESTRATEGIA DE BÚSQUEDA MEJORADA
-        # ============================================
-        relevance_score = 0
-        matched_tokens = []
-
-        # 1. Buscar en TODOS los literales de nombre (multiidioma)
-        nombres_multiidioma = []
-        for prop in [NS.nombre, RDFS.label]:
-            for obj in g.objects(inst, prop):
-                if isinstance(obj, Literal) and getattr(obj, "language", None) == language:
-                    nombres_multiidioma.append(str(obj).lower())
-        if not nombres_multiidioma:
-            continue
-        # Si no hay nombres en idioma deseado, fallback a inglés
-        if not nombres_multiidioma:
-            for prop in [NS.nombre, RDFS.label]:
-                for obj in g.objects(inst, prop):
-                    if isinstance(obj, Literal) and getattr(obj, 'language', None) == 'en':
-                        nombres_multiidioma.append(str(obj).lower())
-
-        # 2. Obtener nombre preferido para mostrar
-        nombre_display = get_literal_by_language(inst, NS.nombre, language)
-        if not nombre_display:
-            nombre_display = get_literal_by_language(inst, RDFS.label, language)
-        if not nombre_display:
-            nombre_display = inst.split("#")[-1]
-
-        # 3. Buscar coincidencias en nombres (cualquier idioma)
-        for nombre in nombres_multiidioma:
-            for token in tokens:
-                if token in nombre:
-                    relevance_score += 5  # Mayor peso para coincidencias en nombre
-                    if token not in matched_tokens:
-                        matched_tokens.append(token)
-
-        # 4. Obtener información de la instancia
-        clases = [cls.split("#")[-1] for cls in g.objects(inst, RDF.type)]
-        clases_uris = list(g.objects(inst, RDF.type))
-        
-        # Detectar si es producto
-        es_producto = False
-        superclases_all = []
-        for cls_uri in clases_uris:
-            sups = get_all_superclasses(cls_uri)
-            superclases_all.extend([s.split("#")[-1] for s in sups])
-            if cls_uri.split("#")[-1].lower() == "producto" or "Producto" in [s.split("#")[-1] for s in sups]:
-                es_producto = True
-
-        # 5. Buscar en ingredientes/herramientas/técnicas
-        ingredientes = []
-        herramientas = []
-        tecnicas = []
-
-        for prop, obj in g.predicate_objects(inst):
-            prop_name = prop.split("#")[-1]
-
-            # Ingredientes
-            if prop == NS.tieneIngrediente or "ingrediente" in prop_name.lower():
-                # Buscar nombre del ingrediente solo en el idioma seleccionado
-                ing_nombres = []
-                for nombre_prop in [NS.nombre, RDFS.label]:
-                    for ing_obj in g.objects(obj, nombre_prop):
-                        if isinstance(ing_obj, Literal) and getattr(ing_obj, 'language', None) == language:
-                            ing_nombres.append(str(ing_obj).lower())
-
-                # Si no hay resultados en el idioma deseado, fallback a inglés
-                if not ing_nombres:
-                    for nombre_prop in [NS.nombre, RDFS.label]:
-                        for ing_obj in g.objects(obj, nombre_prop):
-                            if isinstance(ing_obj, Literal) and getattr(ing_obj, 'language', None) == 'en':
-                                ing_nombres.append(str(ing_obj).lower())
-
-                
-                # Usar nombre en idioma preferido para mostrar
-                ing_display = get_literal_by_language(obj, NS.nombre, language)
-                if not ing_display:
-                    ing_display = get_literal_by_language(obj, RDFS.label, language)
-                if not ing_display:
-                    ing_display = obj.split("#")[-1]
-                ingredientes.append(ing_display)
-                
-                # Buscar coincidencias en todos los nombres del ingrediente
-                for ing_nombre in ing_nombres:
-                    for token in tokens:
-                        if token in ing_nombre.lower():
-                            relevance_score += 3  # Coincidencia en ingrediente
-                            if token not in matched_tokens:
-                                matched_tokens.append(token)
-
-            # Herramientas
-            elif prop == NS.usaHerramienta or "herramienta" in prop_name.lower():
-                herr_nombres = []
-                for nombre_prop in [NS.nombre, RDFS.label]:
-                    for herr_obj in g.objects(obj, nombre_prop):
-                        if isinstance(herr_obj, Literal):
-                            herr_nombres.append(str(herr_obj))
-                
-                herr_display = get_literal_by_language(obj, NS.nombre, language)
-                if not herr_display:
-                    herr_display = get_literal_by_language(obj, RDFS.label, language)
-                if not herr_display:
-                    herr_display = obj.split("#")[-1]
-                herramientas.append(herr_display)
-                
-                for herr_nombre in herr_nombres:
-                    for token in tokens:
-                        if token in herr_nombre.lower():
-                            relevance_score += 2
-                            if token not in matched_tokens:
-                                matched_tokens.append(token)
-
-            # Técnicas
-            elif prop == NS.requiereTecnica or "tecnica" in prop_name.lower():
-                tec_nombres = []
-                for nombre_prop in [NS.nombre, RDFS.label]:
-                    for tec_obj in g.objects(obj, nombre_prop):
-                        if isinstance(tec_obj, Literal):
-                            tec_nombres.append(str(tec_obj))
-                
-                tec_display = get_literal_by_language(obj, NS.nombre, language)
-                if not tec_display:
-                    tec_display = get_literal_by_language(obj, RDFS.label, language)
-                if not tec_display:
-                    tec_display = obj.split("#")[-1]
-                tecnicas.append(tec_display)
-                
-                for tec_nombre in tec_nombres:
-                    for token in tokens:
-                        if token in tec_nombre.lower():
-                            relevance_score += 2
-                            if token not in matched_tokens:
-                                matched_tokens.append(token)
-
-        # 6. Buscar en clases y superclases
-        for cls_name in clases + superclases_all:
-            cls_lower = cls_name.lower()
-            for token in tokens:
-                if token in cls_lower:
-                    relevance_score += 1
-                    if token not in matched_tokens:
-                        matched_tokens.append(token)
-
-        # 7. Buscar en otros literales (descripción, etc.)
-        atributos = {}
-        for prop, obj in g.predicate_objects(inst):
-            if prop == RDF.type:
-                continue
-            
-            prop_name = prop.split("#")[-1]
-            
-            # Saltar propiedades ya procesadas
-            if prop in [NS.tieneIngrediente, NS.usaHerramienta, NS.requiereTecnica]:
-                continue
-            if "ingrediente" in prop_name.lower() or "herramienta" in prop_name.lower() or "tecnica" in prop_name.lower():
-                continue
-
-            if isinstance(obj, Literal):
-                # Buscar en el literal
-                obj_str = str(obj).lower()
-                for token in tokens:
-                    if token in obj_str:
-                        relevance_score += 1
-                        if token not in matched_tokens:
-                            matched_tokens.append(token)
-                
-                # Guardar atributo en idioma preferido
-                if hasattr(obj, 'language'):
-                    if obj.language == language:
-                        atributos.setdefault(prop_name, []).append(str(obj))
-                else:
-                    atributos.setdefault(prop_name, []).append(str(obj))
-            else:
-                # Objeto no literal
-                if not es_producto:
-                    atributos.setdefault(prop_name, []).append(obj.split("#")[-1])
-
-        # Solo incluir si hay coincidencias
-        if relevance_score == 0:
+def _names(store, node, language):
+    """Nombres (:nombre y rdfs:label) en minúsculas en un idioma"""
+    return [str(obj).lower() for prop in (NS.nombre, RDFS.label) for obj in store.objects(node, prop)
+            if isinstance(obj, Literal) and getattr(obj, 'language', None) == language]
+
+def _display_name(node, language, snapshot):
+    """Nombre para mostrar: :nombre, rdfs:label o el nombre local"""
+    return (get_literal_by_language(node, NS.nombre, language, snapshot)
+            or get_literal_by_language(node, RDFS.label, language, snapshot)
+            or node.split("#")[-1])
+
+def _class_info(store, inst, snapshot):
+    """(clases, superclases, es_producto) de una instancia"""
+    clases = []
+    superclases_all = []
+    es_producto = False
+    for cls_uri in store.objects(inst, RDF.type):
+        clases.append(cls_uri.split("#")[-1])
+        sups = [s.split("#")[-1] for s in get_all_superclasses(cls_uri, snapshot)]
+        superclases_all.extend(sups)
+        if cls_uri.split("#")[-1].lower() == "producto" or "Producto" in sups:
+            es_producto = True
+    return clases, superclases_all, es_producto
+
+def _relation_kind(prop):
+    """'ingrediente', 'herramienta', 'tecnica' o None según la propiedad"""
+    prop_name = prop.split("#")[-1].lower()
+    if prop == NS.tieneIngrediente or "ingrediente" in prop_name:
+        return "ingrediente"
+    if prop == NS.usaHerramienta or "herramienta" in prop_name:
+        return "herramienta"
+    if prop == NS.requiereTecnica or "tecnica" in prop_name:
+        return "tecnica"
+    return None
+
+def _alias_score(texts, aliases, weight):
+    """(puntos, algún alias que cubre el término entero) de los alias en unos nombres"""
+    score, whole_match = 0, False
+    for form, whole in aliases:
+        hits = sum(1 for text in texts if form in text)
+        score += weight * hits
+        whole_match = whole_match or (whole and hits > 0)
+    return score, whole_match
+
+def score_instance(inst, tokens, language='es', snapshot=None, aliases=()):
+    """
+    Resumen de una instancia (SUMMARY_FIELDS, descripción recortada y
+    número de ingredientes) con su relevancia para los tokens, o None si
+    no coincide con ninguno. Solo se leen los textos que puntúan: la
+    tarjeta completa se construye al abrirla (describe_instance).
+
+    aliases son los (alias, cubre_todo) de AliasIndex.expand: suman
+    ALIAS_CONFIG en el nombre y los ingredientes, nada en el resto.
+    """
+    snapshot = snapshot or current_snapshot()
+    store = snapshot.store
+
+    # 1. Nombres en el idioma pedido: nombre ×5
+    nombres = _names(store, inst, language)
+    if not nombres:
+        return None
+    relevance_score = sum(5 for nombre in nombres for token in tokens if token in nombre)
+    alias_score, alias_whole = _alias_score(nombres, aliases, ALIAS_CONFIG['name_weight'])
+
+    clases, superclases_all, es_producto = _class_info(store, inst, snapshot)
+
+    # 2. Ingredientes ×3 (idioma pedido o inglés), herramientas y técnicas ×2
+    #    (cualquier idioma); 3. descripción y otros literales ×1
+    num_ingredientes = 0
+    descripcion = None
+    for prop, obj in store.predicate_objects(inst):
+        if prop == RDF.type:
             continue
+        kind = _relation_kind(prop)
+        if kind == "ingrediente":
+            num_ingredientes += 1
+            ing_nombres = _names(store, obj, language) or _names(store, obj, 'en')
+            relevance_score += sum(3 for ing_nombre in ing_nombres for token in tokens if token in ing_nombre)
+            if aliases:
+                score, whole = _alias_score(ing_nombres, aliases, ALIAS_CONFIG['ingredient_weight'])
+                alias_score += score
+                alias_whole = alias_whole or whole
+        elif kind is not None:
+            otros = [str(value).lower() for nombre_prop in (NS.nombre, RDFS.label)
+                     for value in store.objects(obj, nombre_prop) if isinstance(value, Literal)]
+            relevance_score += sum(2 for nombre in otros for token in tokens if token in nombre)
+        elif isinstance(obj, HeapText):
+            # Texto largo en el montón mapeado: se busca sin decodificarlo
+            relevance_score += sum(1 for token in tokens if obj.contains(token))
+            if descripcion is None and obj.language == language and prop.split("#")[-1] == "descripcion":
+                descripcion = obj
+        elif isinstance(obj, Literal):
+            obj_str = str(obj).lower()
+            relevance_score += sum(1 for token in tokens if token in obj_str)
+            if descripcion is None and obj.language == language and prop.split("#")[-1] == "descripcion":
+                descripcion = obj
 
-        # 8. Buscar usos de esta instancia
-        usada_en = []
-        for s, p, o in g:
-            if str(o) == str(inst):
-                usada_en.append(str(s).split("#")[-1])
+    # 4. Clases y superclases ×1
+    relevance_score += sum(1 for cls_name in clases + superclases_all
+                           for token in tokens if token in cls_name.lower())
 
-        results.append({
-            "tipo": "instancia",
-            "nombre": nombre_display,
-            "clases": clases,
-            "superclases": list(set(superclases_all)),
-            "es_producto": es_producto,
-            "ingredientes": ingredientes if es_producto else [],
-            "herramientas": herramientas if es_producto else [],
-            "tecnicas": tecnicas if es_producto else [],
-            "atributos": atributos,
-            "usada_en": list(set(usada_en)),
-            "idioma": inst_idioma_literal[0] if inst_idioma_literal else language,
-            "fuente": "local",
-            "relevance": relevance_score
-        })
+    # Solo incluir si hay coincidencias con lo escrito o con un alias del término entero
+    if relevance_score == 0 and not alias_whole:
+        return None
+    relevance_score += alias_score
 
-        seen.add(inst)
+    summary = {
+        "tipo": "instancia",
+        "id": inst.split("#")[-1],
+        "nombre": _display_name(inst, language, snapshot),
+        "clases": clases,
+        "es_producto": es_producto,
+        "idioma": language,
+        "fuente": "local",
+        "relevance": relevance_score,
+    }
+    if descripcion is not None:
+        # El texto del montón se decodifica solo para los resultados
+        summary["descripcion"] = _truncate(str(descripcion), SUMMARY_DESCRIPTION_LENGTH)
+    summary["num_ingredientes"] = num_ingredientes if es_producto else 0
+    return summary
 
+def describe_instance(inst, language='es', snapshot=None):
+    """Tarjeta completa de una instancia (detalle de /api/item)"""
+    snapshot = snapshot or current_snapshot()
+    store = snapshot.store
+
+    clases, superclases_all, es_producto = _class_info(store, inst, snapshot)
+
+    ingredientes = []
+    herramientas = []
+    tecnicas = []
+    atributos = {}
+    for prop, obj in store.predicate_objects(inst):
+        if prop == RDF.type:
+            continue
+        kind = _relation_kind(prop)
+        if kind == "ingrediente":
+            ingredientes.append(_display_name(obj, language, snapshot))
+        elif kind == "herramienta":
+            herramientas.append(_display_name(obj, language, snapshot))
+        elif kind == "tecnica":
+            tecnicas.append(_display_name(obj, language, snapshot))
+        elif isinstance(obj, (Literal, HeapText)):
+            # Atributos en el idioma pedido
+            if obj.language == language:
+                atributos.setdefault(prop.split("#")[-1], []).append(str(obj))
+        elif not es_producto:
+            # Objeto no literal
+            atributos.setdefault(prop.split("#")[-1], []).append(obj.split("#")[-1])
+
+    # Usos de esta instancia
+    usada_en = [str(s).split("#")[-1] for s in store.referencing_subjects(inst)]
+
+    return {
+        "tipo": "instancia",
+        "id": inst.split("#")[-1],
+        "nombre": _display_name(inst, language, snapshot),
+        "clases": clases,
+        "superclases": list(set(superclases_all)),
+        "es_producto": es_producto,
+        "ingredientes": ingredientes if es_producto else [],
+        "herramientas": herramientas if es_producto else [],
+        "tecnicas": tecnicas if es_producto else [],
+        "atributos": atributos,
+        "usada_en": list(set(usada_en)),
+        "idioma": language,
+        "fuente": "local",
+    }
+
+def search_classes(term, language='es', snapshot=None):
+    """Busca clases (sin filtro de idioma ya que las clases son universales)"""
+    results = list(iter_classes(term, language, snapshot))
     results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
     return results
 
-def search_classes(term, language='es'):
-    """Busca clases (sin filtro de idioma ya que las clases son universales)"""
+def iter_classes(term, language='es', snapshot=None):
+    """Generador de clases coincidentes (sin ordenar por relevancia)"""
     tokens = tokenize_search_term(term)
     
     if not tokens:
-        return []
+        return
     
-    results = []
+    snapshot = snapshot or current_snapshot()
+    store = snapshot.store
+    language_members = set(snapshot.partitions.get(language, ()))
 
-    for cls in g.subjects(RDF.type, RDFS.Class):
-        cls_name = cls.split("#")[-1]
-        cls_name_lower = cls_name.lower()
+    # La ontología declara sus clases como owl:Class (se aceptan también rdfs:Class)
+    for cls in sorted(store.classes(), key=str):
+        result = describe_class(cls, tokens, language, snapshot, language_members)
+        if result is not None:
+            yield summarize_result(result)
 
-        match = False
-        relevance_score = 0
-        
-        for token in tokens:
-            if token in cls_name_lower:
-                match = True
-                relevance_score += 1
+def describe_class(cls, tokens, language='es', snapshot=None, language_members=None):
+    """
+    Tarjeta completa de una clase. Devuelve None si su nombre no contiene
+    ningún token; sin tokens se describe siempre.
+    """
+    snapshot = snapshot or current_snapshot()
+    store = snapshot.store
+    if language_members is None:
+        language_members = set(snapshot.partitions.get(language, ()))
+
+    cls_name = cls.split("#")[-1]
+    cls_name_lower = cls_name.lower()
+
+    match = not tokens
+    relevance_score = 0
+    
+    for token in tokens:
+        if token in cls_name_lower:
+            match = True
+            relevance_score += 1
+
+    if not match:
+        return None
 
-        if not match:
+    atributos = []
+    for p, o in store.predicate_objects(cls):
+        if "domain" in p.split("#")[-1]: 
             continue
+        atributos.append(p.split("#")[-1])
 
-        atributos = []
-        for s, p, o in g.triples((cls, None, None)):
-            if "domain" in p.split("#")[-1]: 
-                continue
-            atributos.append(p.split("#")[-1])
+    subclasses = [c.split("#")[-1] for c in get_all_subclasses(cls, snapshot)]
+    superclasses = [c.split("#")[-1] for c in get_all_superclasses(cls, snapshot)]
+    # Instancias del idioma de búsqueda (el cierre por subclases está cacheado)
+    instancias = sorted(i.split("#")[-1] for i in store.instances_of_class(cls) if i in language_members)
 
-        subclasses = [c.split("#")[-1] for c in get_all_subclasses(cls)]
-        superclasses = [c.split("#")[-1] for c in get_all_superclasses(cls)]
-        instancias = [i.split("#")[-1] for i in get_instances_of_class(cls)]
+    return {
+        "tipo": "clase",
+        "id": cls_name,
+        "nombre": cls_name,
+        "atributos": list(set(atributos)),
+        "subclases": subclasses,
+        "superclases": superclasses,
+        "instancias": instancias,
+        "fuente": "local",
+        "relevance": relevance_score
+    }
 
-        results.append({
-            "tipo": "clase",
-            "nombre": cls_name,
-            "atributos": list(set(atributos)),
-            "subclases": subclasses,
-            "superclases": superclasses,
-            "instancias": instancias,
-            "fuente": "local",
-            "relevance": relevance_score
-        })
+# Campos de la tarjeta resumida que devuelven las búsquedas; el resto se
+# pide bajo demanda a /api/item
+SUMMARY_FIELDS = ("tipo", "id", "nombre", "clases", "es_producto", "idioma", "fuente", "relevance", "aproximado")
+SUMMARY_DESCRIPTION_LENGTH = 160
 
-    results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
-    return results
+def _truncate(text, length):
+    return text if len(text) <= length else text[:length].rstrip() + "…"
+
+def summarize_result(result):
+    """
+    Versión resumida de una tarjeta completa para las listas de búsqueda
+    (las instancias ya se puntúan como resumen en score_instance)
+    """
+    summary = {field: result[field] for field in SUMMARY_FIELDS if field in result}
+    if result["tipo"] == "clase":
+        summary["num_instancias"] = len(result["instancias"])
+        summary["num_subclases"] = len(result["subclases"])
+    else:
+        descripcion = result["atributos"].get("descripcion")
+        if descripcion:
+            summary["descripcion"] = _truncate(descripcion[0], SUMMARY_DESCRIPTION_LENGTH)
+        summary["num_ingredientes"] = len(result["ingredientes"])
+    return summary
+
+def parse_facet_selections(values_getter):
+    """Selección de facetas a partir de los parámetros de la petición (getlist)"""
+    return {facet: [v for v in values_getter(facet) if v] for facet in FACETS}
+
+def apply_facets(results, selections, snapshot=None):
+    """
+    Filtrar los resultados por facetas y calcular los conteos de cada valor.
+    Los conteos salen de intersecar bitsets, sin volver a recorrer instancias.
+    """
+    snapshot = snapshot or current_snapshot()
+    facet_index = snapshot.facet_index
+    result_bits = facet_index.bitset_of(r['id'] for r in results if r['tipo'] == 'instancia')
+    counts = facet_index.counts(result_bits, selections)
+
+    if not any(selections.values()):
+        return results, counts
+
+    # Con facetas activas solo quedan las instancias que las cumplen
+    selected_bits = facet_index.filter(result_bits, selections)
+    filtered = [r for r in results
+                if r['tipo'] == 'instancia' and facet_index.contains(selected_bits, r['id'])]
+    return filtered, counts
+
+def _by_relevance(results):
+    return sorted(results, key=lambda x: x.get('relevance', 0), reverse=True)
+
+def scan_local(term, language, snapshot, outcome):
+    """
+    Genera los resultados locales (instancias y después clases) según se
+    puntúan. Si la búsqueda exacta devuelve muy pocos, se corrigen los
+    tokens desconocidos con el índice de trigramas y se generan también
+    los nuevos. Al terminar deja en outcome la lista ordenada y el término
+    corregido.
+    """
+    instances, classes = [], []
+    for result in iter_instances(term, language, snapshot):
+        instances.append(result)
+        yield result
+    for result in iter_classes(term, language, snapshot):
+        classes.append(result)
+        yield result
+
+    results = _by_relevance(instances) + _by_relevance(classes)
+    corrected_term = None
+
+    if len(results) < FUZZY_CONFIG['min_results']:
+        tokens = tokenize_search_term(term)
+        corrected_tokens = snapshot.fuzzy_index.correct_tokens(tokens, language)
+        if corrected_tokens:
+            corrected_term = ' '.join(corrected_tokens)
+            print(f"🔤 Búsqueda aproximada: '{term}' → '{corrected_term}'")
+
+            seen = {(r['tipo'], r['nombre']) for r in results}
+            approximate = {'instancia': [], 'clase': []}
+            for result in itertools.chain(iter_instances(corrected_term, language, snapshot),
+                                          iter_classes(corrected_term, language, snapshot)):
+                if (result['tipo'], result['nombre']) not in seen:
+                    result['aproximado'] = True
+                    approximate[result['tipo']].append(result)
+                    yield result
+            results += _by_relevance(approximate['instancia']) + _by_relevance(approximate['clase'])
+
+    outcome['results'] = results
+    outcome['corrected_term'] = corrected_term
+
+def search_local(term, language='es', snapshot=None):
+    """
+    Búsqueda local completa (instancias + clases), cacheada por versión.
+    Devuelve (resúmenes ordenados, término corregido o None); la tarjeta
+    completa se pide al abrir cada resultado (/api/item).
+    """
+    snapshot = snapshot or current_snapshot()
+    cache_key = (snapshot.version, term.lower(), language)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    outcome = {}
+    for _ in scan_local(term, language, snapshot, outcome):
+        pass
+
+    search_cache.put(cache_key, (outcome['results'], outcome['corrected_term']))
+    return outcome['results'], outcome['corrected_term']
+
+def warm_up_caches(snapshot):
+    """
+    Ejecutar sobre una versión recién construida (todavía no activa) las
+    consultas más frecuentes del registro, para que sus resultados ya
+    estén en la cache cuando empiece a servirse
+    """
+    top = QUERY_LOG_CONFIG['warmup_top']
+    if not top:
+        return {"queries": 0}
+    queries = top_queries(query_log.files(), top, QUERY_LOG_CONFIG['warmup_sources'])
+    seen = set()
+    local = remote = 0
+    for source, language, tokens in queries:
+        term = " ".join(tokens)
+        key = (source == 'dbpedia', language, term)
+        if language not in LANGUAGES or key in seen:
+            continue
+        seen.add(key)
+        if source == 'dbpedia':
+            # Los bloques de DBpedia no dependen de la versión: solo hace falta al arrancar
+            if ontology.current is None and language in DBPEDIA_ENABLED_LANGUAGES:
+                try:
+                    search_dbpedia_food(term, language)
+                    remote += 1
+                except CircuitOpenError:
+                    pass
+        else:
+            search_local(term, language, snapshot)
+            local += 1
+    if local or remote:
+        print(f"✓ Cache precalentada con {local} búsquedas locales y {remote} de DBpedia")
+    return {"queries": local + remote, "local": local, "dbpedia": remote}
 
 # ===============================================
 # CONFIGURACIÓN DE ENDPOINTS DBPEDIA POR IDIOMA
@@ -454,6 +734,11 @@ DBPEDIA_ENDPOINTS = {
     'pt': 'https://pt.dbpedia.org/sparql'
 }
 
+# DBPEDIA_SPARQL_URL dirige todas las consultas a un único endpoint
+# (p. ej. dbpedia_standin.py en las pruebas de carga de loadtest.py)
+if os.environ.get("DBPEDIA_SPARQL_URL"):
+    DBPEDIA_ENDPOINTS = {lang: os.environ["DBPEDIA_SPARQL_URL"] for lang in DBPEDIA_ENDPOINTS}
+
 # Palabras clave de postres por idioma
 DESSERT_KEYWORDS = {
     'es': ['pastel', 'tarta', 'galleta', 'postre', 'dulce', 'chocolate', 'helado', 'flan', 'natilla', 'mousse', 'brownie'],
@@ -461,45 +746,373 @@ DESSERT_KEYWORDS = {
     'fr': ['gâteau', 'tarte', 'biscuit', 'dessert', 'chocolat', 'mousse', 'pâtisserie', 'glace', 'crème']
 }
 
+# Un cortocircuito por endpoint: si uno cae, las búsquedas fallan al
+# instante en lugar de ocupar un hilo durante todo el timeout
+DBPEDIA_TIMEOUT = 30
+dbpedia_breakers = BreakerRegistry()
+
+class DBpediaQueryError(Exception):
+    """La consulta principal a un endpoint falló (timeout, conexión, error del servidor)"""
+
+    def __init__(self, endpoint, reason):
+        super().__init__(f"{endpoint}: {reason}")
+        self.endpoint = endpoint
+        self.reason = reason
+
+# Índice de texto de Virtuoso (bif:contains) por endpoint: con
+# DBPEDIA_TEXT_INDEX=auto se comprueba con una consulta mínima la primera
+# vez; on/off lo fija para todos (off = filtro CONTAINS original)
+DBPEDIA_TEXT_INDEX = os.environ.get("DBPEDIA_TEXT_INDEX", "auto")
+dbpedia_text_index = TextIndexCapabilities(
+    overrides={endpoint: DBPEDIA_TEXT_INDEX == "on" for endpoint in DBPEDIA_ENDPOINTS.values()}
+    if DBPEDIA_TEXT_INDEX in ("on", "off") else None)
+
+# Réplica local (python dbpedia_mirror.py build): si existe, la pestaña de
+# DBpedia se sirve desde ella sin llamadas remotas
+dbpedia_mirror = DBpediaMirror.open_if_exists(os.environ.get("DBPEDIA_MIRROR", DEFAULT_MIRROR_FILE))
+
+def dbpedia_availability(language):
+    """
+    Disponibilidad de DBpedia para un idioma según sus circuitos:
+    'available', 'degraded' (probando o usando solo el endpoint principal)
+    o 'unavailable' (todos los endpoints que usaría están abiertos)
+    """
+    if dbpedia_mirror is not None and dbpedia_mirror.has_language(language):
+        return 'available'
+    endpoints = [DBPEDIA_ENDPOINTS.get(language, DBPEDIA_ENDPOINTS['en'])]
+    if language != 'en':
+        endpoints.append(DBPEDIA_ENDPOINTS['en'])
+    states = [dbpedia_breakers.get(endpoint).state for endpoint in endpoints]
+    if all(state == OPEN for state in states):
+        return 'unavailable'
+    if any(state in (OPEN, HALF_OPEN) for state in states):
+        return 'degraded'
+    return 'available'
+
 def search_dbpedia_food(term, language='es', limit=3, offset=0):
     """
     Búsqueda en DBpedia usando estrategia híbrida CORREGIDA
     Solo funciona para idiomas habilitados: español, inglés y francés
+
+    Las filas se piden por bloques (DBPEDIA_PAGER_CONFIG['block_size']) y
+    las páginas se cortan del bloque cacheado; ver dbpedia_pages.py.
     
     Args:
         term: término de búsqueda
         language: idioma de búsqueda
         limit: número de resultados a retornar
         offset: número de resultados a saltar (para paginación)
+
+    Returns:
+        (resultados, hay_más, falló): falló si alguna consulta de la página
+        no respondió (ver BlockPager.page)
     """
     # VERIFICAR SI EL IDIOMA ESTÁ HABILITADO PARA DBPEDIA
     if language not in DBPEDIA_ENABLED_LANGUAGES:
         print(f"❌ DBpedia no habilitado para el idioma: {language}")
-        return []
+        return [], False, False
     
     tokens = tokenize_search_term(term)
     
     if not tokens:
-        return []
+        return [], False, False
     
     print(f"🌐 Búsqueda DBpedia habilitada para: {LANGUAGES[language]['name']}")
-    
+
+    results, has_more, failed = dbpedia_pager.page((tuple(tokens), language), offset, limit)
+    results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+    return results, has_more, failed
+
+def _fetch_dbpedia_block(key, block_no, block_size):
+    """Un bloque de filas sin ingredientes: endpoint del idioma y, si no hay nada, el principal"""
+    tokens, language = key
+    offset = block_no * block_size
+    tokens = list(tokens)
+
+    if dbpedia_mirror is not None and dbpedia_mirror.has_language(language):
+        # Réplica local: filas ya con ingredientes, sin endpoint remoto
+        bindings, ingredients = dbpedia_mirror.search(tokens, language, block_size, offset)
+        results = _bindings_to_results(bindings, tokens, language, "réplica local",
+                                       lambda item_uri: ingredients.get(item_uri, []))
+        return results, {"mirror": True, "tokens": tokens}
+
     # Búsqueda normal solo para idiomas permitidos
-    print(f"  → Intentando en {language}.dbpedia.org...")
-    results = _search_in_endpoint(tokens, language, language, limit, offset)
+    print(f"  → Intentando en {language}.dbpedia.org (bloque {block_no})...")
+    # Un bloque con alguna consulta fallida no se guarda como resultado definitivo
+    failed = False
+    try:
+        results = _search_in_endpoint(tokens, language, language, block_size, offset, fetch_ingredients=False)
+    except CircuitOpenError as e:
+        # Endpoint del idioma caído: pasar directamente al principal
+        print(f"  ⚡ {e}")
+        if language == 'en':
+            raise
+        results = []
+    except DBpediaQueryError:
+        failed = True
+        results = []
     
     # Solo si NO hay resultados, intentar en el endpoint principal
+    # (si también está abierto, CircuitOpenError llega al controlador)
     if len(results) == 0 and language != 'en':
         print(f"  → No se encontraron resultados en {language}.dbpedia.org")
         print(f"  → Buscando en dbpedia.org con etiquetas en {language}...")
-        results = _search_in_endpoint(tokens, language, 'en', limit, offset, search_in_main=True)
+        try:
+            results = _search_in_endpoint(tokens, language, 'en', block_size, offset, search_in_main=True,
+                                          fetch_ingredients=False)
+        except DBpediaQueryError:
+            failed = True
+        endpoint, endpoint_language = DBPEDIA_ENDPOINTS['en'], 'en'
     else:
         print(f"  ✓ Encontrados {len(results)} resultados en {language}.dbpedia.org")
+        endpoint = DBPEDIA_ENDPOINTS.get(language, DBPEDIA_ENDPOINTS['en'])
+        endpoint_language = language
+
+    prop_prefix, ingredient_props = _endpoint_properties(endpoint_language)
+    meta = {"endpoint": endpoint, "prop_prefix": prop_prefix,
+            "ingredient_prop": ingredient_props[0], "tokens": tokens, "failed": failed}
+    return results, meta
+
+def _enrich_dbpedia_items(items, meta):
+    """
+    Completar ingredientes y relevancia de las filas de una página.
+    Cada consulta pasa por el cortocircuito del endpoint: con el circuito
+    abierto no se consulta nada. Devuelve las filas completadas; las
+    demás se sirven sin ingredientes y se reintentan en otra página.
+    """
+    if meta.get("mirror"):
+        return items
+    breaker = dbpedia_breakers.get(meta["endpoint"])
+    sparql = SPARQLWrapper(meta["endpoint"])
+    sparql.setTimeout(DBPEDIA_TIMEOUT)
+    completed = []
+    for item in items:
+        try:
+            breaker.acquire()
+        except CircuitOpenError as e:
+            print(f"  ⚡ Ingredientes pendientes: {e}")
+            break
+        try:
+            item["ingredientes"] = _query_dbpedia_ingredients(
+                sparql, meta["prop_prefix"], meta["ingredient_prop"], item["atributos"]["dbpedia_uri"][0])
+            breaker.record_success()
+            completed.append(item)
+        except Exception as e:
+            breaker.record_failure(e)
+            print(f"✗ Error consultando ingredientes de {item['nombre']}: {str(e)[:100]}")
+        finally:
+            breaker.release()
+    for item in items:
+        item["relevance"] = _dbpedia_relevance(item["nombre"], item["ingredientes"], meta["tokens"])
+    return completed
+
+# Bloques de 30 filas por (tokens, idioma); no dependen de la ontología
+# local, así que no se vacían al recargarla
+DBPEDIA_PAGER_CONFIG = {
+    'block_size': 30,
+    'ttl_seconds': 3600,
+    'failed_ttl_seconds': 5,    # Bloques con una consulta fallida: reintentar pronto
+    'prefetch_pages': 2,
+}
+dbpedia_pager = BlockPager(_fetch_dbpedia_block, _enrich_dbpedia_items, DBPEDIA_PAGER_CONFIG)
+
+def _endpoint_properties(endpoint_language):
+    """Prefijo de propiedades y nombres de la propiedad de ingredientes de cada endpoint"""
+    if endpoint_language == 'es':
+        return 'http://es.dbpedia.org/property/', ['ingredientes', 'ingredients']
+    elif endpoint_language == 'fr':
+        return 'http://fr.dbpedia.org/property/', ['ingrédients', 'ingredients']
+    else:  # English
+        return 'http://dbpedia.org/property/', ['ingredients', 'ingredient']
+
+def _ingredients_query(prop_prefix, ingredient_prop, item_uri):
+    """Consulta ligera de ingredientes de un recurso (máximo 5)"""
+    return f"""
+        PREFIX dbp: <{prop_prefix}>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        PREFIX dbo: <http://dbpedia.org/ontology/>
+        
+        SELECT ?ing WHERE {{
+            <{item_uri}> dbp:{ingredient_prop} ?ing .
+        }}
+        LIMIT 5
+        """
+
+def _clean_ingredients(bindings):
+    """Nombres de ingrediente legibles a partir de las filas ?ing"""
+    ingredientes = []
+    for ing_result in bindings:
+        ing_value = ing_result.get('ing', {}).get('value', '')
+        if ing_value:
+            # Limpiar
+            ing_clean = ing_value.strip()
+            if "http://" in ing_clean:
+                ing_clean = ing_clean.split("/")[-1].replace("_", " ")
+            ing_clean = re.sub(r'\([^)]*\)', '', ing_clean).strip()
+            if ing_clean and len(ing_clean) > 1:
+                ingredientes.append(ing_clean)
+    return ingredientes
+
+def _query_dbpedia_ingredients(sparql, prop_prefix, ingredient_prop, item_uri):
+    """Ingredientes de un recurso (consulta ligera, máximo 5); los errores se propagan"""
+    sparql.setQuery(_ingredients_query(prop_prefix, ingredient_prop, item_uri))
+    sparql.setReturnFormat(JSON)
+    ing_results = sparql.query().convert()
+    return _clean_ingredients(ing_results['results']['bindings'])
+
+def _fetch_dbpedia_ingredients(sparql, prop_prefix, ingredient_prop, item_uri):
+    """Ingredientes de un recurso (consulta ligera, máximo 5)"""
+    try:
+        return _query_dbpedia_ingredients(sparql, prop_prefix, ingredient_prop, item_uri)
+    except:
+        return []  # Si falla la consulta de ingredientes, continuar sin ellos
+
+def _dbpedia_relevance(label, ingredientes, tokens):
+    relevance_score = 0
+    label_lower = label.lower()
+    for token in tokens:
+        if token.lower() in label_lower:
+            relevance_score += 3
     
+    for ing in ingredientes:
+        for token in tokens:
+            if token.lower() in ing.lower():
+                relevance_score += 1
+    return relevance_score
+
+def _bindings_to_results(bindings, tokens, display_language, endpoint_name, ingredients_for):
+    """
+    Convertir filas SPARQL (item, label, thumbnail, abstract, description)
+    en resultados. ingredients_for(item_uri) devuelve sus ingredientes.
+    """
+    results = []
+    processed_items = set()
+    
+    for result in bindings:
+        item_uri = result["item"]["value"]
+        
+        if item_uri in processed_items:
+            continue
+        processed_items.add(item_uri)
+        
+        label = result.get("label", {}).get("value", item_uri.split("/")[-1])
+        thumbnail_url = result.get("thumbnail", {}).get("value", None)
+        
+        print(f"  • {label}")
+        
+        # Descripción - intentar abstract primero, luego description
+        abstract = result.get("abstract", {}).get("value", "")
+        
+        # Si no hay abstract, intentar con description
+        if not abstract:
+            abstract = result.get("description", {}).get("value", "")
+        
+        # Truncar si es muy largo
+        if abstract and len(abstract) > 300:
+            abstract = abstract[:297] + "..."
+        elif not abstract:
+            no_description = {
+                'es': 'Descripción no disponible',
+                'en': 'Description not available',
+                'fr': 'Description non disponible'
+            }
+            abstract = no_description.get(display_language, 'No description')
+        
+        ingredientes = ingredients_for(item_uri)
+        
+        # Calcular relevancia
+        relevance_score = _dbpedia_relevance(label, ingredientes, tokens)
+        
+        # Construir resultado
+        atributos = {
+            "descripcion": [abstract],
+            "dbpedia_uri": [item_uri]
+        }
+        
+        results.append({
+            "tipo": "instancia",
+            "nombre": label,
+            "clases": ["Food (DBpedia)"],
+            "superclases": [],
+            "es_producto": True,
+            "ingredientes": ingredientes,
+            "herramientas": [],
+            "tecnicas": [],
+            "atributos": atributos,
+            "usada_en": [],
+            "thumbnail": thumbnail_url,
+            "idioma": LANGUAGES[display_language]['name'],
+            "fuente": f"dbpedia ({endpoint_name})",
+            "relevance": relevance_score
+        })
     return results
 
+def _endpoint_target(display_language, endpoint_language, search_in_main=False):
+    """(endpoint, idioma de las etiquetas, nombre a mostrar) de una búsqueda"""
+    if search_in_main:
+        endpoint = DBPEDIA_ENDPOINTS['en']
+        return endpoint, display_language, f"dbpedia.org (etiquetas: {display_language})"
+    endpoint = DBPEDIA_ENDPOINTS.get(endpoint_language, DBPEDIA_ENDPOINTS['en'])
+    return endpoint, endpoint_language, endpoint.replace('https://', '').replace('/sparql', '')
+
+def _search_query(tokens, label_lang, endpoint_language, prop_prefix, limit, offset, text_index=False):
+    """
+    Consulta SPARQL de búsqueda por etiqueta. Con text_index usa el índice
+    de texto del endpoint con todos los tokens; si no, CONTAINS del primero
+    """
+    text_filter = label_filter(tokens, text_index)
+
+    # CONSULTA SIMPLIFICADA Y OPTIMIZADA
+    # Para inglés, filtrar solo por comida usando clases de DBpedia
+    if endpoint_language == 'en':
+        food_filter = """
+        # Filtrar solo recursos relacionados con comida
+        ?item a ?type .
+        FILTER(
+            ?type = dbo:Food || 
+            ?type = dbo:Dessert ||
+            ?type = <http://dbpedia.org/class/yago/Dessert107609840> ||
+            ?type = <http://dbpedia.org/class/yago/BakedGoods107622061> ||
+            ?type = <http://dbpedia.org/class/yago/Cake107628005> ||
+            ?type = <http://dbpedia.org/class/yago/Cookie107655392> ||
+            ?type = <http://dbpedia.org/class/yago/Pastry107622826>
+        )
+        """
+    else:
+        food_filter = ""
+
+    query = f"""
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX dbo: <http://dbpedia.org/ontology/>
+    PREFIX dbp: <{prop_prefix}>
+
+    SELECT DISTINCT ?item ?label ?thumbnail ?abstract ?description
+    WHERE {{
+        ?item rdfs:label ?label .
+        {text_filter}
+        FILTER(LANG(?label) = "{label_lang}")
+
+        {food_filter}
 
-def _search_in_endpoint(tokens, display_language, endpoint_language, limit=3, offset=0, search_in_main=False):
+        OPTIONAL {{ ?item dbo:thumbnail ?thumbnail . }}
+
+        OPTIONAL {{
+            ?item dbo:abstract ?abstract .
+            FILTER(LANG(?abstract) = "{label_lang}")
+        }}
+
+        OPTIONAL {{
+            ?item dbo:description ?description .
+            FILTER(LANG(?description) = "{label_lang}")
+        }}
+    }}
+    LIMIT {limit}
+    OFFSET {offset}
+    """
+    return query
+
+def _search_in_endpoint(tokens, display_language, endpoint_language, limit=3, offset=0, search_in_main=False,
+                        fetch_ingredients=True):
     """
     Función auxiliar para buscar en un endpoint específico - VERSIÓN CORREGIDA
     
@@ -510,212 +1123,75 @@ def _search_in_endpoint(tokens, display_language, endpoint_language, limit=3, of
         limit: número de resultados a retornar
         offset: número de resultados a saltar
         search_in_main: si True, busca en endpoint principal con etiquetas en display_language
+        fetch_ingredients: si False, no consulta los ingredientes de cada resultado
+
+    Lanza DBpediaQueryError si falla la consulta principal (un [] es
+    siempre una respuesta real del endpoint) y CircuitOpenError si el
+    circuito del endpoint está abierto.
     """
-    if search_in_main:
-        endpoint = DBPEDIA_ENDPOINTS['en']
-        label_lang = display_language
-        endpoint_name = f"dbpedia.org (etiquetas: {display_language})"
-    else:
-        endpoint = DBPEDIA_ENDPOINTS.get(endpoint_language, DBPEDIA_ENDPOINTS['en'])
-        label_lang = endpoint_language
-        endpoint_name = endpoint.replace('https://', '').replace('/sparql', '')
-    
-    dessert_keywords = DESSERT_KEYWORDS.get(display_language, DESSERT_KEYWORDS['en'])
+    endpoint, label_lang, endpoint_name = _endpoint_target(display_language, endpoint_language, search_in_main)
+    prop_prefix, ingredient_props = _endpoint_properties(endpoint_language)
     
     results = []
+
+    # ¿bif:contains? La primera vez se comprueba con una consulta mínima:
+    # antes de ocupar una plaza del cortocircuito y no si está abierto
+    breaker = dbpedia_breakers.get(endpoint)
+    text_index = breaker.state != OPEN and dbpedia_text_index.supports(endpoint)
+
+    # Falla al instante (CircuitOpenError) si el endpoint está abierto o saturado
+    breaker.acquire()
+    queried = False
     
     try:
         sparql = SPARQLWrapper(endpoint)
-        sparql.setTimeout(30)
-        
-        # Crear filtro simple solo con el primer token
-        main_token = tokens[0] if tokens else ""
-        
-        # Versión sin acentos
-        import unicodedata
-        nfd = unicodedata.normalize('NFD', main_token)
-        token_normalized = ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
-        
-        if token_normalized.lower() != main_token.lower():
-            filter_conditions = f'(CONTAINS(LCASE(?label), LCASE("{main_token}")) || CONTAINS(LCASE(?label), LCASE("{token_normalized}")))'
-        else:
-            filter_conditions = f'CONTAINS(LCASE(?label), LCASE("{main_token}"))'
-        
-        # Construir prefijo de propiedades según idioma del endpoint
-        if endpoint_language == 'es':
-            prop_prefix = 'http://es.dbpedia.org/property/'
-            ingredient_props = ['ingredientes', 'ingredients']
-        elif endpoint_language == 'fr':
-            prop_prefix = 'http://fr.dbpedia.org/property/'
-            ingredient_props = ['ingrédients', 'ingredients']
-        else:  # English
-            prop_prefix = 'http://dbpedia.org/property/'
-            ingredient_props = ['ingredients', 'ingredient']
-        
-        # CONSULTA SIMPLIFICADA Y OPTIMIZADA
-        # Para inglés, filtrar solo por comida usando clases de DBpedia
-        if endpoint_language == 'en':
-            food_filter = """
-            # Filtrar solo recursos relacionados con comida
-            ?item a ?type .
-            FILTER(
-                ?type = dbo:Food || 
-                ?type = dbo:Dessert ||
-                ?type = <http://dbpedia.org/class/yago/Dessert107609840> ||
-                ?type = <http://dbpedia.org/class/yago/BakedGoods107622061> ||
-                ?type = <http://dbpedia.org/class/yago/Cake107628005> ||
-                ?type = <http://dbpedia.org/class/yago/Cookie107655392> ||
-                ?type = <http://dbpedia.org/class/yago/Pastry107622826>
-            )
-            """
-        else:
-            food_filter = ""
-        
-        query = f"""
-        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-        PREFIX dbo: <http://dbpedia.org/ontology/>
-        PREFIX dbp: <{prop_prefix}>
-        
-        SELECT DISTINCT ?item ?label ?thumbnail ?abstract ?description
-        WHERE {{
-            ?item rdfs:label ?label .
-            FILTER(LANG(?label) = "{label_lang}")
-            FILTER({filter_conditions})
-            
-            {food_filter}
-            
-            OPTIONAL {{ ?item dbo:thumbnail ?thumbnail . }}
-            
-            OPTIONAL {{
-                ?item dbo:abstract ?abstract .
-                FILTER(LANG(?abstract) = "{label_lang}")
-            }}
-            
-            OPTIONAL {{
-                ?item dbo:description ?description .
-                FILTER(LANG(?description) = "{label_lang}")
-            }}
-        }}
-        LIMIT {limit}
-        OFFSET {offset}
-        """
+        sparql.setTimeout(DBPEDIA_TIMEOUT)
+        sparql.setReturnFormat(JSON)
         
         print(f"\n=== Buscando en {endpoint_name}: {' '.join(tokens)} ===")
         
-        sparql.setQuery(query)
-        sparql.setReturnFormat(JSON)
-        query_results = sparql.query().convert()
+        sparql.setQuery(_search_query(tokens, label_lang, endpoint_language, prop_prefix, limit, offset, text_index))
+        try:
+            query_results = sparql.query().convert()
+        except QueryBadFormed:
+            if not text_index:
+                raise
+            # El endpoint no entiende bif:contains: no es un fallo del endpoint;
+            # se repite con CONTAINS y las siguientes búsquedas lo usan directamente
+            print(f"  → {endpoint_name} rechaza bif:contains; se repite con CONTAINS")
+            dbpedia_text_index.mark_unsupported(endpoint)
+            sparql.setQuery(_search_query(tokens, label_lang, endpoint_language, prop_prefix, limit, offset))
+            query_results = sparql.query().convert()
+        queried = True
+        breaker.record_success()
         
         bindings = query_results['results']['bindings']
         print(f"✓ Encontrados {len(bindings)} resultados")
         
-        processed_items = set()
-        
-        for result in bindings:
-            item_uri = result["item"]["value"]
-            
-            if item_uri in processed_items:
-                continue
-            processed_items.add(item_uri)
-            
-            label = result.get("label", {}).get("value", item_uri.split("/")[-1])
-            thumbnail_url = result.get("thumbnail", {}).get("value", None)
-            
-            print(f"  • {label}")
-            
-            # Descripción - intentar abstract primero, luego description
-            abstract = result.get("abstract", {}).get("value", "")
-            
-            # Si no hay abstract, intentar con description
-            if not abstract:
-                abstract = result.get("description", {}).get("value", "")
-            
-            # Truncar si es muy largo
-            if abstract and len(abstract) > 300:
-                abstract = abstract[:297] + "..."
-            elif not abstract:
-                no_description = {
-                    'es': 'Descripción no disponible',
-                    'en': 'Description not available',
-                    'fr': 'Description non disponible'
-                }
-                abstract = no_description.get(display_language, 'No description')
-            
-            # Obtener ingredientes en una segunda consulta MÁS LIGERA
-            ingredientes = []
-            try:
-                ing_query = f"""
-                PREFIX dbp: <{prop_prefix}>
-                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-                PREFIX dbo: <http://dbpedia.org/ontology/>
-                
-                SELECT ?ing WHERE {{
-                    <{item_uri}> dbp:{ingredient_props[0]} ?ing .
-                }}
-                LIMIT 5
-                """
-                
-                sparql.setQuery(ing_query)
-                ing_results = sparql.query().convert()
-                
-                for ing_result in ing_results['results']['bindings']:
-                    ing_value = ing_result.get('ing', {}).get('value', '')
-                    if ing_value:
-                        # Limpiar
-                        ing_clean = ing_value.strip()
-                        if "http://" in ing_clean:
-                            ing_clean = ing_clean.split("/")[-1].replace("_", " ")
-                        ing_clean = re.sub(r'\([^)]*\)', '', ing_clean).strip()
-                        if ing_clean and len(ing_clean) > 1:
-                            ingredientes.append(ing_clean)
-            except:
-                pass  # Si falla la consulta de ingredientes, continuar sin ellos
-            
-            # Calcular relevancia
-            relevance_score = 0
-            label_lower = label.lower()
-            for token in tokens:
-                if token.lower() in label_lower:
-                    relevance_score += 3
-            
-            for ing in ingredientes:
-                for token in tokens:
-                    if token.lower() in ing.lower():
-                        relevance_score += 1
-            
-            # Construir resultado
-            atributos = {
-                "descripcion": [abstract],
-                "dbpedia_uri": [item_uri]
-            }
-            
-            results.append({
-                "tipo": "instancia",
-                "nombre": label,
-                "clases": ["Food (DBpedia)"],
-                "superclases": [],
-                "es_producto": True,
-                "ingredientes": ingredientes,
-                "herramientas": [],
-                "tecnicas": [],
-                "atributos": atributos,
-                "usada_en": [],
-                "thumbnail": thumbnail_url,
-                "idioma": LANGUAGES[display_language]['name'],
-                "fuente": f"dbpedia ({endpoint_name})",
-                "relevance": relevance_score
-            })
+        results = _bindings_to_results(
+            bindings, tokens, display_language, endpoint_name,
+            # Ingredientes en una segunda consulta MÁS LIGERA (al paginar por
+            # bloques se piden después, solo para la página servida)
+            lambda item_uri: (_fetch_dbpedia_ingredients(sparql, prop_prefix, ingredient_props[0], item_uri)
+                              if fetch_ingredients else []))
         
         print(f"✓ Procesados {len(results)} resultados correctamente\n")
         
     except Exception as e:
         error_msg = str(e)
         print(f"✗ Error en {endpoint_name}: {error_msg[:100]}")
+        # Solo cuenta como fallo del endpoint si falló la consulta principal
+        if not queried:
+            breaker.record_failure(error_msg)
         
         if "timeout" in error_msg.lower() or "10060" in error_msg:
             print(f"  → Timeout de conexión")
         elif "500" in error_msg:
             print(f"  → Error del servidor")
+        if not queried:
+            raise DBpediaQueryError(endpoint, error_msg) from e
+    finally:
+        breaker.release()
     
     results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
     return results
@@ -725,47 +1201,397 @@ def _search_in_endpoint(tokens, display_language, endpoint_language, limit=3, of
 # ===============================================
 @app.route("/", methods=["GET", "POST"])
 def index():
-    term = ""
-    language = request.form.get("language", "es")
+    # El formulario usa GET (cacheable y con ETag); POST se mantiene por compatibilidad
+    params = request.form if request.method == "POST" else request.args
+    term = params.get("term", "").strip()
+    language = params.get("language", "es")
+    if language not in LANGUAGES:
+        language = "es"
     local_results = []
+    corrected_term = None
+    facet_selections = parse_facet_selections(params.getlist)
+    facet_counts = {}
+
+    etag = None
+    if request.method == "GET":
+        # Se comprueba antes de buscar: una búsqueda repetida no hace ningún trabajo
+        etag = http_cache.make_etag("index", current_snapshot().content_id, ui_build_id(),
+                                    term.lower(), language, sorted(facet_selections.items()))
+        if http_cache.is_not_modified(etag):
+            return http_cache.not_modified_response(etag)
 
-    if request.method == "POST":
-        term = request.form.get("term", "").strip()
-        if term:
-            inst_res = search_instances(term, language)
-            class_res = search_classes(term, language)
-            local_results = inst_res + class_res
+    if term:
+        log_query(term, language, 'page')
+        local_results, corrected_term = search_local(term, language)
+        local_results, facet_counts = apply_facets(local_results, facet_selections)
 
-    return render_template("index.html", 
+    response = make_response(render_template("index.html", 
                          results=local_results, 
                          term=term, 
+                         corrected_term=corrected_term,
+                         facet_counts=facet_counts,
+                         facet_selections=facet_selections,
                          languages=LANGUAGES,
-                         current_language=language)
+                         current_language=language))
+    return http_cache.revalidate(response, etag) if etag else response
 
-@app.route("/dbpedia_search", methods=["POST"])
+# Los resultados de DBpedia no dependen de la ontología local: el navegador
+# puede reutilizarlos unos minutos sin preguntar
+DBPEDIA_CLIENT_MAX_AGE = 300
+
+def _int_param(params, name, default):
+    """Entero de los parámetros (query string o JSON); default si falta o no es un número"""
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+@app.route("/dbpedia_search", methods=["GET", "POST"])
 def dbpedia_search():
-    term = request.json.get("term", "").strip()
-    language = request.json.get("language", "es")
-    limit = request.json.get("limit", 3)
-    offset = request.json.get("offset", 0)
+    # GET es cacheable por el navegador; POST con JSON se mantiene por compatibilidad
+    params = request.args if request.method == "GET" else (request.json or {})
+    term = params.get("term", "").strip()
+    language = params.get("language", "es")
+    # Una página cabe siempre en un bloque: cada petición cuesta como mucho
+    # dos consultas de bloque y 'limit' consultas de ingredientes
+    limit = max(1, min(_int_param(params, "limit", 3), DBPEDIA_PAGER_CONFIG['block_size']))
+    offset = max(0, _int_param(params, "offset", 0))
     
     # Verificar si el idioma está habilitado para DBpedia
     if language not in DBPEDIA_ENABLED_LANGUAGES:
         return jsonify({
             "error": "dbpedia_disabled",
-            "message": f"DBpedia no está disponible para {LANGUAGES[language]['name']}",
+            "message": f"DBpedia no está disponible para {LANGUAGES.get(language, {'name': language})['name']}",
             "enabled_languages": DBPEDIA_ENABLED_LANGUAGES
         })
     
     if term:
-        dbpedia_results = search_dbpedia_food(term, language, limit, offset)
-        return jsonify({
+        if offset == 0:
+            # Solo la primera página: las siguientes no son consultas nuevas
+            log_query(term, language, 'dbpedia')
+        try:
+            dbpedia_results, has_more, failed = search_dbpedia_food(term, language, limit, offset)
+        except CircuitOpenError as e:
+            # Respuesta inmediata: la interfaz lo muestra sin esperar al timeout
+            return jsonify({
+                "error": "dbpedia_unavailable",
+                "message": f"DBpedia no responde ahora mismo ({e.reason})",
+                "retry_after": round(e.retry_after, 1),
+                "results": [],
+                "has_more": False
+            }), 503
+        if failed and not dbpedia_results:
+            # Una consulta fallida no es "sin resultados": no debe cachearse
+            return jsonify({
+                "error": "dbpedia_unavailable",
+                "message": "DBpedia no ha respondido a la consulta",
+                "retry_after": DBPEDIA_PAGER_CONFIG['failed_ttl_seconds'],
+                "results": [],
+                "has_more": False
+            }), 503
+        response = jsonify({
             "results": dbpedia_results,
-            "has_more": len(dbpedia_results) == limit,
+            "has_more": has_more,
             "offset": offset,
             "limit": limit
         })
+        if failed:
+            # Página incompleta (filas sin ingredientes): ni ETag ni caché
+            response.cache_control.no_store = True
+        elif request.method == "GET":
+            # ETag del contenido: una página repetida se responde con 304
+            response.add_etag()
+            response.cache_control.public = True
+            response.cache_control.max_age = DBPEDIA_CLIENT_MAX_AGE
+            response = response.make_conditional(request)
+        return response
     return jsonify({"results": [], "has_more": False})
 
+def _ndjson(message):
+    return json.dumps(message, ensure_ascii=False) + "\n"
+
+def stream_search(term, language, selections, snapshot):
+    """
+    Respuesta NDJSON: una línea "meta", una línea "result" por resultado
+    en cuanto se puntúa y una línea "done" con el total, el término
+    corregido y los conteos de facetas. Los resultados llegan sin ordenar.
+    """
+    facet_index = snapshot.facet_index
+    faceted = any(selections.values())
+    selected_bits = facet_index.filter(-1, selections)
+
+    def visible(result):
+        return not faceted or (result['tipo'] == 'instancia'
+                               and facet_index.contains(selected_bits, result['id']))
+
+    def generate():
+        yield _ndjson({"type": "meta", "query": term, "language": language,
+                       "version": snapshot.version, "selections": selections})
+
+        cache_key = (snapshot.version, term.lower(), language)
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            results, corrected_term = cached
+            for result in results:
+                if visible(result):
+                    yield _ndjson({"type": "result", "item": result})
+        else:
+            outcome = {}
+            for result in scan_local(term, language, snapshot, outcome):
+                if visible(result):
+                    yield _ndjson({"type": "result", "item": result})
+            results, corrected_term = outcome['results'], outcome['corrected_term']
+            search_cache.put(cache_key, (results, corrected_term))
+
+        filtered, counts = apply_facets(results, selections, snapshot)
+        yield _ndjson({"type": "done", "count": len(filtered),
+                       "corrected_term": corrected_term, "facets": counts})
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
+
+@app.route("/api/search")
+def api_search():
+    """
+    Búsqueda local en JSON (?q=&lang=&clase=&ingrediente=&pais=).
+    Con ?stream=1 responde en NDJSON y envía cada resultado al puntuarlo.
+    """
+    term = request.args.get("q", "").strip()
+    language = request.args.get("lang", "es")
+    if language not in LANGUAGES:
+        language = "es"
+    if not term:
+        return jsonify({"error": "missing_query", "message": "Indica ?q="}), 400
+
+    selections = parse_facet_selections(request.args.getlist)
+    snapshot = current_snapshot()
+    log_query(term, language, 'api')
+
+    if request.args.get("stream") in ("1", "true", "ndjson"):
+        return stream_search(term, language, selections, snapshot)
+
+    etag = http_cache.make_etag("search", snapshot.content_id, term.lower(), language, sorted(selections.items()))
+    if http_cache.is_not_modified(etag):
+        return http_cache.not_modified_response(etag)
+
+    results, corrected_term = search_local(term, language, snapshot)
+    results, counts = apply_facets(results, selections, snapshot)
+    return http_cache.revalidate(jsonify({
+        "query": term,
+        "language": language,
+        "version": snapshot.version,
+        "corrected_term": corrected_term,
+        "selections": selections,
+        "facets": counts,
+        "count": len(results),
+        "results": results,
+    }), etag)
+
+def item_card(local_name, language, snapshot):
+    """
+    Tarjeta completa de una instancia o clase serializada, con su ETag.
+    Se construye una vez por (versión, elemento, idioma) y se reutiliza.
+    Devuelve None si el elemento no existe.
+    """
+    cache_key = (snapshot.version, local_name, language)
+    cached = item_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    uri = NS[local_name]
+    store = snapshot.store
+    if store.id_of(uri) is None:
+        return None
+
+    if uri in store.classes():
+        card = describe_class(uri, (), language, snapshot)
+    else:
+        card = describe_instance(uri, language, snapshot)
+
+    body = json.dumps(card, ensure_ascii=False).encode("utf-8")
+    etag = hashlib.sha1(body).hexdigest()
+    item_cache.put(cache_key, (body, etag))
+    return body, etag
+
+@app.route("/api/item/<local_name>")
+def api_item(local_name):
+    """Tarjeta completa de un resultado (ingredientes, atributos, usos...)"""
+    language = request.args.get("lang", "es")
+    if language not in LANGUAGES:
+        language = "es"
+
+    card = item_card(local_name, language, current_snapshot())
+    if card is None:
+        return jsonify({"error": "not_found", "message": f"'{local_name}' no existe en la ontología"}), 404
+
+    body, etag = card
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    # Responde 304 si el cliente ya tiene esta versión de la tarjeta
+    return response.make_conditional(request)
+
+@app.route("/api/suggest")
+def api_suggest():
+    """Sugerencias de autocompletado por prefijo (pensado para cada pulsación)"""
+    query = request.args.get("q", "").strip()
+    language = request.args.get("lang", "es")
+    limit = max(1, min(request.args.get("limit", 8, type=int), 20))
+
+    if language not in LANGUAGES:
+        language = "es"
+
+    return jsonify({
+        "query": query,
+        "language": language,
+        "suggestions": current_snapshot().suggest_index.suggest(query, language, limit)
+    })
+
+@app.route("/api/similar")
+def api_similar():
+    """Instancias similares a una dada (?id=) o a un texto libre (?q=)"""
+    item_id = request.args.get("id", "").strip()
+    query = request.args.get("q", "").strip()
+    language = request.args.get("lang", "es")
+    k = max(1, min(request.args.get("k", 5, type=int), 50))
+
+    if language not in LANGUAGES:
+        language = "es"
+
+    vector_index = current_snapshot().vector_index
+    if item_id:
+        results = vector_index.similar_to(item_id, language, k)
+        if results is None:
+            return jsonify({"error": "not_found", "message": f"'{item_id}' no tiene nombre en {language}"}), 404
+    elif query:
+        results = vector_index.search(query, language, k)
+    else:
+        return jsonify({"error": "missing_query", "message": "Indica ?id= o ?q="}), 400
+
+    return jsonify({"id": item_id or None, "query": query or None, "language": language, "results": results})
+
+@app.route("/api/facets")
+def api_facets():
+    """Búsqueda local filtrada por facetas (?clase=&ingrediente=&pais=) con sus conteos"""
+    term = request.args.get("q", "").strip()
+    language = request.args.get("lang", "es")
+    if language not in LANGUAGES:
+        language = "es"
+
+    selections = parse_facet_selections(request.args.getlist)
+    results, _ = search_local(term, language) if term else ([], None)
+    results, counts = apply_facets(results, selections)
+
+    return jsonify({
+        "query": term,
+        "language": language,
+        "selections": selections,
+        "facets": counts,
+        "results": [{"id": r.get("id"), "nombre": r["nombre"], "tipo": r["tipo"],
+                     "relevance": r.get("relevance", 0)} for r in results]
+    })
+
+@app.route("/api/can_bake")
+def api_can_bake():
+    """Postres que se pueden hacer con unos ingredientes (?ingredientes=harina,huevo)"""
+    raw = request.args.getlist("ingredientes") or request.args.getlist("i")
+    ingredients = [part for value in raw for part in value.split(",") if part.strip()]
+    language = request.args.get("lang", "es")
+    max_missing = max(0, min(request.args.get("max_missing", 1, type=int), 5))
+    limit = max(1, min(request.args.get("limit", 20, type=int), 100))
+
+    if language not in LANGUAGES:
+        language = "es"
+    if not ingredients:
+        return jsonify({"error": "missing_ingredients", "message": "Indica ?ingredientes=a,b,c"}), 400
+
+    snapshot = current_snapshot()
+    allowed = {inst.split("#")[-1] for inst in snapshot.partitions[language]}
+    results, unknown = snapshot.pantry_index.can_bake(
+        ingredients, language, max_missing=max_missing, limit=limit, allowed=allowed)
+
+    return jsonify({
+        "ingredients": ingredients,
+        "unknown": unknown,
+        "language": language,
+        "max_missing": max_missing,
+        "results": results,
+    })
+
+@app.route("/api/related/<item_id>")
+def api_related(item_id):
+    """Postres relacionados con uno dado y ingredientes que combinarían con él"""
+    language = request.args.get("lang", "es")
+    k = max(1, min(request.args.get("k", 5, type=int), 20))
+    if language not in LANGUAGES:
+        language = "es"
+
+    snapshot = current_snapshot()
+    allowed = {inst.split("#")[-1] for inst in snapshot.partitions[language]}
+    related = snapshot.related_index.related(item_id, language, k, allowed=allowed)
+    if related is None:
+        return jsonify({"error": "not_found", "message": f"'{item_id}' no tiene ingredientes, herramientas ni técnicas"}), 404
+
+    related["language"] = language
+    return jsonify(related)
+
+@app.route("/api/dbpedia_status")
+def api_dbpedia_status():
+    """Disponibilidad de DBpedia por idioma según los cortocircuitos"""
+    return jsonify({
+        "languages": {code: (dbpedia_availability(code) if code in DBPEDIA_ENABLED_LANGUAGES else "disabled")
+                      for code in LANGUAGES},
+        "endpoints": dbpedia_breakers.status(),
+        "text_index": dbpedia_text_index.status(),
+    })
+
+@app.route("/api/status")
+def api_status():
+    """Versión de la ontología activa y estado de la recarga"""
+    status = ontology.status()
+    status["search_cache"] = search_cache.stats()
+    status["item_cache"] = item_cache.stats()
+    status["dbpedia_blocks"] = dbpedia_pager.stats()
+    status["dbpedia_mirror"] = dbpedia_mirror.stats() if dbpedia_mirror is not None else None
+    status["partitions"] = partition_sizes(current_snapshot().partitions)
+    status["aliases"] = current_snapshot().alias_index.stats()
+    status["query_log"] = query_log.stats()
+    return jsonify(status)
+
+@app.route("/api/ready")
+def api_ready():
+    """Comprobación de disponibilidad: 200 con una versión cargada y precalentada, 503 si no"""
+    if not ontology.ready:
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True, "version": ontology.current.version,
+                    "warm_up": ontology.status()["warm_up"]})
+
+def _is_admin_request():
+    """Token en ADMIN_TOKEN, o solo peticiones locales si no está configurado"""
+    token = os.environ.get("ADMIN_TOKEN")
+    if token:
+        return request.headers.get("X-Admin-Token") == token
+    return request.remote_addr in ("127.0.0.1", "::1")
+
+@app.route("/admin/reload", methods=["POST"])
+def admin_reload():
+    """Recargar la ontología en segundo plano y cambiar de versión al terminar"""
+    if not _is_admin_request():
+        return jsonify({"error": "forbidden"}), 403
+
+    started = ontology.reload()
+    status = ontology.status()
+    status["started"] = bool(started)
+    return jsonify(status), 202
+
+# Cargar (y precalentar) la primera versión una vez definido todo lo
+# que usa la búsqueda; serve.py la hereda en cada trabajador ya lista
+ontology.load()
+
+# Recargar automáticamente si cambia el fichero (ONTOLOGY_WATCH=1) o,
+# con el almacén SQLite, en cuanto el poblador confirma una transacción
+if os.environ.get("ONTOLOGY_WATCH") == "1" or ONTOLOGY_STORE:
+    ontology.start_watcher(float(os.environ.get("ONTOLOGY_WATCH_INTERVAL", "2")))
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,420 @@
+"""
+Punto de entrada ASGI con un camino asíncrono para DBpedia.
+
+Con el servidor WSGI cada /dbpedia_search ocupa un hilo durante toda la
+consulta remota (hasta DBPEDIA_TIMEOUT segundos, y varias consultas por
+petición), así que unas pocas búsquedas lentas agotan los hilos. Aquí
+/dbpedia_search se atiende en el bucle de asyncio: las consultas SPARQL
+van por un cliente HTTP asíncrono (httpx) y miles de ellas pueden estar
+en vuelo sobre un solo hilo. Los ingredientes de una página se piden en
+paralelo.
+
+El resto de rutas (búsqueda local, que usa CPU) siguen siendo la app de
+Flask y se ejecutan en un grupo de hilos propio, sin bloquear el bucle.
+El contrato JSON de /dbpedia_search es el mismo: la respuesta se
+construye con jsonify, ETag, peticiones condicionales y compresión de
+app.py dentro de un contexto de petición de Flask.
+
+Dependencias opcionales (solo para este punto de entrada):
+    pip install httpx uvicorn
+
+Uso:
+    python asgi.py --port 8000 --local-threads 8
+    uvicorn asgi:application --port 8000
+"""
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import sys
+import traceback
+
+try:
+    import httpx
+except ImportError:  # Opcional: sin httpx no hay camino asíncrono
+    httpx = None
+
+from flask import jsonify, request
+from werkzeug.exceptions import InternalServerError
+
+import app as web
+from circuit_breaker import BreakerRegistry, CircuitOpenError
+from dbpedia_pages import AsyncBlockPager
+
+ASYNC_CONFIG = {
+    # Hilos para la app de Flask (búsqueda local y resto de rutas)
+    'local_threads': int(os.environ.get("LOCAL_THREADS", os.cpu_count() or 4)),
+    # Conexiones HTTP simultáneas hacia los endpoints de DBpedia
+    'max_connections': 512,
+    'max_keepalive': 64,
+    # Consultas simultáneas por endpoint: esperar ya no cuesta un hilo,
+    # pero se mantiene un límite para no saturar DBpedia
+    'max_concurrent': 128,
+}
+
+local_executor = ThreadPoolExecutor(max_workers=ASYNC_CONFIG['local_threads'], thread_name_prefix="local")
+
+# Los circuitos siguen siendo los de app.py (los lee /api/dbpedia_status),
+# con un límite de concurrencia pensado para consultas que no ocupan hilos
+web.dbpedia_breakers = BreakerRegistry({'max_concurrent': ASYNC_CONFIG['max_concurrent']})
+
+
+class AsyncSparqlClient:
+    """Consultas SELECT en JSON sobre un cliente httpx compartido"""
+
+    def __init__(self, timeout, max_connections, max_keepalive):
+        self.timeout = timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive)
+        self._client = None
+
+    async def select(self, endpoint, query):
+        if self._client is None:
+            # Se crea dentro del bucle que lo va a usar
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, headers={
+                "Accept": "application/sparql-results+json",
+                "User-Agent": "BuscadorReposteria/1.0 (asgi)",
+            })
+        response = await self._client.get(endpoint, params={"query": query, "format": "json"})
+        response.raise_for_status()
+        return response.json()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+sparql = AsyncSparqlClient(web.DBPEDIA_TIMEOUT, ASYNC_CONFIG['max_connections'],
+                           ASYNC_CONFIG['max_keepalive']) if httpx is not None else None
+
+
+# ----------------------------------------------------------------------
+# Búsqueda en DBpedia (misma lógica que app.py, sin bloquear)
+# ----------------------------------------------------------------------
+async def search_in_endpoint(tokens, display_language, endpoint_language, limit, offset, search_in_main=False):
+    """Filas de un endpoint sin ingredientes; DBpediaQueryError si la consulta falla"""
+    endpoint, label_lang, endpoint_name = web._endpoint_target(display_language, endpoint_language, search_in_main)
+    prop_prefix, _ = web._endpoint_properties(endpoint_language)
+
+    # La primera vez se comprueba (en un hilo) si el endpoint admite
+    # bif:contains: antes de ocupar una plaza del cortocircuito y no si está abierto
+    breaker = web.dbpedia_breakers.get(endpoint)
+    text_index = breaker.state != web.OPEN and await asyncio.get_running_loop().run_in_executor(
+        local_executor, web.dbpedia_text_index.supports, endpoint)
+
+    # Falla al instante (CircuitOpenError) si el endpoint está abierto o saturado
+    breaker.acquire()
+    try:
+        print(f"\n=== Buscando en {endpoint_name} (async): {' '.join(tokens)} ===")
+        try:
+            data = await sparql.select(endpoint, web._search_query(
+                tokens, label_lang, endpoint_language, prop_prefix, limit, offset, text_index))
+        except httpx.HTTPStatusError as e:
+            if not text_index or e.response.status_code != 400:
+                raise
+            # El endpoint no entiende bif:contains: no es un fallo del endpoint;
+            # se repite con CONTAINS y las siguientes búsquedas lo usan directamente
+            print(f"  → {endpoint_name} rechaza bif:contains; se repite con CONTAINS")
+            web.dbpedia_text_index.mark_unsupported(endpoint)
+            data = await sparql.select(endpoint, web._search_query(
+                tokens, label_lang, endpoint_language, prop_prefix, limit, offset))
+        breaker.record_success()
+    except Exception as e:
+        error_msg = str(e) or type(e).__name__
+        print(f"✗ Error en {endpoint_name}: {error_msg[:100]}")
+        breaker.record_failure(error_msg)
+        raise web.DBpediaQueryError(endpoint, error_msg) from e
+    finally:
+        breaker.release()
+
+    results = web._bindings_to_results(data['results']['bindings'], tokens, display_language,
+                                       endpoint_name, lambda item_uri: [])
+    results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+    return results
+
+
+async def fetch_block(key, block_no, block_size):
+    """Versión asíncrona de app._fetch_dbpedia_block"""
+    tokens, language = key
+    if web.dbpedia_mirror is not None and web.dbpedia_mirror.has_language(language):
+        # Réplica local (SQLite): en el grupo de hilos, no en el bucle
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(local_executor, web._fetch_dbpedia_block, key, block_no, block_size)
+
+    offset = block_no * block_size
+    tokens = list(tokens)
+    # Un bloque con alguna consulta fallida no se guarda como resultado definitivo
+    failed = False
+    try:
+        results = await search_in_endpoint(tokens, language, language, block_size, offset)
+    except CircuitOpenError as e:
+        print(f"  ⚡ {e}")
+        if language == 'en':
+            raise
+        results = []
+    except web.DBpediaQueryError:
+        failed = True
+        results = []
+
+    # Solo si NO hay resultados, intentar en el endpoint principal
+    if len(results) == 0 and language != 'en':
+        try:
+            results = await search_in_endpoint(tokens, language, 'en', block_size, offset, search_in_main=True)
+        except web.DBpediaQueryError:
+            failed = True
+        endpoint, endpoint_language = web.DBPEDIA_ENDPOINTS['en'], 'en'
+    else:
+        endpoint = web.DBPEDIA_ENDPOINTS.get(language, web.DBPEDIA_ENDPOINTS['en'])
+        endpoint_language = language
+
+    prop_prefix, ingredient_props = web._endpoint_properties(endpoint_language)
+    meta = {"endpoint": endpoint, "prop_prefix": prop_prefix,
+            "ingredient_prop": ingredient_props[0], "tokens": tokens, "failed": failed}
+    return results, meta
+
+
+async def enrich(items, meta):
+    """
+    Ingredientes y relevancia de las filas de una página, todas a la vez.
+    Cada consulta pasa por el cortocircuito del endpoint; devuelve las
+    filas completadas (las demás se reintentan en otra página).
+    """
+    if meta.get("mirror"):
+        return items
+    breaker = web.dbpedia_breakers.get(meta["endpoint"])
+
+    async def complete(item):
+        try:
+            breaker.acquire()
+        except CircuitOpenError:
+            return False
+        try:
+            data = await sparql.select(meta["endpoint"], web._ingredients_query(
+                meta["prop_prefix"], meta["ingredient_prop"], item["atributos"]["dbpedia_uri"][0]))
+            item["ingredientes"] = web._clean_ingredients(data['results']['bindings'])
+            breaker.record_success()
+            return True
+        except Exception as e:
+            breaker.record_failure(str(e) or type(e).__name__)
+            return False
+        finally:
+            breaker.release()
+
+    done = await asyncio.gather(*(complete(item) for item in items))
+    for item in items:
+        item["relevance"] = web._dbpedia_relevance(item["nombre"], item["ingredientes"], meta["tokens"])
+    return [item for item, ok in zip(items, done) if ok]
+
+
+dbpedia_pager = AsyncBlockPager(fetch_block, enrich, web.DBPEDIA_PAGER_CONFIG)
+
+
+async def search_dbpedia_food(term, language, limit=3, offset=0):
+    """Versión asíncrona de app.search_dbpedia_food: (resultados, hay_más, falló)"""
+    if language not in web.DBPEDIA_ENABLED_LANGUAGES:
+        return [], False, False
+    tokens = web.tokenize_search_term(term)
+    if not tokens:
+        return [], False, False
+
+    results, has_more, failed = await dbpedia_pager.page((tuple(tokens), language), offset, limit)
+    results.sort(key=lambda x: x.get('relevance', 0), reverse=True)
+    return results, has_more, failed
+
+
+# ----------------------------------------------------------------------
+# ASGI
+# ----------------------------------------------------------------------
+def wsgi_environ(scope, body):
+    """Entorno WSGI equivalente a una petición HTTP de ASGI"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_response(send, response):
+    """Enviar una respuesta de Flask/werkzeug ya construida"""
+    await send({"type": "http.response.start", "status": response.status_code,
+                "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()]})
+    await send({"type": "http.response.body", "body": response.get_data()})
+
+
+async def call_flask(environ, send):
+    """La app de Flask en el grupo de hilos; el cuerpo se reenvía trozo a trozo (NDJSON incluido)"""
+    loop = asyncio.get_running_loop()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return lambda data: None
+
+    iterable = await loop.run_in_executor(local_executor, web.app, environ, start_response)
+    iterator = iter(iterable)
+    done = object()
+    try:
+        first = await loop.run_in_executor(local_executor, next, iterator, done)
+        await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+        chunk = first
+        while chunk is not done:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await loop.run_in_executor(local_executor, next, iterator, done)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(iterable, "close"):
+            await loop.run_in_executor(local_executor, iterable.close)
+
+
+async def dbpedia_search(environ, send):
+    """/dbpedia_search en el bucle de eventos, con la misma respuesta que app.dbpedia_search"""
+    with web.app.request_context(environ):
+        params = request.args if request.method == "GET" else (request.get_json(silent=True) or {})
+        term = params.get("term", "").strip()
+        language = params.get("language", "es")
+        limit = max(1, min(web._int_param(params, "limit", 3), web.DBPEDIA_PAGER_CONFIG['block_size']))
+        offset = max(0, web._int_param(params, "offset", 0))
+        method = request.method
+
+        if language not in web.DBPEDIA_ENABLED_LANGUAGES:
+            response = jsonify({
+                "error": "dbpedia_disabled",
+                "message": f"DBpedia no está disponible para {web.LANGUAGES.get(language, {'name': language})['name']}",
+                "enabled_languages": web.DBPEDIA_ENABLED_LANGUAGES
+            })
+            await send_response(send, web.app.process_response(response))
+            return
+        if not term:
+            await send_response(send, web.app.process_response(jsonify({"results": [], "has_more": False})))
+            return
+        if offset == 0:
+            web.log_query(term, language, 'dbpedia')
+
+    # La espera a DBpedia ocurre fuera del contexto de Flask y sin ocupar hilos
+    failed = False
+    try:
+        results, has_more, failed = await search_dbpedia_food(term, language, limit, offset)
+        payload, status = {"results": results, "has_more": has_more, "offset": offset, "limit": limit}, 200
+        if failed and not results:
+            payload, status = {
+                "error": "dbpedia_unavailable",
+                "message": "DBpedia no ha respondido a la consulta",
+                "retry_after": web.DBPEDIA_PAGER_CONFIG['failed_ttl_seconds'],
+                "results": [],
+                "has_more": False
+            }, 503
+    except CircuitOpenError as e:
+        payload, status = {
+            "error": "dbpedia_unavailable",
+            "message": f"DBpedia no responde ahora mismo ({e.reason})",
+            "retry_after": round(e.retry_after, 1),
+            "results": [],
+            "has_more": False
+        }, 503
+
+    with web.app.request_context(environ):
+        response = jsonify(payload)
+        response.status_code = status
+        if failed:
+            response.cache_control.no_store = True
+        elif status == 200 and method == "GET":
+            response.add_etag()
+            response.cache_control.public = True
+            response.cache_control.max_age = web.DBPEDIA_CLIENT_MAX_AGE
+            response = response.make_conditional(request)
+        await send_response(send, web.app.process_response(response))
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if httpx is None:
+                await send({"type": "lifespan.startup.failed", "message": "asgi.py necesita httpx"})
+                return
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await sparql.aclose()
+            local_executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    environ = wsgi_environ(scope, await read_body(receive))
+    if scope["path"] == "/dbpedia_search" and scope["method"] in ("GET", "POST"):
+        try:
+            await dbpedia_search(environ, send)
+        except Exception:
+            traceback.print_exc()
+            await send_response(send, InternalServerError().get_response())
+        return
+    await call_flask(environ, send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor ASGI con búsquedas de DBpedia asíncronas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--local-threads", type=int, default=None,
+                        help="Hilos para la búsqueda local y el resto de rutas de Flask")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        uvicorn = None
+    if httpx is None or uvicorn is None:
+        sys.exit("asgi.py necesita httpx y uvicorn: pip install httpx uvicorn")
+
+    global local_executor
+    threads = args.local_threads or ASYNC_CONFIG['local_threads']
+    if threads != ASYNC_CONFIG['local_threads']:
+        local_executor.shutdown(wait=False)
+        local_executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="local")
+    print(f"✓ Servidor ASGI en http://{args.host}:{args.port} "
+          f"({threads} hilos locales, DBpedia asíncrono)", flush=True)
+    uvicorn.run(application, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Comparativa entre la clasificación original del poblador (cadenas de
+any(palabra in nombre ...)) y el clasificador compilado de
+keyword_classifier.py, nombre a nombre y por lotes.
+
+Los nombres de postres e ingredientes en inglés se toman de la ontología
+poblada y se repiten hasta el tamaño pedido. Antes de medir se comprueba
+que las tres variantes devuelven exactamente las mismas clases.
+
+Uso:
+    python bench_classifier.py [nombres] [fichero.rdf]
+"""
+import statistics
+import sys
+import time
+
+from rdflib import Graph, Namespace, RDF
+
+from keyword_classifier import KeywordClassifier
+
+NS = Namespace("http://www.semanticweb.org/ontologies/reposteria#")
+REPETITIONS = 5
+
+
+# Implementación original de DBpediaDeepTranslatorPopulator, como referencia
+def legacy_dessert_class(name_en):
+    name_lower = name_en.lower()
+    if any(word in name_lower for word in ['cookie', 'biscuit', 'macaroon']):
+        return 'Galleta'
+    elif any(word in name_lower for word in ['mousse', 'pudding', 'custard', 'flan']):
+        return 'PostreDeCuchara'
+    elif any(word in name_lower for word in ['cake', 'tart', 'pie', 'pastry']):
+        return 'Pastel'
+    elif any(word in name_lower for word in ['candy', 'chocolate', 'truffle', 'bonbon']):
+        return 'Confiteria'
+    else:
+        return 'Pastel'
+
+
+def legacy_ingredient_type(ingredient_name):
+    ing_lower = ingredient_name.lower()
+    animal_keywords = [
+        'egg', 'milk', 'cream', 'butter', 'cheese', 'yogurt',
+        'gelatin', 'honey', 'whey', 'dairy', 'lard'
+    ]
+    if any(keyword in ing_lower for keyword in animal_keywords):
+        return 'Animal'
+    aditivo_keywords = [
+        'extract', 'essence', 'powder', 'yeast', 'baking',
+        'coloring', 'vanilla', 'soda', 'salt', 'cinnamon'
+    ]
+    if any(keyword in ing_lower for keyword in aditivo_keywords):
+        return 'Aditivo'
+    return 'Vegetal'
+
+
+def english_names(graph):
+    """(postres, ingredientes) con :nombre en inglés o sin etiqueta de idioma"""
+    ingredients = set()
+    for cls in ("Animal", "Vegetal", "Aditivo", "Ingrediente"):
+        ingredients.update(graph.subjects(RDF.type, NS[cls]))
+    desserts, ingredient_names = [], []
+    for subject, name in graph.subject_objects(NS.nombre):
+        if getattr(name, "language", None) not in (None, "en"):
+            continue
+        (ingredient_names if subject in ingredients else desserts).append(str(name))
+    return desserts, ingredient_names
+
+
+def repeat_to(names, size):
+    return (names * (size // len(names) + 1))[:size] if names else []
+
+
+def timed(run):
+    timings = []
+    for _ in range(REPETITIONS):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rdf_file = sys.argv[2] if len(sys.argv) > 2 else "reposteria_poblada.rdf"
+
+    graph = Graph()
+    graph.parse(rdf_file, format="xml")
+    desserts, ingredients = english_names(graph)
+    print(f"Nombres en inglés: {len(desserts)} postres, {len(ingredients)} ingredientes · lote de {size}")
+
+    cases = [
+        ("dessert_class", legacy_dessert_class, repeat_to(desserts, size)),
+        ("ingredient_type", legacy_ingredient_type, repeat_to(ingredients, size)),
+    ]
+
+    print(f"\n{'clasificador':<16} {'any() ms':>10} {'regex ms':>10} {'lote ms':>10} {'x lote':>8}")
+    for name, legacy, names in cases:
+        if not names:
+            print(f"{name:<16} sin nombres")
+            continue
+        classifier = KeywordClassifier.from_file(name)
+
+        expected = [legacy(n) for n in names]
+        if [classifier.classify(n) for n in names] != expected or classifier.classify_many(names) != expected:
+            print(f"✗ {name}: el clasificador compilado no coincide con la implementación original")
+            sys.exit(1)
+
+        legacy_ms = timed(lambda: [legacy(n) for n in names])
+        single_ms = timed(lambda: [classifier.classify(n) for n in names])
+        batch_ms = timed(lambda: classifier.classify_many(names))
+        print(f"{name:<16} {legacy_ms:>10.2f} {single_ms:>10.2f} {batch_ms:>10.2f} {legacy_ms / batch_ms:>7.1f}x")
+
+    print("\n✓ Mismas clases que la implementación original")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark de la búsqueda aproximada por trigramas.
+
+Mide la latencia que añade la corrección de tokens (índice de trigramas
++ distancia de edición acotada) sobre una lista de búsquedas con errores
+tipográficos, y la compara con el presupuesto FUZZY_CONFIG['latency_budget_ms'].
+
+Uso:
+    python bench_fuzzy.py [repeticiones]
+"""
+import statistics
+import sys
+import time
+
+import app
+
+QUERIES = [
+    ('choclate', 'es'), ('galeta', 'es'), ('mantequila', 'es'), ('azucr', 'es'),
+    ('hariana', 'es'), ('chocolat cake', 'en'), ('buter', 'en'), ('cookei', 'en'),
+    ('creme', 'fr'), ('beure', 'fr'), ('farine', 'fr'), ('cioccolatto', 'it'),
+    ('schokolade kuchen', 'de'), ('manteiga', 'pt'), ('pastl', 'es'), ('postredecuchara', 'es'),
+]
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    budget_ms = app.FUZZY_CONFIG['latency_budget_ms']
+    # El índice vive en la versión activa de la ontología
+    fuzzy_index = app.current_snapshot().fuzzy_index
+
+    print(f"Vocabulario: {fuzzy_index.stats()}")
+    print(f"{'consulta':<20} {'idioma':<6} {'corrección':<22} {'p50 ms':>8} {'p95 ms':>8}")
+
+    all_timings = []
+    for term, language in QUERIES:
+        tokens = app.tokenize_search_term(term)
+        timings = []
+        corrected = None
+        for _ in range(repetitions):
+            start = time.perf_counter()
+            corrected = fuzzy_index.correct_tokens(tokens, language)
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        all_timings.extend(timings)
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{term:<20} {language:<6} {' '.join(corrected) if corrected else '-':<22} {p50:>8.3f} {p95:>8.3f}")
+
+    all_timings.sort()
+    p95 = all_timings[int(len(all_timings) * 0.95) - 1]
+    worst = all_timings[-1]
+    print(f"\nTotal: p95={p95:.3f} ms  máx={worst:.3f} ms  presupuesto={budget_ms:.1f} ms")
+
+    if p95 > budget_ms:
+        print("✗ La búsqueda aproximada supera el presupuesto de latencia")
+        sys.exit(1)
+    print("✓ Dentro del presupuesto de latencia")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Memoria (RSS) del almacén de tripletas con las descripciones en memoria
+o en el montón de textos mapeado (string_heap.py).
+
+Cada medida se hace en un proceso nuevo: se carga el grafo, se construye
+el CompactTripleStore (con o sin montón), se descarta el grafo rdflib
+como hace la aplicación y se miden el RSS y la memoria de Python que
+sigue viva (tracemalloc). El RSS incluye la fragmentación que deja el
+grafo descartado; la memoria viva es lo que cada trabajador conserva.
+Se mide la ontología incluida y una sintética con N postres × 6 idiomas
+y descripciones de ~300 caracteres, como las que genera el poblador.
+
+Uso:
+    python bench_text_heap.py [postres_sintéticos] [fichero.rdf]
+"""
+import ctypes
+import gc
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from rdflib import Graph, Literal, Namespace, RDF
+from rdflib.namespace import OWL
+
+from string_heap import externalize_long_literals
+from triple_store import CompactTripleStore
+
+NS = Namespace("http://www.semanticweb.org/ontologies/reposteria#")
+LANGUAGES = ['es', 'en', 'fr', 'it', 'de', 'pt']
+MIN_LENGTH = 48
+WORDS = ("azúcar harina mantequilla huevo chocolate vainilla crema horno masa tarta galleta "
+         "receta tradicional dulce capa relleno almendra canela limón fresa nata merengue").split()
+
+
+def synthetic_graph(desserts, seed=7):
+    rng = random.Random(seed)
+    graph = Graph()
+    for i in range(desserts):
+        for lang in LANGUAGES:
+            subject = NS[f"{lang.upper()}_Postre_{i}"]
+            graph.add((subject, RDF.type, OWL.NamedIndividual))
+            graph.add((subject, RDF.type, NS.Pastel))
+            graph.add((subject, NS.nombre, Literal(f"Postre {i} {rng.choice(WORDS)}", lang=lang)))
+            text = " ".join(rng.choice(WORDS) for _ in range(45))[:297] + "..."
+            graph.add((subject, NS.descripcion, Literal(text, lang=lang)))
+    return graph
+
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def release_freed_memory():
+    gc.collect()
+    try:
+        # Devolver al sistema la memoria liberada por malloc (glibc)
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except OSError:
+        pass
+
+
+def measure(source, mode, heap_dir):
+    """Proceso hijo: construir el almacén en el modo dado y medir"""
+    tracemalloc.start()
+    if source.startswith("synthetic:"):
+        graph = synthetic_graph(int(source.split(":")[1]))
+    else:
+        graph = Graph()
+        graph.parse(source, format="xml")
+
+    externalize = None
+    if mode == "heap":
+        externalize = lambda terms, triples: externalize_long_literals(
+            terms, triples, MIN_LENGTH, {NS.descripcion}, heap_dir)
+    store = CompactTripleStore.from_graph(graph, externalize)
+    triples = len(graph)
+    del graph
+    release_freed_memory()
+    live_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    terms = store._terms
+    long_texts = store._external
+    inline_bytes = sum(sys.getsizeof(t) for t in terms if isinstance(t, Literal) and len(t) >= MIN_LENGTH)
+    heap_bytes = long_texts.heap.nbytes() if long_texts else 0
+    return {"triples": triples, "rss_kb": rss_kb(), "live_bytes": live_bytes,
+            "long_texts": len(long_texts) if long_texts else 0,
+            "inline_long_bytes": inline_bytes, "heap_file_bytes": heap_bytes}
+
+
+def run_child(source, mode, heap_dir):
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", source, mode, heap_dir],
+        check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        print(json.dumps(measure(*sys.argv[2:5])))
+        return
+
+    desserts = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rdf_file = sys.argv[2] if len(sys.argv) > 2 else "reposteria_poblada_google.rdf"
+
+    print(f"{'ontología':<28} {'tripletas':>9} {'':>6} {'en memoria':>11} {'con montón':>11} {'ahorro':>9}")
+    for label, source in ((rdf_file, rdf_file), (f"sintética ({desserts} postres)", f"synthetic:{desserts}")):
+        with tempfile.TemporaryDirectory() as heap_dir:
+            inline = run_child(source, "inline", heap_dir)
+            heap = run_child(source, "heap", heap_dir)
+        for metric, key, scale in (("RSS", "rss_kb", 1024), ("viva", "live_bytes", 1024 * 1024)):
+            before, after = inline[key] / scale, heap[key] / scale
+            print(f"{label if metric == 'RSS' else '':<28} {inline['triples'] if metric == 'RSS' else '':>9} "
+                  f"{metric:>6} {before:>8.1f} MB {after:>8.1f} MB {before - after:>6.1f} MB")
+        print(f"{'':<28} {heap['long_texts']} textos largos · en memoria: {inline['inline_long_bytes'] / 1024:.0f} KB · "
+              f"ficheros del montón (mapeados, compartidos): {heap['heap_file_bytes'] / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
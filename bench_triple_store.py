@@ -0,0 +1,100 @@
+"""
+Comparativa entre el grafo rdflib y el almacén compacto de ids enteros
+(triple_store.CompactTripleStore): memoria ocupada y latencia de las
+consultas que usa la búsqueda local.
+
+Uso:
+    python bench_triple_store.py [fichero.rdf]
+"""
+import gc
+import statistics
+import sys
+import time
+import tracemalloc
+
+from rdflib import Graph, Namespace, RDF, RDFS
+
+from triple_store import CompactTripleStore
+
+NS = Namespace("http://www.semanticweb.org/ontologies/reposteria#")
+
+
+def traced(build):
+    """Ejecutar build() y devolver (resultado, bytes asignados que siguen vivos)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def timeit(operation, items, repetitions=5):
+    """Latencia media (µs) de operation(item) sobre items"""
+    samples = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        for item in items:
+            operation(item)
+        samples.append((time.perf_counter() - start) / max(len(items), 1) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 else "reposteria_poblada_google.rdf"
+
+    def parse():
+        graph = Graph()
+        graph.parse(source, format="xml")
+        return graph
+
+    graph, graph_bytes = traced(parse)
+    store, store_bytes = traced(lambda: CompactTripleStore.from_graph(graph))
+
+    print(f"Ontología: {source} ({len(graph)} tripletas)")
+    print("\nMEMORIA")
+    print(f"  Grafo rdflib:              {graph_bytes / 1024:10.1f} KiB")
+    print(f"  Almacén compacto (total):  {store_bytes / 1024:10.1f} KiB  "
+          f"(comparte los objetos término con el grafo)")
+    print(f"  ... permutaciones NumPy:   {store.memory_bytes() / 1024:10.1f} KiB")
+
+    subjects = sorted(set(graph.subjects(RDF.type, None)), key=str)
+    classes = sorted(store.classes(), key=str)
+    ingredients = sorted(set(graph.objects(None, NS.tieneIngrediente)), key=str)
+
+    def rdflib_superclasses(cls):
+        found = set()
+        for sup in graph.objects(cls, RDFS.subClassOf):
+            found.add(sup)
+            found |= rdflib_superclasses(sup)
+        return found
+
+    cases = [
+        ("objects(s, nombre)", subjects,
+         lambda s: list(graph.objects(s, NS.nombre)),
+         lambda s: store.objects(s, NS.nombre)),
+        ("predicate_objects(s)", subjects,
+         lambda s: list(graph.predicate_objects(s)),
+         lambda s: store.predicate_objects(s)),
+        ("subjects(tieneIngrediente, o)", ingredients,
+         lambda o: list(graph.subjects(NS.tieneIngrediente, o)),
+         lambda o: store.subjects(NS.tieneIngrediente, o)),
+        ("superclases transitivas", classes,
+         rdflib_superclasses,
+         lambda c: store.superclasses(c)),
+        ("usada_en (?, ?, o)", ingredients[:20],
+         lambda o: [s for s, p, x in graph if str(x) == str(o)],
+         lambda o: store.referencing_subjects(o)),
+    ]
+
+    print("\nLATENCIA (µs por consulta, mediana)")
+    print(f"  {'consulta':<32} {'rdflib':>10} {'compacto':>10} {'x':>7}")
+    for name, items, rdflib_op, store_op in cases:
+        rdflib_us = timeit(rdflib_op, items)
+        store_us = timeit(store_op, items)
+        print(f"  {name:<32} {rdflib_us:>10.2f} {store_us:>10.2f} {rdflib_us / store_us:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Medición del servidor pre-fork (serve.py) al escalar de 1 a N trabajadores.
+
+Para cada número de trabajadores arranca serve.py, mide el tiempo hasta
+que responde la primera petición, lanza unas búsquedas de calentamiento
+y lee de /proc la memoria de cada proceso:
+
+    RSS      memoria residente (incluye páginas compartidas)
+    PSS      parte proporcional de las páginas compartidas
+    Privada  páginas propias del proceso (lo que cuesta cada trabajador)
+
+Uso (solo Linux):
+    python bench_workers.py [max_trabajadores] [puerto]
+"""
+import os
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+WARMUP_QUERIES = ['chocolate', 'harina', 'pastel', 'azucar', 'galleta', 'mantequilla']
+
+
+def read_memory(pid):
+    """RSS, PSS y memoria privada (KiB) según /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    private = fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+    return fields.get('Rss', 0), fields.get('Pss', 0), private
+
+
+def children_of(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def wait_until_ready(base_url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/api/ready", timeout=1).read()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def warm_up(base_url, workers):
+    """Repartir búsquedas entre los trabajadores para tocar la memoria compartida"""
+    for _ in range(workers * 3):
+        for query in WARMUP_QUERIES:
+            data = urllib.parse.urlencode({'term': query, 'language': 'es'}).encode()
+            urllib.request.urlopen(f"{base_url}/", data=data, timeout=30).read()
+
+
+def measure(workers, port):
+    base_url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        if not wait_until_ready(base_url):
+            raise RuntimeError("el servidor no arrancó a tiempo")
+        startup = time.perf_counter() - start
+        warm_up(base_url, workers)
+
+        master = read_memory(process.pid)
+        worker_memory = [read_memory(pid) for pid in children_of(process.pid)]
+        return startup, master, worker_memory
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 4)
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+
+    print(f"{'trab.':>5} {'arranque s':>10} {'maestro RSS':>12} {'RSS/trab':>10} "
+          f"{'PSS/trab':>10} {'priv/trab':>10} {'total PSS':>10}   (KiB)")
+
+    for workers in range(1, max_workers + 1):
+        startup, master, worker_memory = measure(workers, port)
+        n = max(len(worker_memory), 1)
+        rss = sum(m[0] for m in worker_memory) / n
+        pss = sum(m[1] for m in worker_memory) / n
+        private = sum(m[2] for m in worker_memory) / n
+        total_pss = master[1] + sum(m[1] for m in worker_memory)
+        print(f"{workers:>5} {startup:>10.2f} {master[0]:>12} {rss:>10.0f} "
+              f"{pss:>10.0f} {private:>10.0f} {total_pss:>10}")
+
+
+if __name__ == "__main__":
+    main()
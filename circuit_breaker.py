@@ -0,0 +1,155 @@
+"""
+Cortocircuito (circuit breaker) para los endpoints SPARQL de DBpedia.
+
+Cada endpoint tiene su propio circuito:
+
+- CERRADO: las consultas pasan. Se guarda el resultado de las últimas
+  'window' llamadas; si al menos 'min_calls' de ellas y una proporción
+  'failure_rate' han fallado, el circuito se abre.
+- ABIERTO: las consultas fallan al instante (CircuitOpenError) sin ocupar
+  un hilo esperando el timeout. Pasados 'open_seconds' pasa a semiabierto.
+- SEMIABIERTO: se deja pasar una única consulta de prueba; si va bien se
+  cierra y si falla vuelve a abrirse.
+
+Además cada endpoint admite como mucho 'max_concurrent' consultas a la
+vez; el resto también falla al instante en lugar de hacer cola.
+"""
+from collections import deque
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_BREAKER_CONFIG = {
+    'window': 20,            # Últimas llamadas que se tienen en cuenta
+    'min_calls': 4,          # Mínimo de llamadas antes de poder abrir
+    'failure_rate': 0.5,     # Proporción de fallos que abre el circuito
+    'open_seconds': 30.0,    # Tiempo abierto antes de probar de nuevo
+    'max_concurrent': 4,     # Consultas simultáneas por endpoint
+}
+
+
+class CircuitOpenError(Exception):
+    """El endpoint no acepta consultas ahora mismo (abierto o saturado)"""
+
+    def __init__(self, name, reason, retry_after=0.0):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Estado de salud y límite de concurrencia de un endpoint"""
+
+    def __init__(self, name, config=None):
+        self.name = name
+        self.config = dict(DEFAULT_BREAKER_CONFIG, **(config or {}))
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.config['max_concurrent'])
+        self._outcomes = deque(maxlen=self.config['window'])   # True = éxito
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._last_error = None
+        self.rejected = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.config['open_seconds']:
+            self._state = HALF_OPEN
+            self._trial_running = False
+        return self._state
+
+    def acquire(self):
+        """Reservar un hueco para consultar o lanzar CircuitOpenError al instante"""
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN:
+                self.rejected += 1
+                retry_after = self.config['open_seconds'] - (time.monotonic() - self._opened_at)
+                raise CircuitOpenError(self.name, "abierto", max(0.0, retry_after))
+            if state == HALF_OPEN:
+                if self._trial_running:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, "probando", self.config['open_seconds'])
+                self._trial_running = True
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+                if self._state == HALF_OPEN:
+                    self._trial_running = False
+            raise CircuitOpenError(self.name, "saturado")
+
+    def release(self):
+        self._slots.release()
+
+    def record_success(self):
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._outcomes.clear()
+                self._state = CLOSED
+                self._trial_running = False
+            self._outcomes.append(True)
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._last_error = str(error)[:200] if error else None
+            self._outcomes.append(False)
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            failures = self._outcomes.count(False)
+            if (len(self._outcomes) >= self.config['min_calls']
+                    and failures / len(self._outcomes) >= self.config['failure_rate']):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trial_running = False
+        print(f"⚡ Circuito abierto para {self.name} durante {self.config['open_seconds']:.0f}s")
+
+    def status(self):
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            status = {
+                "state": state,
+                "calls": calls,
+                "failures": self._outcomes.count(False),
+                "rejected": self.rejected,
+                "last_error": self._last_error,
+            }
+            if state == OPEN:
+                status["retry_after"] = round(
+                    max(0.0, self.config['open_seconds'] - (time.monotonic() - self._opened_at)), 1)
+            return status
+
+
+class BreakerRegistry:
+    """Un circuito por endpoint, creado la primera vez que se usa"""
+
+    def __init__(self, config=None):
+        self.config = config
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, self.config)
+            return breaker
+
+    def status(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.status() for name, breaker in breakers.items()}
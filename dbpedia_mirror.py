@@ -0,0 +1,389 @@
+"""
+Réplica local (SQLite) del subconjunto de DBpedia que usa el buscador.
+
+Descarga los recursos de las categorías Desserts, Cakes, Pastries y
+Cookies (las mismas que usa el poblador) con sus etiquetas, abstracts,
+descripciones, miniaturas e ingredientes en es/en/fr, y los guarda en
+una base SQLite con índices. Con la réplica presente, la pestaña de
+DBpedia responde en milisegundos sin llamadas remotas.
+
+Uso:
+    python dbpedia_mirror.py build               # descarga completa (fichero nuevo)
+    python dbpedia_mirror.py refresh             # solo recursos nuevos o con otra revisión
+    python dbpedia_mirror.py stats
+
+La actualización compara dbo:wikiPageRevisionID: solo se vuelven a
+pedir los recursos cuya revisión ha cambiado y se borran los que ya no
+están en las categorías. Todo se escribe en una transacción, así que la
+aplicación, que abre la réplica en solo lectura, ve la versión anterior
+o la nueva, nunca una mezcla.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from SPARQLWrapper import SPARQLWrapper, JSON
+
+from text_utils import normalize_text
+
+DEFAULT_MIRROR_FILE = "dbpedia_mirror.sqlite"
+MIRROR_ENDPOINT = "https://dbpedia.org/sparql"
+MIRROR_LANGUAGES = ("es", "en", "fr")
+MIRROR_CATEGORIES = ("Desserts", "Cakes", "Pastries", "Cookies")
+
+LISTING_PAGE_SIZE = 1000
+DETAIL_BATCH_SIZE = 25
+MAX_INGREDIENTS = 15
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    uri TEXT PRIMARY KEY,
+    revision INTEGER,
+    thumbnail TEXT,
+    fetched_at REAL
+);
+CREATE TABLE IF NOT EXISTS labels (
+    uri TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    label TEXT NOT NULL,
+    label_norm TEXT NOT NULL,
+    PRIMARY KEY (uri, lang)
+);
+CREATE INDEX IF NOT EXISTS labels_by_lang ON labels (lang, label_norm);
+CREATE TABLE IF NOT EXISTS texts (
+    uri TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    abstract TEXT,
+    description TEXT,
+    PRIMARY KEY (uri, lang)
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    uri TEXT NOT NULL,
+    lang TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    ingredient TEXT NOT NULL,
+    PRIMARY KEY (uri, lang, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def clean_ingredient(value):
+    """Misma limpieza que la aplicación: nombre del recurso y sin paréntesis"""
+    value = value.strip()
+    if "http://" in value:
+        value = value.split("/")[-1].replace("_", " ")
+    value = re.sub(r'\([^)]*\)', '', value).strip()
+    return value if len(value) > 1 else None
+
+
+# ===============================================
+# LECTURA (usada por app.py)
+# ===============================================
+class DBpediaMirror:
+    """Réplica abierta en solo lectura; una conexión por hilo"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.languages = set(self._query("SELECT DISTINCT lang FROM labels"))
+
+    @classmethod
+    def open_if_exists(cls, path):
+        if not path or not os.path.exists(path):
+            return None
+        mirror = cls(path)
+        print(f"✓ Réplica local de DBpedia: {path} ({mirror.stats()['resources']} recursos)")
+        return mirror
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def _query(self, sql, params=()):
+        return [row[0] if len(row) == 1 else row for row in self._connection().execute(sql, params)]
+
+    def has_language(self, lang):
+        return lang in self.languages
+
+    def search(self, tokens, lang, limit=3, offset=0):
+        """
+        Recursos cuya etiqueta en 'lang' contiene todos los tokens (sin
+        acentos ni mayúsculas), como el filtro bif:contains de la consulta
+        remota. Devuelve (filas con forma de bindings SPARQL, {uri: ingredientes}).
+        """
+        words = [normalize_text(token) for token in tokens if normalize_text(token)] or [""]
+        patterns = ["%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                    for word in words]
+        label_filter = " AND ".join("l.label_norm LIKE ? ESCAPE '\\'" for _ in patterns)
+        conn = self._connection()
+        rows = conn.execute(
+            f"""
+            SELECT l.uri, l.label, r.thumbnail, t.abstract, t.description
+            FROM labels l
+            JOIN resources r ON r.uri = l.uri
+            LEFT JOIN texts t ON t.uri = l.uri AND t.lang = l.lang
+            WHERE l.lang = ? AND {label_filter}
+            ORDER BY l.label_norm
+            LIMIT ? OFFSET ?
+            """,
+            [lang] + patterns + [limit, offset],
+        ).fetchall()
+
+        bindings = []
+        for uri, label, thumbnail, abstract, description in rows:
+            binding = {"item": {"value": uri}, "label": {"value": label}}
+            if thumbnail:
+                binding["thumbnail"] = {"value": thumbnail}
+            if abstract:
+                binding["abstract"] = {"value": abstract}
+            if description:
+                binding["description"] = {"value": description}
+            bindings.append(binding)
+
+        ingredients = {}
+        uris = [row[0] for row in rows]
+        if uris:
+            placeholders = ",".join("?" * len(uris))
+            for uri, ingredient in conn.execute(
+                    f"SELECT uri, ingredient FROM ingredients WHERE lang = ? AND uri IN ({placeholders}) "
+                    f"ORDER BY uri, position", [lang] + uris):
+                ingredients.setdefault(uri, []).append(ingredient)
+
+        return bindings, ingredients
+
+    def stats(self):
+        conn = self._connection()
+        meta = dict(conn.execute("SELECT key, value FROM meta"))
+        return {
+            "path": self.path,
+            "resources": conn.execute("SELECT COUNT(*) FROM resources").fetchone()[0],
+            "languages": sorted(self.languages),
+            "updated_at": meta.get("updated_at"),
+        }
+
+
+# ===============================================
+# CONSTRUCCIÓN Y ACTUALIZACIÓN
+# ===============================================
+class MirrorBuilder:
+    """Descarga el subconjunto de postres y lo escribe en la réplica"""
+
+    def __init__(self, endpoint=MIRROR_ENDPOINT, languages=MIRROR_LANGUAGES, timeout=120):
+        self.languages = languages
+        self.sparql = SPARQLWrapper(endpoint)
+        self.sparql.setReturnFormat(JSON)
+        self.sparql.setTimeout(timeout)
+        self.sparql.addCustomHttpHeader("User-Agent", "Mozilla/5.0 (compatible; OntologyPopulator/1.0)")
+        self.queries = 0
+
+    def _select(self, query, retries=3):
+        for attempt in range(retries):
+            try:
+                self.sparql.setQuery(query)
+                self.queries += 1
+                return self.sparql.query().convert()["results"]["bindings"]
+            except Exception as e:
+                if attempt == retries - 1:
+                    raise
+                print(f"  ⚠ Reintentando consulta ({attempt + 1}/{retries}): {str(e)[:80]}")
+                time.sleep(2 ** attempt)
+
+    def _lang_filter(self, variable):
+        return "FILTER(LANG(?{}) IN ({}))".format(variable, ", ".join(f'"{l}"' for l in self.languages))
+
+    def list_revisions(self, limit=None):
+        """{uri: revisión} de todos los recursos de las categorías"""
+        categories = " UNION ".join(
+            f"{{ ?r dct:subject <http://dbpedia.org/resource/Category:{c}> . }}" for c in MIRROR_CATEGORIES)
+        revisions = {}
+        offset = 0
+        while True:
+            page_size = LISTING_PAGE_SIZE if limit is None else min(LISTING_PAGE_SIZE, limit - offset)
+            if page_size <= 0:
+                break
+            bindings = self._select(f"""
+                PREFIX dct: <http://purl.org/dc/terms/>
+                PREFIX dbo: <http://dbpedia.org/ontology/>
+                SELECT DISTINCT ?r ?rev WHERE {{
+                    {categories}
+                    OPTIONAL {{ ?r dbo:wikiPageRevisionID ?rev . }}
+                    FILTER (!REGEX(STR(?r), "Categ", "i"))
+                }}
+                ORDER BY ?r
+                LIMIT {page_size}
+                OFFSET {offset}
+            """)
+            for b in bindings:
+                rev = b.get("rev", {}).get("value")
+                revisions[b["r"]["value"]] = int(rev) if rev and rev.isdigit() else None
+            offset += len(bindings)
+            if len(bindings) < page_size:
+                break
+        return revisions
+
+    def fetch_details(self, uris):
+        """Etiquetas, textos, miniatura e ingredientes de un lote de recursos"""
+        values = " ".join(f"<{uri}>" for uri in uris)
+        details = {uri: {"labels": {}, "abstracts": {}, "descriptions": {}, "thumbnail": None,
+                         "ingredients": {lang: [] for lang in self.languages}} for uri in uris}
+
+        for field, prop in (("labels", "rdfs:label"), ("abstracts", "dbo:abstract"),
+                            ("descriptions", "dbo:description")):
+            for b in self._select(f"""
+                PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+                PREFIX dbo: <http://dbpedia.org/ontology/>
+                SELECT ?r ?v WHERE {{
+                    VALUES ?r {{ {values} }}
+                    ?r {prop} ?v .
+                    {self._lang_filter('v')}
+                }}
+            """):
+                details[b["r"]["value"]][field][b["v"]["xml:lang"]] = b["v"]["value"]
+
+        for b in self._select(f"""
+            PREFIX dbo: <http://dbpedia.org/ontology/>
+            SELECT ?r ?thumb WHERE {{
+                VALUES ?r {{ {values} }}
+                ?r dbo:thumbnail ?thumb .
+            }}
+        """):
+            details[b["r"]["value"]]["thumbnail"] = b["thumb"]["value"]
+
+        # Ingredientes: etiqueta en cada idioma si el ingrediente es un recurso
+        # con etiqueta; si es un literal, el mismo texto para todos
+        for b in self._select(f"""
+            PREFIX dbo: <http://dbpedia.org/ontology/>
+            PREFIX dbp: <http://dbpedia.org/property/>
+            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+            SELECT ?r ?ing ?label WHERE {{
+                VALUES ?r {{ {values} }}
+                {{ ?r dbo:ingredient ?ing . }} UNION {{ ?r dbp:ingredient ?ing . }}
+                UNION {{ ?r dbp:ingredients ?ing . }} UNION {{ ?r dbp:mainIngredient ?ing . }}
+                OPTIONAL {{ ?ing rdfs:label ?label . {self._lang_filter('label')} }}
+            }}
+        """):
+            per_lang = details[b["r"]["value"]]["ingredients"]
+            if "label" in b:
+                targets = [b["label"]["xml:lang"]]
+                name = clean_ingredient(b["label"]["value"])
+            else:
+                targets = list(self.languages)
+                name = clean_ingredient(b["ing"]["value"])
+            for lang in targets:
+                if name and name not in per_lang[lang] and len(per_lang[lang]) < MAX_INGREDIENTS:
+                    per_lang[lang].append(name)
+
+        return details
+
+    def sync(self, conn, limit=None):
+        """
+        Llevar la réplica al estado actual de DBpedia: descarga solo los
+        recursos nuevos o con otra revisión y borra los desaparecidos
+        """
+        start = time.perf_counter()
+        remote = self.list_revisions(limit)
+        local = dict(conn.execute("SELECT uri, revision FROM resources"))
+
+        changed = [uri for uri, rev in remote.items() if uri not in local or rev is None or local[uri] != rev]
+        removed = [uri for uri in local if uri not in remote]
+        print(f"  Recursos remotos: {len(remote)} · nuevos o cambiados: {len(changed)} · eliminados: {len(removed)}")
+
+        fetched = {}
+        for i in range(0, len(changed), DETAIL_BATCH_SIZE):
+            batch = changed[i:i + DETAIL_BATCH_SIZE]
+            fetched.update(self.fetch_details(batch))
+            print(f"  · {min(i + DETAIL_BATCH_SIZE, len(changed))}/{len(changed)} recursos descargados")
+
+        # Una sola transacción: los lectores ven la réplica anterior o la nueva
+        with conn:
+            for uri in removed + list(fetched):
+                for table in ("resources", "labels", "texts", "ingredients"):
+                    conn.execute(f"DELETE FROM {table} WHERE uri = ?", (uri,))
+            now = time.time()
+            for uri, data in fetched.items():
+                conn.execute("INSERT INTO resources (uri, revision, thumbnail, fetched_at) VALUES (?, ?, ?, ?)",
+                             (uri, remote[uri], data["thumbnail"], now))
+                for lang, label in data["labels"].items():
+                    conn.execute("INSERT INTO labels (uri, lang, label, label_norm) VALUES (?, ?, ?, ?)",
+                                 (uri, lang, label, normalize_text(label)))
+                for lang in set(data["abstracts"]) | set(data["descriptions"]):
+                    conn.execute("INSERT INTO texts (uri, lang, abstract, description) VALUES (?, ?, ?, ?)",
+                                 (uri, lang, data["abstracts"].get(lang), data["descriptions"].get(lang)))
+                for lang, names in data["ingredients"].items():
+                    conn.executemany("INSERT INTO ingredients (uri, lang, position, ingredient) VALUES (?, ?, ?, ?)",
+                                     [(uri, lang, i, name) for i, name in enumerate(names)])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated_at', ?)",
+                         (time.strftime("%Y-%m-%d %H:%M:%S"),))
+
+        print(f"✓ Réplica sincronizada en {time.perf_counter() - start:.1f}s ({self.queries} consultas)")
+        return {"remote": len(remote), "changed": len(changed), "removed": len(removed)}
+
+
+def open_for_writing(path):
+    conn = sqlite3.connect(path)
+    # WAL: la aplicación puede seguir leyendo mientras se actualiza
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def build(path, endpoint=MIRROR_ENDPOINT, limit=None):
+    """Descarga completa en un fichero nuevo que sustituye al anterior al terminar"""
+    tmp_path = path + ".tmp"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(tmp_path + suffix):
+            os.remove(tmp_path + suffix)
+    conn = open_for_writing(tmp_path)
+    try:
+        MirrorBuilder(endpoint).sync(conn, limit)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+
+
+def refresh(path, endpoint=MIRROR_ENDPOINT, limit=None):
+    """Actualizar en el sitio solo lo que ha cambiado"""
+    if not os.path.exists(path):
+        print(f"⚠ {path} no existe, se construye desde cero")
+        return build(path, endpoint, limit)
+    conn = open_for_writing(path)
+    try:
+        MirrorBuilder(endpoint).sync(conn, limit)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Réplica local de los postres de DBpedia")
+    parser.add_argument("command", choices=["build", "refresh", "stats"])
+    parser.add_argument("--db", default=os.environ.get("DBPEDIA_MIRROR", DEFAULT_MIRROR_FILE))
+    parser.add_argument("--endpoint", default=MIRROR_ENDPOINT)
+    parser.add_argument("--limit", type=int, default=None, help="Máximo de recursos (para pruebas)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.db, args.endpoint, args.limit)
+    elif args.command == "refresh":
+        refresh(args.db, args.endpoint, args.limit)
+
+    mirror = DBpediaMirror.open_if_exists(args.db)
+    if mirror is None:
+        print(f"✗ No existe la réplica {args.db}")
+        sys.exit(1)
+    print(mirror.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Paginación de DBpedia por bloques con precarga en segundo plano.
+
+La interfaz pide los resultados de 3 en 3 ("cargar más"). En lugar de
+lanzar una consulta remota LIMIT 3 OFFSET n por cada clic, se pide una
+vez un bloque de filas (30 por defecto), se guarda por (término, idioma,
+bloque) y las páginas se cortan de él.
+
+Las filas de un bloque llegan sin ingredientes: la consulta de
+ingredientes es una por fila, así que solo se hace para las filas de la
+página servida. Al servir una página se completan en segundo plano las
+filas de la siguiente y, si quedan pocas en el bloque, se pide el
+bloque siguiente, de modo que el próximo clic no espera a la red.
+
+Un bloque vacío por un fallo (timeout, conexión rechazada) no es lo
+mismo que un término sin resultados: fetch_block lo marca con
+meta['failed'] y solo se guarda failed_ttl_seconds.
+
+AsyncBlockPager hace lo mismo dentro de un bucle de asyncio (asgi.py):
+las descargas y los ingredientes son corrutinas y ninguna petición
+ocupa un hilo mientras espera a DBpedia.
+"""
+import asyncio
+import threading
+import time
+
+from result_cache import LRUCache
+
+DEFAULT_PAGER_CONFIG = {
+    'block_size': 30,        # Filas por consulta remota
+    'ttl_seconds': 3600,     # Vida de un bloque en cache
+    'failed_ttl_seconds': 5, # Vida de un bloque cuya consulta falló (meta['failed'])
+    'prefetch_pages': 2,     # Precargar el siguiente bloque si quedan menos de N páginas
+    'max_blocks': 256,
+}
+
+
+class ResultBlock:
+    """Filas de un bloque y los datos del endpoint que las devolvió"""
+
+    def __init__(self, items, meta, block_size):
+        self.items = items
+        self.meta = meta                     # p. ej. endpoint y propiedad de ingredientes
+        self.complete = len(items) < block_size  # No hay más filas después
+        # Alguna consulta del bloque falló (timeout, conexión): no es un
+        # resultado vacío de verdad y solo se guarda unos segundos
+        self.failed = bool(meta.get("failed")) if isinstance(meta, dict) else False
+        self.fetched_at = time.monotonic()
+        self.lock = threading.Lock()         # Completar filas una sola vez
+        self.async_lock = None               # Ídem en AsyncBlockPager (asyncio.Lock)
+
+
+class BlockPager:
+    """
+    fetch_block(key, block_no, block_size) -> (filas, meta)
+    enrich(filas, meta) completa las filas en el sitio (p. ej. ingredientes)
+    y devuelve las que completó (None = todas); las demás se vuelven a
+    intentar la próxima vez que se sirvan
+    """
+
+    def __init__(self, fetch_block, enrich, config=None):
+        self.fetch_block = fetch_block
+        self.enrich = enrich
+        self.config = dict(DEFAULT_PAGER_CONFIG, **(config or {}))
+        self._blocks = LRUCache(self.config['max_blocks'])
+        self._pending = {}                   # (key, bloque) -> Event de la descarga en curso
+        self._pending_lock = threading.Lock()
+        self.prefetches = 0
+
+    def _fresh(self, block):
+        ttl = self.config['failed_ttl_seconds'] if block.failed else self.config['ttl_seconds']
+        return time.monotonic() - block.fetched_at < ttl
+
+    def _block(self, key, block_no):
+        """Bloque desde la cache o descargado; las descargas simultáneas se comparten"""
+        cache_key = (key, block_no)
+        block = self._blocks.get(cache_key)
+        if block is not None and self._fresh(block):
+            return block
+
+        with self._pending_lock:
+            event = self._pending.get(cache_key)
+            owner = event is None
+            if owner:
+                event = self._pending[cache_key] = threading.Event()
+
+        if not owner:
+            # Otra petición (o la precarga) ya lo está descargando
+            event.wait()
+            block = self._blocks.get(cache_key)
+            if block is not None:
+                return block
+
+        try:
+            items, meta = self.fetch_block(key, block_no, self.config['block_size'])
+            block = ResultBlock(items, meta, self.config['block_size'])
+            self._blocks.put(cache_key, block)
+            return block
+        finally:
+            if owner:
+                with self._pending_lock:
+                    self._pending.pop(cache_key, None)
+                event.set()
+
+    def _enrich(self, block, start, end):
+        with block.lock:
+            pending = [item for item in block.items[start:end] if not item.get('_enriched')]
+            if pending:
+                completed = self.enrich(pending, block.meta)
+                for item in (pending if completed is None else completed):
+                    item['_enriched'] = True
+
+    def _slices(self, key, offset, limit):
+        """(bloque, inicio, fin) que cubren [offset, offset + limit); fin == inicio si el bloque no llega"""
+        block_size = self.config['block_size']
+        position, end = offset, offset + limit
+        while position < end:
+            block_no, start = divmod(position, block_size)
+            block = self._block(key, block_no)
+            stop = min(len(block.items), start + (end - position))
+            yield block, start, max(start, stop)
+            if stop > start:
+                position += stop - start
+            if block.complete or stop < block_size:
+                break
+
+    def page(self, key, offset, limit):
+        """
+        Filas [offset, offset + limit) completas. Devuelve (filas, hay_más,
+        falló): falló indica que algún bloque usado viene de una consulta
+        fallida o que alguna fila se quedó sin ingredientes, así que la
+        página no debe guardarse como definitiva.
+        Puede lanzar las excepciones de fetch_block (p. ej. cortocircuito).
+        """
+        page = []
+        last = None
+        failed = False
+        for block, start, stop in self._slices(key, offset, limit):
+            failed = failed or block.failed
+            if stop > start:
+                self._enrich(block, start, stop)
+                page.extend(block.items[start:stop])
+                last = (block, stop)
+
+        has_more = bool(last) and not (last[0].complete and last[1] >= len(last[0].items))
+        if has_more:
+            self._prefetch(key, offset + limit, limit)
+        failed = failed or not all(item.get('_enriched') for item in page)
+        return [{k: v for k, v in item.items() if k != '_enriched'} for item in page], has_more, failed
+
+    def _prefetch(self, key, next_offset, limit):
+        """Completar la página siguiente y pedir el bloque siguiente si hace falta"""
+        block_size = self.config['block_size']
+        remaining = block_size - next_offset % block_size
+        next_block_needed = remaining < limit * self.config['prefetch_pages']
+
+        def run():
+            try:
+                for block, start, stop in self._slices(key, next_offset, limit):
+                    self._enrich(block, start, stop)
+                if next_block_needed:
+                    self._block(key, next_offset // block_size + 1)
+                self.prefetches += 1
+            except Exception as e:
+                # La precarga es oportunista: si falla, el clic la hará en primer plano
+                print(f"⚠ Precarga de DBpedia fallida: {e}")
+
+        threading.Thread(target=run, name="dbpedia-prefetch", daemon=True).start()
+
+    def stats(self):
+        stats = self._blocks.stats()
+        stats["prefetches"] = self.prefetches
+        return stats
+
+
+class AsyncBlockPager(BlockPager):
+    """
+    BlockPager para un bucle de eventos: fetch_block y enrich son
+    corrutinas, una descarga en curso se comparte con un futuro y la
+    precarga es una tarea del bucle. Usar siempre desde el mismo bucle.
+    """
+
+    def __init__(self, fetch_block, enrich, config=None):
+        super().__init__(fetch_block, enrich, config)
+        self._tasks = set()                  # Precargas en curso (referencia fuerte)
+
+    async def _block(self, key, block_no):
+        cache_key = (key, block_no)
+        block = self._blocks.get(cache_key)
+        if block is not None and self._fresh(block):
+            return block
+
+        future = self._pending.get(cache_key)
+        if future is not None:
+            # Si la descarga compartida falla, esta petición lo intenta por su cuenta
+            block = await future
+            if block is not None:
+                return block
+
+        future = self._pending[cache_key] = asyncio.get_running_loop().create_future()
+        block = None
+        try:
+            items, meta = await self.fetch_block(key, block_no, self.config['block_size'])
+            block = ResultBlock(items, meta, self.config['block_size'])
+            self._blocks.put(cache_key, block)
+            return block
+        finally:
+            if self._pending.get(cache_key) is future:
+                del self._pending[cache_key]
+            future.set_result(block)
+
+    async def _enrich(self, block, start, end):
+        if block.async_lock is None:
+            block.async_lock = asyncio.Lock()
+        async with block.async_lock:
+            pending = [item for item in block.items[start:end] if not item.get('_enriched')]
+            if pending:
+                completed = await self.enrich(pending, block.meta)
+                for item in (pending if completed is None else completed):
+                    item['_enriched'] = True
+
+    async def _slices(self, key, offset, limit):
+        block_size = self.config['block_size']
+        slices = []
+        position, end = offset, offset + limit
+        while position < end:
+            block_no, start = divmod(position, block_size)
+            block = await self._block(key, block_no)
+            stop = min(len(block.items), start + (end - position))
+            slices.append((block, start, max(start, stop)))
+            if stop > start:
+                position += stop - start
+            if block.complete or stop < block_size:
+                break
+        return slices
+
+    async def page(self, key, offset, limit):
+        page = []
+        last = None
+        failed = False
+        for block, start, stop in await self._slices(key, offset, limit):
+            failed = failed or block.failed
+            if stop > start:
+                await self._enrich(block, start, stop)
+                page.extend(block.items[start:stop])
+                last = (block, stop)
+
+        has_more = bool(last) and not (last[0].complete and last[1] >= len(last[0].items))
+        if has_more:
+            self._prefetch(key, offset + limit, limit)
+        failed = failed or not all(item.get('_enriched') for item in page)
+        return [{k: v for k, v in item.items() if k != '_enriched'} for item in page], has_more, failed
+
+    def _prefetch(self, key, next_offset, limit):
+        block_size = self.config['block_size']
+        remaining = block_size - next_offset % block_size
+        next_block_needed = remaining < limit * self.config['prefetch_pages']
+
+        async def run():
+            try:
+                for block, start, stop in await self._slices(key, next_offset, limit):
+                    await self._enrich(block, start, stop)
+                if next_block_needed:
+                    await self._block(key, next_offset // block_size + 1)
+                self.prefetches += 1
+            except Exception as e:
+                print(f"⚠ Precarga de DBpedia fallida: {e}")
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
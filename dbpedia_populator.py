@@ -7,20 +7,45 @@ from SPARQLWrapper import SPARQLWrapper, JSON
 from rdflib import Graph, Namespace, RDF, RDFS, Literal, URIRef
 from rdflib.namespace import XSD
 from deep_translator import GoogleTranslator
+import os
 import re
 import time
 
+from keyword_classifier import get_classifier
+from sqlite_store import open_graph
+from run_report import RunReport
+
 # Definir namespaces
 REP = Namespace("http://www.semanticweb.org/ontologies/reposteria#")
 OWL = Namespace("http://www.w3.org/2002/07/owl#")
 
 class DBpediaDeepTranslatorPopulator:
-    def __init__(self, rdf_file):
-        """Inicializar con el archivo RDF"""
-        self.graph = Graph()
+    def __init__(self, rdf_file, store_file=None, verbose=False):
+        """
+        Inicializar con el archivo RDF. Con store_file se escribe en el
+        almacén SQLite (sqlite_store.py): cada postre se confirma en una
+        transacción y la aplicación lo ve sin volver a parsear nada.
+        Con verbose, el informe de la ejecución incluye una traza por postre.
+        """
+        self.store_file = store_file
+        # Tiempos por fase, llamadas remotas y caches (ver run_report.py)
+        self.report = RunReport(verbose)
         try:
-            self.graph.parse(rdf_file, format="xml")
-            print(f"✓ Ontología cargada: {rdf_file}")
+            with self.report.phase("load"):
+                if store_file:
+                    self.graph = open_graph(store_file)
+                    if len(self.graph) == 0:
+                        # Almacén nuevo: partir de la ontología base
+                        base = Graph()
+                        base.parse(rdf_file, format="xml")
+                        for triple in base:
+                            self.graph.add(triple)
+                        self.graph.commit()
+                    print(f"✓ Almacén abierto: {store_file} ({len(self.graph)} tripletas)")
+                else:
+                    self.graph = Graph()
+                    self.graph.parse(rdf_file, format="xml")
+                    print(f"✓ Ontología cargada: {rdf_file}")
         except Exception as e:
             print(f"✗ Error cargando ontología: {e}")
             raise
@@ -55,6 +80,17 @@ class DBpediaDeepTranslatorPopulator:
         self.processed_desserts = set()
         self.translation_cache = {}  # Cache para evitar traducciones repetidas
         
+        # Clasificadores por palabras clave (reglas en classifier_rules.json)
+        self.dessert_classifier = get_classifier("dessert_class")
+        self.ingredient_classifier = get_classifier("ingredient_type")
+        self.dessert_classes = {}    # {nombre_en: clase}
+        self.ingredient_types = {}   # {ingrediente_en: clase}
+        
+    def _query_sparql(self):
+        """Ejecutar la consulta preparada, medida en el informe de la ejecución"""
+        with self.report.call("sparql"):
+            return self.sparql.query().convert()
+    
     def search_desserts_dbpedia(self, limit=15):
         """
         Buscar postres en DBpedia inglés
@@ -100,7 +136,7 @@ class DBpediaDeepTranslatorPopulator:
         
         try:
             print(f"\n  Consultando DBpedia inglés...")
-            results = self.sparql.query().convert()
+            results = self._query_sparql()
             desserts = results["results"]["bindings"]
             print(f"  ✓ Encontrados {len(desserts)} postres en inglés")
             return desserts
@@ -137,7 +173,7 @@ class DBpediaDeepTranslatorPopulator:
         self.sparql.setQuery(query)
         
         try:
-            results = self.sparql.query().convert()
+            results = self._query_sparql()
             ingredients = []
             for binding in results["results"]["bindings"]:
                 if 'ingredientLabel' in binding:
@@ -175,7 +211,7 @@ class DBpediaDeepTranslatorPopulator:
         self.sparql.setQuery(query)
         
         try:
-            results = self.sparql.query().convert()
+            results = self._query_sparql()
             if results["results"]["bindings"]:
                 result = results["results"]["bindings"][0]
                 if 'countryLabel' in result:
@@ -191,9 +227,15 @@ class DBpediaDeepTranslatorPopulator:
         if not text or text.strip() == "":
             return None
         
+        with self.report.phase("translation"):
+            return self._translate_text(text, target_lang, max_retries)
+    
+    def _translate_text(self, text, target_lang, max_retries):
         # Verificar cache
         cache_key = (text[:100], target_lang)  # Usar primeros 100 chars como key
-        if cache_key in self.translation_cache:
+        hit = cache_key in self.translation_cache
+        self.report.cache_lookup("translation", hit)
+        if hit:
             return self.translation_cache[cache_key]
         
         # Limitar longitud (deep-translator tiene límite de ~5000 chars)
@@ -204,7 +246,8 @@ class DBpediaDeepTranslatorPopulator:
         
         for attempt in range(max_retries):
             try:
-                translated = translator.translate(text)
+                with self.report.call("translation"):
+                    translated = translator.translate(text)
                 
                 # Guardar en cache
                 self.translation_cache[cache_key] = translated
@@ -213,6 +256,7 @@ class DBpediaDeepTranslatorPopulator:
             except Exception as e:
                 if attempt < max_retries - 1:
                     print(f"      ⚠ Reintentando traducción... ({attempt + 1}/{max_retries})")
+                    self.report.retry("translation")
                     time.sleep(1)
                     # Recrear traductor si falla
                     self.translators[target_lang] = GoogleTranslator(source='en', target=target_lang)
@@ -233,39 +277,23 @@ class DBpediaDeepTranslatorPopulator:
         return name
     
     def map_to_ontology_class(self, name_en):
-        """Mapear nombre inglés a clase de la ontología"""
-        name_lower = name_en.lower()
-        
-        if any(word in name_lower for word in ['cookie', 'biscuit', 'macaroon']):
-            return REP.Galleta
-        elif any(word in name_lower for word in ['mousse', 'pudding', 'custard', 'flan']):
-            return REP.PostreDeCuchara
-        elif any(word in name_lower for word in ['cake', 'tart', 'pie', 'pastry']):
-            return REP.Pastel
-        elif any(word in name_lower for word in ['candy', 'chocolate', 'truffle', 'bonbon']):
-            return REP.Confiteria
-        else:
-            return REP.Pastel
+        """Mapear nombre inglés a clase de la ontología (reglas de classifier_rules.json)"""
+        if name_en not in self.dessert_classes:
+            self.dessert_classes[name_en] = self.dessert_classifier.classify(name_en)
+        return REP[self.dessert_classes[name_en]]
     
     def classify_ingredient(self, ingredient_name):
-        """Clasificar ingrediente por tipo"""
-        ing_lower = ingredient_name.lower()
-        
-        animal_keywords = [
-            'egg', 'milk', 'cream', 'butter', 'cheese', 'yogurt', 
-            'gelatin', 'honey', 'whey', 'dairy', 'lard'
-        ]
-        if any(keyword in ing_lower for keyword in animal_keywords):
-            return REP.Animal
-        
-        aditivo_keywords = [
-            'extract', 'essence', 'powder', 'yeast', 'baking', 
-            'coloring', 'vanilla', 'soda', 'salt', 'cinnamon'
-        ]
-        if any(keyword in ing_lower for keyword in aditivo_keywords):
-            return REP.Aditivo
-        
-        return REP.Vegetal
+        """Clasificar ingrediente por tipo (reglas de classifier_rules.json)"""
+        if ingredient_name not in self.ingredient_types:
+            self.ingredient_types[ingredient_name] = self.ingredient_classifier.classify(ingredient_name)
+        return REP[self.ingredient_types[ingredient_name]]
+    
+    def classify_batch(self, dessert_names=(), ingredient_names=()):
+        """Clasificar de una vez (una pasada por clasificador) los nombres aún no vistos"""
+        for names, memo, classifier in ((dessert_names, self.dessert_classes, self.dessert_classifier),
+                                        (ingredient_names, self.ingredient_types, self.ingredient_classifier)):
+            pending = list(dict.fromkeys(name for name in names if name not in memo))
+            memo.update(zip(pending, classifier.classify_many(pending)))
     
     def create_ingredient(self, ingredient_name_en, target_lang, lang_code):
         """Crear o reutilizar ingrediente traducido"""
@@ -336,9 +364,13 @@ class DBpediaDeepTranslatorPopulator:
         else:
             print(f"    ⚠ Sin descripción ni abstract")
         
+        self.report.begin_trace(dessert=name_en, uri=dessert_uri)
+        
         # Obtener datos comunes
-        ingredients_en = self.get_dessert_ingredients(dessert_uri)
-        country_en = self.get_dessert_country(dessert_uri)
+        with self.report.phase("metadata"):
+            ingredients_en = self.get_dessert_ingredients(dessert_uri)
+            country_en = self.get_dessert_country(dessert_uri)
+        self.classify_batch(ingredient_names=ingredients_en)
         product_class = self.map_to_ontology_class(name_en)
         
         if ingredients_en:
@@ -350,10 +382,12 @@ class DBpediaDeepTranslatorPopulator:
         
         # Primero agregar versión en inglés
         print(f"\n    🇬🇧 Inglés (original):")
-        if self._add_dessert_version(
-            name_en, text_en, ingredients_en, country_en, 
-            product_class, dessert_uri, 'en', 'Inglés', None
-        ):
+        with self.report.phase("graph_build"):
+            added = self._add_dessert_version(
+                name_en, text_en, ingredients_en, country_en, 
+                product_class, dessert_uri, 'en', 'Inglés', None
+            )
+        if added:
             added_count += 1
         
         # Luego agregar versiones traducidas
@@ -386,17 +420,21 @@ class DBpediaDeepTranslatorPopulator:
                     country_translated = country_en
             
             # Agregar versión traducida
-            if self._add_dessert_version(
-                name_translated, text_translated, ingredients_en, 
-                country_translated, product_class, dessert_uri, 
-                lang_code, lang_name, lang_code
-            ):
+            with self.report.phase("graph_build"):
+                added = self._add_dessert_version(
+                    name_translated, text_translated, ingredients_en, 
+                    country_translated, product_class, dessert_uri, 
+                    lang_code, lang_name, lang_code
+                )
+            if added:
                 added_count += 1
             
             # Pausa para evitar rate limiting
-            time.sleep(0.3)
+            with self.report.phase("throttle"):
+                time.sleep(0.3)
         
         print(f"\n  ✓ Agregado en {added_count} idiomas")
+        self.report.end_trace(versions=added_count, ingredients=len(ingredients_en), country=country_en)
         return added_count
     
     def _add_dessert_version(self, name, text, ingredients_en, country, 
@@ -473,14 +511,18 @@ class DBpediaDeepTranslatorPopulator:
         print(f"{'='*70}\n")
         
         # Buscar postres en inglés
-        desserts = self.search_desserts_dbpedia(limit=num_desserts)
+        with self.report.phase("harvest"):
+            desserts = self.search_desserts_dbpedia(limit=num_desserts)
         
         if not desserts:
             print("⚠ No se encontraron postres")
             return
         
+        self.classify_batch(dessert_names=[d['name']['value'] for d in desserts])
+        
         total_versions = 0
         desserts_with_description = 0
+        triples_before = len(self.graph)
         
         for i, dessert in enumerate(desserts, 1):
             print(f"\n[{i}/{len(desserts)}]")
@@ -489,11 +531,25 @@ class DBpediaDeepTranslatorPopulator:
             if dessert.get('description', {}).get('value') or dessert.get('abstract', {}).get('value'):
                 desserts_with_description += 1
             
-            versions_added = self.add_dessert_with_translations(dessert)
+            try:
+                versions_added = self.add_dessert_with_translations(dessert)
+            except Exception:
+                # Con el almacén SQLite no queda ningún postre a medias
+                self.graph.rollback()
+                raise
+            # Un postre con todas sus traducciones = una transacción
+            with self.report.phase("serialization"):
+                self.graph.commit()
             total_versions += versions_added
+            self.report.count("desserts")
+            self.report.count("versions", versions_added)
             
             # Pausa entre postres
-            time.sleep(0.5)
+            with self.report.phase("throttle"):
+                time.sleep(0.5)
+        
+        self.report.count("triples_added", len(self.graph) - triples_before)
+        self.report.count("ingredients_created", len(self.created_ingredients))
         
         # Estadísticas finales
         print(f"\n{'='*70}")
@@ -516,7 +572,16 @@ class DBpediaDeepTranslatorPopulator:
         print(f"{'='*70}")
     
     def save(self, output_file):
-        """Guardar la ontología actualizada"""
+        """Guardar la ontología actualizada (con almacén SQLite basta con confirmar)"""
+        with self.report.phase("serialization"):
+            self._save(output_file)
+    
+    def _save(self, output_file):
+        if self.store_file:
+            self.graph.commit()
+            self.graph.close(commit_pending_transaction=True)
+            print(f"\n✓ Cambios confirmados en el almacén: {self.store_file}")
+            return
         try:
             self.graph.serialize(destination=output_file, format='xml')
             print(f"\n✓ Ontología guardada exitosamente en: {output_file}")
@@ -535,14 +600,20 @@ if __name__ == "__main__":
     # CONFIGURACIÓN
     input_file = "reposteria.rdf"
     output_file = "reposteria_poblada_google.rdf"
+    # Con ONTOLOGY_STORE=ontologia.sqlite se escribe en el almacén SQLite
+    store_file = os.environ.get("ONTOLOGY_STORE")
+    # Informe JSON de la ejecución (POPULATOR_VERBOSE=1 añade trazas por postre)
+    report_file = os.environ.get("POPULATOR_REPORT", "populator_report.json")
+    verbose = os.environ.get("POPULATOR_VERBOSE") == "1"
     
     try:
-        populator = DBpediaDeepTranslatorPopulator(input_file)
+        populator = DBpediaDeepTranslatorPopulator(input_file, store_file, verbose)
         
         # Ajusta cuántos postres quieres procesar
         populator.populate_with_translations(num_desserts=50)
         
         populator.save(output_file)
+        print(f"✓ Informe de la ejecución: {populator.report.write(report_file)}")
         
         print("\n" + "=" * 70)
         print("✓ PROCESO COMPLETADO EXITOSAMENTE")
@@ -0,0 +1,224 @@
+"""
+Sustituto local del endpoint SPARQL de DBpedia para pruebas de carga.
+
+Responde a las mismas consultas que hace app.py (búsqueda por etiqueta
+con bif:contains o CONTAINS, LIMIT/OFFSET y la consulta ligera de
+ingredientes) con
+filas sintéticas deterministas en formato application/sparql-results+json,
+después de una latencia configurable (mediana + cola log-normal) y con
+una tasa de errores 5xx opcional. Así se mide la aplicación sin depender
+de la red ni cargar los servidores públicos de DBpedia.
+
+Con --no-text-index rechaza bif:contains con un 400, como un endpoint
+sin índice de texto, para comprobar la detección y la vuelta a CONTAINS;
+--scan-factor multiplica la latencia de las consultas con CONTAINS, que
+en Virtuoso recorren todas las etiquetas del idioma.
+
+Uso:
+    python dbpedia_standin.py --port 8890 --latency-ms 150 --error-rate 0.01
+    python dbpedia_standin.py --no-text-index --scan-factor 4
+    DBPEDIA_SPARQL_URL=http://127.0.0.1:8890/sparql python app.py
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+
+FOODS = ("cake", "tart", "pie", "cookie", "pudding", "mousse", "brownie", "pastry",
+         "flan", "custard", "meringue", "sponge", "biscuit", "crumble", "roll")
+INGREDIENTS = ("Sugar", "Flour", "Butter", "Egg", "Milk", "Chocolate", "Vanilla",
+               "Cream", "Almond", "Honey", "Cinnamon", "Lemon", "Strawberry")
+MAX_MATCHES = 60    # Filas como mucho por término (algunos no tienen ninguna)
+
+_TOKEN = re.compile(r'CONTAINS\(LCASE\(\?label\), LCASE\("((?:[^"\\]|\\.)*)"\)\)')
+_TEXT_QUERY = re.compile(r'bif:contains\s+(.*)')
+_LABEL_LANG = re.compile(r'FILTER\(LANG\(\?label\) = "(\w+)"\)')
+_LIMIT = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+_OFFSET = re.compile(r'\bOFFSET\s+(\d+)', re.IGNORECASE)
+_INGREDIENT_SUBJECT = re.compile(r'SELECT \?ing WHERE \{\s*<([^>]+)>')
+
+
+def _stable_hash(text):
+    return zlib.crc32(text.encode("utf-8"))
+
+
+def _literal(value, lang=None):
+    cell = {"type": "literal", "value": value}
+    if lang:
+        cell["xml:lang"] = lang
+    return cell
+
+
+def text_query_words(query):
+    """Primera palabra de cada grupo AND de una expresión bif:contains (None si no la hay)"""
+    match = _TEXT_QUERY.search(query)
+    if not match:
+        return None
+    groups = match.group(1).replace("\\", "").split(" AND ")
+    return [word.group(0).lower() for word in (re.search(r'\w+', group) for group in groups) if word]
+
+
+def search_rows(words, lang, limit, offset):
+    """Filas deterministas cuyo rdfs:label contiene todas las palabras"""
+    token = " ".join(words)
+    matches = _stable_hash(f"{token}|{lang}") % (MAX_MATCHES + 1)
+    rows = []
+    for i in range(offset, min(matches, offset + limit)):
+        food = FOODS[(i + len(token)) % len(FOODS)]
+        label = f"{token.capitalize()} {food} {i + 1}"
+        uri = f"http://dbpedia.org/resource/{urllib.parse.quote(label.replace(' ', '_'))}"
+        rows.append({
+            "item": {"type": "uri", "value": uri},
+            "label": _literal(label, lang),
+            "abstract": _literal(f"{label} is a traditional {food} made with {token}. " * 4, lang),
+        })
+    return rows
+
+
+def ingredient_rows(item_uri, limit=5):
+    seed = _stable_hash(item_uri)
+    count = 2 + seed % (limit - 1)
+    return [{"ing": {"type": "uri", "value": f"http://dbpedia.org/resource/{INGREDIENTS[(seed + k) % len(INGREDIENTS)]}"}}
+            for k in range(count)]
+
+
+def answer(query):
+    """Resultado SPARQL JSON para una consulta de app.py (vacío si no se reconoce)"""
+    ingredient_subject = _INGREDIENT_SUBJECT.search(query)
+    if ingredient_subject:
+        variables, rows = ["ing"], ingredient_rows(ingredient_subject.group(1))
+    else:
+        variables = ["item", "label", "thumbnail", "abstract", "description"]
+        words = text_query_words(query)
+        if words is None:
+            token = _TOKEN.search(query)
+            words = [token.group(1).replace('\\"', '"').lower()] if token else None
+        lang = _LABEL_LANG.search(query)
+        limit = _LIMIT.search(query)
+        offset = _OFFSET.search(query)
+        rows = search_rows(words,
+                           lang.group(1) if lang else "en",
+                           int(limit.group(1)) if limit else 30,
+                           int(offset.group(1)) if offset else 0) if words else []
+    return {"head": {"vars": variables}, "results": {"bindings": rows}}
+
+
+class StandInConfig:
+    """Latencia y errores simulados (compartidos por todos los hilos)"""
+
+    def __init__(self, latency_ms=150.0, tail=0.5, error_rate=0.0, seed=None, text_index=True, scan_factor=1.0):
+        self.latency_ms = latency_ms
+        self.tail = tail                # sigma de la log-normal: 0 = latencia fija
+        self.error_rate = error_rate
+        self.text_index = text_index    # Acepta bif:contains
+        self.scan_factor = scan_factor  # Latencia de CONTAINS respecto a la del índice
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def draw(self, scan=False):
+        """(segundos de espera, responder con error)"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency_ms * math.exp(self._random.gauss(0.0, self.tail)) if self.tail else self.latency_ms
+            if scan:
+                delay *= self.scan_factor
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay / 1000.0, failed
+
+
+def make_handler(config):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _query(self):
+            parsed = urllib.parse.urlsplit(self.path)
+            params = urllib.parse.parse_qs(parsed.query)
+            if self.command == "POST":
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8")
+                if self.headers.get("Content-Type", "").startswith("application/sparql-query"):
+                    return body
+                params.update(urllib.parse.parse_qs(body))
+            return params.get("query", [""])[0]
+
+        def _respond(self, status, body, content_type):
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente (la aplicación) se detuvo o agotó su timeout
+                self.close_connection = True
+
+        def _handle(self):
+            query = self._query()
+            delay, failed = config.draw(scan="CONTAINS(LCASE(?label)" in query)
+            time.sleep(delay)
+            if "bif:contains" in query and not config.text_index:
+                self._respond(400, b"Virtuoso 37000 Error SP030: SPARQL compiler: Unknown function bif:contains",
+                              "text/plain")
+                return
+            if failed:
+                self._respond(503, b"Service Temporarily Unavailable", "text/plain")
+                return
+            body = json.dumps(answer(query)).encode("utf-8")
+            self._respond(200, body, "application/sparql-results+json")
+
+        do_GET = _handle
+        do_POST = _handle
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def make_standin(host="127.0.0.1", port=8890, config=None):
+    """Servidor sin arrancar (serve_forever() en el hilo que se quiera)"""
+    server = ThreadingHTTPServer((host, port), make_handler(config or StandInConfig()))
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Endpoint SPARQL sintético que imita a DBpedia")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8890)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="Latencia mediana por consulta")
+    parser.add_argument("--tail", type=float, default=0.5, help="Dispersión log-normal de la latencia (0 = fija)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de consultas que responden 503")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-text-index", dest="text_index", action="store_false",
+                        help="Rechazar bif:contains (endpoint sin índice de texto)")
+    parser.add_argument("--scan-factor", type=float, default=1.0,
+                        help="Multiplicador de latencia de las consultas con CONTAINS")
+    args = parser.parse_args()
+
+    config = StandInConfig(args.latency_ms, args.tail, args.error_rate, args.seed,
+                           args.text_index, args.scan_factor)
+    server = make_standin(args.host, args.port, config)
+    print(f"✓ DBpedia sustituto en http://{args.host}:{args.port}/sparql "
+          f"(mediana {args.latency_ms:.0f} ms, errores {args.error_rate:.1%})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"✓ Consultas atendidas: {config.requests} ({config.errors} con error)")
+
+
+if __name__ == "__main__":
+    main()
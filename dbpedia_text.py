@@ -0,0 +1,146 @@
+"""
+Filtros de texto para las consultas de búsqueda en DBpedia.
+
+El filtro original, CONTAINS(LCASE(?label), "primer token"), obliga al
+endpoint a recorrer todas las etiquetas del idioma (de ahí los timeouts)
+y solo mira la primera palabra, así que "tarta de manzana" devuelve
+cualquier cosa con "tarta". Los endpoints de DBpedia son Virtuoso y
+tienen un índice de texto sobre los literales, accesible con
+bif:contains: con él se exigen todas las palabras (con prefijo y su
+variante sin acentos) y el endpoint resuelve la búsqueda en el índice.
+
+No todos los endpoints lo admiten (o lo tienen activado), así que
+TextIndexCapabilities recuerda por endpoint si bif:contains funciona.
+La comprobación es intercambiable: por defecto se lanza una consulta
+mínima con bif:contains (probe_bif_contains); también se puede fijar el
+resultado por endpoint. Sin índice se usa el filtro CONTAINS original,
+ahora con las comillas escapadas.
+"""
+import re
+import threading
+import time
+import unicodedata
+
+from SPARQLWrapper import SPARQLWrapper, JSON
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError, QueryBadFormed
+
+# Virtuoso exige al menos 4 caracteres antes del comodín de prefijo
+PREFIX_MIN_LENGTH = 4
+
+PROBE_QUERY = """
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+SELECT ?item WHERE { ?item rdfs:label ?label . ?label bif:contains '"chocolate"' . } LIMIT 1
+"""
+
+
+def strip_accents(text):
+    nfd = unicodedata.normalize('NFD', text)
+    return ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+
+
+def sparql_string(text):
+    """Literal de cadena SPARQL entre comillas dobles, con los caracteres especiales escapados"""
+    escaped = (text.replace('\\', '\\\\').replace('"', '\\"')
+               .replace('\n', '\\n').replace('\r', '\\r').replace('\t', '\\t'))
+    return f'"{escaped}"'
+
+
+def bif_contains_expression(tokens):
+    """
+    Expresión de texto de Virtuoso con todas las palabras de los tokens:
+    "tarta*" AND ("crème*" OR "creme*"). Solo quedan letras y dígitos,
+    así que las comillas del usuario no pueden romper la expresión.
+    None si no queda ninguna palabra.
+    """
+    groups = []
+    for token in tokens:
+        for word in re.findall(r'\w+', token.lower()):
+            variants = []
+            for variant in (word, strip_accents(word)):
+                term = f'"{variant}*"' if len(variant) >= PREFIX_MIN_LENGTH else f'"{variant}"'
+                if term not in variants:
+                    variants.append(term)
+            groups.append(variants[0] if len(variants) == 1 else f"({' OR '.join(variants)})")
+    return " AND ".join(groups) if groups else None
+
+
+def contains_filter(main_token):
+    """Filtro original sobre ?label: CONTAINS del primer token (y su versión sin acentos)"""
+    token_normalized = strip_accents(main_token)
+    if token_normalized.lower() != main_token.lower():
+        return (f'FILTER((CONTAINS(LCASE(?label), LCASE({sparql_string(main_token)})) || '
+                f'CONTAINS(LCASE(?label), LCASE({sparql_string(token_normalized)}))))')
+    return f'FILTER(CONTAINS(LCASE(?label), LCASE({sparql_string(main_token)})))'
+
+
+def label_filter(tokens, text_index=False):
+    """Patrón de texto sobre ?label: bif:contains con todos los tokens o el CONTAINS original"""
+    if text_index:
+        expression = bif_contains_expression(tokens)
+        if expression:
+            return f"?label bif:contains {sparql_string(expression)} ."
+    return contains_filter(tokens[0] if tokens else "")
+
+
+def probe_bif_contains(endpoint, timeout=5):
+    """
+    True si el endpoint responde a una consulta con bif:contains, False si
+    la rechaza (400/500) y None si no se pudo saber (red, timeout)
+    """
+    sparql = SPARQLWrapper(endpoint)
+    sparql.setTimeout(timeout)
+    sparql.setQuery(PROBE_QUERY)
+    sparql.setReturnFormat(JSON)
+    try:
+        sparql.query().convert()
+        return True
+    except (QueryBadFormed, EndPointInternalError):
+        return False
+    except Exception:
+        return None
+
+
+class TextIndexCapabilities:
+    """Si cada endpoint admite bif:contains, comprobado una vez y recordado"""
+
+    def __init__(self, probe=probe_bif_contains, ttl_seconds=6 * 3600, retry_seconds=60, overrides=None):
+        self.probe = probe                  # probe(endpoint) -> True / False / None
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds  # Reintento si la comprobación no fue concluyente
+        self.overrides = dict(overrides or {})
+        self._known = {}                    # endpoint -> (admite, caduca)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def supports(self, endpoint):
+        """¿Usar bif:contains en este endpoint? Comprueba si no se sabe (una sola vez a la vez)"""
+        if endpoint in self.overrides:
+            return self.overrides[endpoint]
+        known = self._known.get(endpoint)
+        if known is not None and time.monotonic() < known[1]:
+            return known[0]
+
+        with self._lock:
+            lock = self._locks.setdefault(endpoint, threading.Lock())
+        with lock:
+            known = self._known.get(endpoint)
+            if known is not None and time.monotonic() < known[1]:
+                return known[0]
+            result = self.probe(endpoint)
+            ttl = self.ttl_seconds if result is not None else self.retry_seconds
+            self._known[endpoint] = (bool(result), time.monotonic() + ttl)
+            print(f"  Índice de texto (bif:contains) en {endpoint}: "
+                  f"{'sí' if result else 'no' if result is False else 'desconocido'}")
+            return bool(result)
+
+    def mark_unsupported(self, endpoint):
+        """El endpoint rechazó una consulta con bif:contains: usar CONTAINS hasta la próxima comprobación"""
+        self._known[endpoint] = (False, time.monotonic() + self.ttl_seconds)
+
+    def status(self):
+        now = time.monotonic()
+        status = {endpoint: value for endpoint, value in self.overrides.items()}
+        for endpoint, (value, expires) in self._known.items():
+            if endpoint not in status and now < expires:
+                status[endpoint] = value
+        return status
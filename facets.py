@@ -0,0 +1,115 @@
+"""
+Búsqueda facetada con bitsets precalculados.
+
+Cada instancia recibe una posición fija y cada valor de faceta (clase,
+tipo de ingrediente, país de origen) guarda el conjunto de instancias
+que lo tienen como un entero de Python usado como bitset. Los conteos
+de cualquier búsqueda se obtienen intersecando el bitset de sus
+resultados con el de cada valor, sin volver a recorrer las instancias.
+"""
+from rdflib import RDF, OWL, Literal
+
+# Facetas disponibles: nombre del parámetro -> descripción
+FACETS = {
+    'clase': 'Clase de la instancia (Pastel, Galleta, PostreDeCuchara...)',
+    'ingrediente': 'Tipo de ingrediente que contiene (Animal, Vegetal, Aditivo)',
+    'pais': 'País de origen (paisOrigen)',
+}
+
+# Tipos de ingrediente de la ontología
+INGREDIENT_TYPES = ('Animal', 'Vegetal', 'Aditivo')
+
+
+def _local_name(uri):
+    return str(uri).split("#")[-1]
+
+
+class FacetIndex:
+    """Bitsets por valor de faceta sobre posiciones fijas de instancias"""
+
+    def __init__(self):
+        self._positions = {}    # nombre local -> posición
+        self._bitsets = {facet: {} for facet in FACETS}
+
+    @classmethod
+    def from_store(cls, store, ns, partitions):
+        index = cls()
+        instances = sorted({inst for members in partitions.values() for inst in members}, key=str)
+        index._positions = {_local_name(inst): i for i, inst in enumerate(instances)}
+
+        ingredient_type_uris = {ns[name]: name for name in INGREDIENT_TYPES}
+
+        for position, inst in enumerate(instances):
+            bit = 1 << position
+
+            for cls_uri in store.objects(inst, RDF.type):
+                if cls_uri != OWL.NamedIndividual:
+                    index._add('clase', _local_name(cls_uri), bit)
+
+            for ingredient in store.objects(inst, ns.tieneIngrediente):
+                for ing_cls in store.objects(ingredient, RDF.type):
+                    if ing_cls in ingredient_type_uris:
+                        index._add('ingrediente', ingredient_type_uris[ing_cls], bit)
+
+            for country in store.objects(inst, ns.paisOrigen):
+                if isinstance(country, Literal) and str(country).strip():
+                    index._add('pais', str(country).strip(), bit)
+
+        return index
+
+    def _add(self, facet, value, bit):
+        values = self._bitsets[facet]
+        values[value] = values.get(value, 0) | bit
+
+    def bitset_of(self, local_names):
+        """Bitset de un conjunto de instancias (por nombre local)"""
+        bits = 0
+        for name in local_names:
+            position = self._positions.get(name)
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def contains(self, bits, local_name):
+        position = self._positions.get(local_name)
+        return position is not None and bool(bits >> position & 1)
+
+    def _selection_bits(self, selections, skip_facet=None):
+        """
+        Bitset de las instancias que cumplen la selección: OR entre valores
+        de una misma faceta y AND entre facetas distintas
+        """
+        bits = -1  # todas
+        for facet, values in selections.items():
+            if facet == skip_facet or not values:
+                continue
+            facet_bits = 0
+            for value in values:
+                facet_bits |= self._bitsets.get(facet, {}).get(value, 0)
+            bits &= facet_bits
+        return bits
+
+    def filter(self, bits, selections):
+        """Restringir un bitset de resultados a la selección de facetas"""
+        return bits & self._selection_bits(selections)
+
+    def counts(self, bits, selections=None):
+        """
+        Conteo por valor de cada faceta dentro de los resultados. Para cada
+        faceta se ignora su propia selección, de modo que sus otros valores
+        siguen mostrando cuántos resultados añadirían.
+        """
+        selections = selections or {}
+        counts = {}
+        for facet, values in self._bitsets.items():
+            base = bits & self._selection_bits(selections, skip_facet=facet)
+            facet_counts = {}
+            for value, value_bits in values.items():
+                count = (base & value_bits).bit_count()
+                if count:
+                    facet_counts[value] = count
+            counts[facet] = dict(sorted(facet_counts.items(), key=lambda item: (-item[1], item[0])))
+        return counts
+
+    def stats(self):
+        return {facet: len(values) for facet, values in self._bitsets.items()}
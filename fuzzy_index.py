@@ -0,0 +1,183 @@
+"""
+Índice de trigramas de caracteres para búsqueda tolerante a errores
+tipográficos ("choclate" → "chocolate", "galeta" → "galleta").
+
+El vocabulario son las palabras normalizadas de los nombres de
+instancias, ingredientes y clases. Los candidatos se generan por
+solapamiento de trigramas y se verifican con una distancia de edición
+acotada, así que solo se compara contra unas pocas palabras.
+"""
+from array import array
+import re
+
+from rdflib import RDF, RDFS, OWL, Literal
+
+from text_utils import normalize_text
+
+# Valores por defecto (se pueden sobrescribir al construir el índice)
+DEFAULT_FUZZY_CONFIG = {
+    'min_similarity': 0.45,     # Coeficiente de Dice mínimo entre trigramas
+    'max_edit_distance': 2,     # Distancia de Levenshtein máxima aceptada
+    'short_word_length': 5,     # Palabras de hasta esta longitud admiten solo 1 error
+    'max_candidates': 50,       # Candidatos a verificar por token
+}
+
+# Clave del vocabulario común a todos los idiomas (nombres de clases)
+ALL_LANGUAGES = '*'
+
+
+def trigrams(word):
+    """Trigramas de una palabra con marcas de inicio y fin"""
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a, b, max_distance):
+    """
+    Distancia de Levenshtein entre a y b, o None si supera max_distance.
+    Abandona en cuanto todas las celdas de una fila superan el límite.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, char_b in enumerate(b, 1):
+            cost = 0 if char_a == char_b else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if current[j] < row_min:
+                row_min = current[j]
+        if row_min > max_distance:
+            return None
+        previous = current
+
+    distance = previous[-1]
+    return distance if distance <= max_distance else None
+
+
+class TrigramIndex:
+    """Índice de trigramas sobre el vocabulario de nombres, por idioma"""
+
+    def __init__(self, config=None):
+        self.config = dict(DEFAULT_FUZZY_CONFIG)
+        if config:
+            self.config.update(config)
+        self._words = []        # Vocabulario (palabras normalizadas)
+        self._surfaces = []     # Forma original en minúsculas (con acentos)
+        self._postings = {}     # {(lang, trigrama): array('I') de posiciones}
+        self._blobs = {}        # {lang: '\n'.join(formas)} para comprobar subcadenas
+
+    @classmethod
+    def from_graph(cls, graph, ns, languages, config=None):
+        """Construir el índice a partir de los nombres de la ontología"""
+        index = cls(config)
+        vocabulary = {}
+
+        # Nombres de instancias e ingredientes en cada idioma
+        for prop in (ns.nombre, RDFS.label):
+            for literal in graph.objects(None, prop):
+                if not isinstance(literal, Literal):
+                    continue
+                lang = getattr(literal, 'language', None)
+                if lang not in languages:
+                    continue
+                for surface in re.findall(r'\w+', str(literal).lower()):
+                    word = normalize_text(surface)
+                    if len(word) >= 3:
+                        vocabulary.setdefault(lang, {})[word] = surface
+
+        # Nombres de clases (universales, sin idioma)
+        for class_type in (OWL.Class, RDFS.Class):
+            for cls_uri in graph.subjects(RDF.type, class_type):
+                surface = str(cls_uri).split("#")[-1].lower()
+                cls_name = normalize_text(surface)
+                if len(cls_name) >= 3:
+                    vocabulary.setdefault(ALL_LANGUAGES, {})[cls_name] = surface
+
+        for lang, words in vocabulary.items():
+            postings = {}
+            for word, surface in sorted(words.items()):
+                position = len(index._words)
+                index._words.append(word)
+                index._surfaces.append(surface)
+                for gram in trigrams(word):
+                    postings.setdefault(gram, []).append(position)
+            for gram, positions in postings.items():
+                index._postings[(lang, gram)] = array('I', positions)
+            index._blobs[lang] = '\n'.join(sorted(words.values()))
+
+        return index
+
+    def _is_known(self, token, language):
+        """¿Aparece el token como subcadena de alguna palabra conocida?"""
+        return (token in self._blobs.get(language, '')
+                or token in self._blobs.get(ALL_LANGUAGES, ''))
+
+    def candidates(self, token, language):
+        """
+        Palabras del vocabulario parecidas a token, como lista de
+        (forma_original, distancia) ordenada por distancia
+        """
+        token = normalize_text(token)
+        if len(token) < 3:
+            return []
+
+        max_distance = self.config['max_edit_distance']
+        if len(token) <= self.config['short_word_length']:
+            max_distance = min(max_distance, 1)
+
+        token_grams = trigrams(token)
+        overlap = {}
+        for lang in (language, ALL_LANGUAGES):
+            for gram in token_grams:
+                for position in self._postings.get((lang, gram), ()):
+                    overlap[position] = overlap.get(position, 0) + 1
+
+        # Filtrar por coeficiente de Dice antes de la verificación costosa
+        scored = []
+        for position, shared in overlap.items():
+            word = self._words[position]
+            if abs(len(word) - len(token)) > max_distance:
+                continue
+            dice = 2.0 * shared / (len(token_grams) + len(word))
+            if dice >= self.config['min_similarity']:
+                scored.append((dice, position))
+        scored.sort(reverse=True)
+
+        matches = []
+        for _, position in scored[:self.config['max_candidates']]:
+            distance = bounded_levenshtein(token, self._words[position], max_distance)
+            if distance is not None:
+                matches.append((self._surfaces[position], distance))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+    def correct_tokens(self, tokens, language):
+        """
+        Sustituir los tokens desconocidos por su corrección más cercana.
+        Devuelve None si no hay nada que corregir.
+        """
+        corrected = []
+        changed = False
+        for token in tokens:
+            if self._is_known(token.lower(), language):
+                corrected.append(token)
+                continue
+            matches = self.candidates(token, language)
+            if matches:
+                corrected.append(matches[0][0])
+                changed = True
+            else:
+                corrected.append(token)
+        return corrected if changed else None
+
+    def stats(self):
+        """Tamaño del vocabulario y número de listas de trigramas"""
+        return {
+            'palabras': len(self._words),
+            'trigramas': len(self._postings)
+        }
@@ -0,0 +1,142 @@
+"""
+Cabeceras de cache HTTP, peticiones condicionales y compresión.
+
+- ETags calculados antes de hacer el trabajo: dependen de la versión de
+  la ontología, de la consulta y de la versión de la interfaz, así que
+  una búsqueda repetida se responde con 304 sin volver a buscar.
+- Compresión gzip (o brotli si está instalado) de HTML y JSON por encima
+  de un tamaño mínimo.
+- Ficheros estáticos con huella: url_for('static', ...) añade ?v=<hash>
+  del contenido y esas URLs se sirven con un Cache-Control de un año.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se usa solo gzip
+    brotli = None
+
+# No comprimir respuestas pequeñas: la cabecera gzip no compensa
+COMPRESS_MIN_SIZE = 1024
+COMPRESSIBLE_MIMETYPES = {"text/html", "application/json"}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Un año: la URL cambia cuando cambia el contenido
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+
+class FileFingerprints:
+    """Huella (hash del contenido) de cada fichero de una carpeta, revalidada por mtime"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._cache = {}    # nombre -> (mtime, huella)
+
+    def get(self, filename):
+        path = os.path.join(self.folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = self._cache.get(filename)
+        if cached is None or cached[0] != mtime:
+            with open(path, "rb") as f:
+                cached = self._cache[filename] = (mtime, hashlib.sha1(f.read()).hexdigest()[:12])
+        return cached[1]
+
+    def build_id(self, *filenames):
+        """Huella conjunta de varios ficheros (versión de la interfaz)"""
+        return hashlib.sha1("".join(self.get(name) or "" for name in filenames).encode()).hexdigest()[:12]
+
+
+def make_etag(*parts):
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def is_not_modified(etag):
+    """True si el cliente ya tiene la respuesta con este ETag (If-None-Match)"""
+    # contains_weak: tras comprimir, el ETag se envía como débil
+    return request.if_none_match.contains_weak(etag)
+
+
+def not_modified_response(etag):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def revalidate(response, etag):
+    """Marcar una respuesta dinámica con su ETag y obligar a revalidarla"""
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+
+def _accepted_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response):
+    """after_request: comprimir HTML/JSON grandes según Accept-Encoding"""
+    if (response.status_code < 200 or response.status_code >= 300
+            or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = _accepted_encoding()
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    # El ETag identifica la representación: la comprimida es otra distinta
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_app(app):
+    """Registrar huellas de estáticos, cache larga y compresión en la app"""
+    fingerprints = FileFingerprints(app.static_folder)
+    app.extensions["static_fingerprints"] = fingerprints
+
+    @app.url_defaults
+    def add_static_fingerprint(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            fingerprint = fingerprints.get(values["filename"])
+            if fingerprint:
+                values["v"] = fingerprint
+
+    @app.after_request
+    def cache_headers(response):
+        if request.endpoint == "static" and request.args.get("v"):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.cache_control.immutable = True
+        return compress_response(response)
+
+    return fingerprints
@@ -0,0 +1,96 @@
+"""
+Clasificación por palabras clave compilada en una sola expresión regular.
+
+Las reglas están en classifier_rules.json: para cada clasificador, una
+lista ordenada de reglas (clase + palabras clave) y una clase por
+defecto. Gana la primera regla (por orden) que tenga alguna palabra
+contenida en el nombre, igual que las cadenas de any(...) del poblador.
+
+Todas las palabras se compilan en una única alternancia dentro de un
+lookahead, (?=(kw1|kw2|...)), ordenada por prioridad: en cada posición
+del texto la alternancia devuelve la palabra de mayor prioridad que
+empieza ahí, y el lookahead permite coincidencias solapadas, así que el
+mínimo de prioridades es exactamente el resultado de las cadenas any().
+
+classify_many() clasifica un lote uniendo los nombres con saltos de
+línea y recorriendo el texto una sola vez.
+"""
+from bisect import bisect_right
+import json
+import os
+import re
+
+DEFAULT_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "classifier_rules.json")
+
+# Separador entre nombres de un lote (ninguna palabra clave lo contiene)
+BATCH_SEPARATOR = "\n"
+
+
+class KeywordClassifier:
+    """Reglas ordenadas (clase, palabras) compiladas en un único autómata"""
+
+    def __init__(self, rules, default):
+        self.default = default
+        self.classes = [rule["class"] for rule in rules]
+        self._priority = {}     # palabra -> índice de la primera regla que la contiene
+        for priority, rule in enumerate(rules):
+            for keyword in rule["keywords"]:
+                keyword = keyword.lower()
+                if BATCH_SEPARATOR in keyword:
+                    raise ValueError(f"Palabra clave no válida: {keyword!r}")
+                self._priority.setdefault(keyword, priority)
+
+        # Prioridad ascendente y, a igualdad, palabras más largas primero
+        ordered = sorted(self._priority, key=lambda k: (self._priority[k], -len(k)))
+        self._pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))") if ordered else None
+
+    @classmethod
+    def from_file(cls, name, path=DEFAULT_RULES_FILE):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)[name]
+        return cls(config["rules"], config["default"])
+
+    def classify(self, name):
+        """Clase de un nombre (la de la regla de mayor prioridad que coincide)"""
+        if self._pattern is None:
+            return self.default
+        best = None
+        for match in self._pattern.finditer(name.lower()):
+            priority = self._priority[match.group(1)]
+            if best is None or priority < best:
+                best = priority
+                if best == 0:
+                    break
+        return self.default if best is None else self.classes[best]
+
+    def classify_many(self, names):
+        """Clases de un lote de nombres en una sola pasada sobre el texto unido"""
+        names = list(names)
+        if self._pattern is None or not names:
+            return [self.default] * len(names)
+
+        lowered = [name.lower().replace(BATCH_SEPARATOR, " ") for name in names]
+        starts = []
+        position = 0
+        for name in lowered:
+            starts.append(position)
+            position += len(name) + len(BATCH_SEPARATOR)
+
+        best = [None] * len(names)
+        for match in self._pattern.finditer(BATCH_SEPARATOR.join(lowered)):
+            index = bisect_right(starts, match.start()) - 1
+            priority = self._priority[match.group(1)]
+            if best[index] is None or priority < best[index]:
+                best[index] = priority
+        return [self.default if priority is None else self.classes[priority] for priority in best]
+
+
+_classifiers = {}
+
+
+def get_classifier(name, path=DEFAULT_RULES_FILE):
+    """Clasificador compilado, cargado una vez por proceso"""
+    key = (name, path)
+    if key not in _classifiers:
+        _classifiers[key] = KeywordClassifier.from_file(name, path)
+    return _classifiers[key]
@@ -0,0 +1,53 @@
+"""
+Partición de las instancias por idioma, calculada una vez al cargar.
+
+Una instancia pertenece al idioma 'xx' si tiene un :nombre o rdfs:label
+etiquetado con 'xx' y su :idioma (si lo tiene) no indica otro idioma.
+Así la búsqueda solo recorre las instancias de su propio idioma en lugar
+de leer y descartar las de los otros cinco.
+"""
+from rdflib import RDF, RDFS, Literal
+
+from text_utils import normalize_text
+
+# Valores de :idioma que aparecen en la ontología (el poblador los escribe
+# en español) además de los nombres nativos de LANGUAGES
+IDIOMA_ALIASES = {
+    'espanol': 'es', 'ingles': 'en', 'frances': 'fr',
+    'italiano': 'it', 'aleman': 'de', 'portugues': 'pt',
+}
+
+
+def build_language_partitions(store, ns, languages):
+    """
+    Devuelve {código_idioma: tupla de instancias} a partir del almacén compacto
+    """
+    aliases = dict(IDIOMA_ALIASES)
+    for code, info in languages.items():
+        aliases[normalize_text(info['name'])] = code
+        aliases[code] = code
+
+    partitions = {code: [] for code in languages}
+    for inst in store.subjects_with_predicate(RDF.type):
+        declared = None
+        for value in store.objects(inst, ns.idioma):
+            declared = aliases.get(normalize_text(value))
+            if declared:
+                break
+
+        name_languages = set()
+        for prop in (ns.nombre, RDFS.label):
+            for value in store.objects(inst, prop):
+                if isinstance(value, Literal) and value.language in partitions:
+                    name_languages.add(value.language)
+
+        for code in name_languages:
+            if declared is None or declared == code:
+                partitions[code].append(inst)
+
+    return {code: tuple(instances) for code, instances in partitions.items()}
+
+
+def partition_sizes(partitions):
+    """Tamaño de cada partición (para planificar capacidad)"""
+    return {code: len(instances) for code, instances in partitions.items()}
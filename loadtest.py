@@ -0,0 +1,429 @@
+"""
+Prueba de carga: reproduce tráfico contra app.py a tasas de llegada fijas.
+
+El tráfico sale de un registro de consultas (una petición por línea:
+JSON {"method", "path", "data"}, solo la ruta, o las líneas
+{"tokens", "lang", "source"} que escribe la aplicación en
+logs/queries.jsonl, ver query_log.py) o de una mezcla
+sintética de búsquedas locales (página, /api/search, sugerencias) y
+llamadas a /dbpedia_search. Las consultas a DBpedia van a un sustituto
+local (dbpedia_standin.py) con latencia y errores configurables, salvo
+que se indique --dbpedia-url.
+
+Las llegadas son de bucle abierto (proceso de Poisson): cada petición
+sale a su hora aunque las anteriores no hayan terminado, y la latencia
+se mide desde esa hora prevista, de modo que la cola que se forma al
+saturar el servidor cuenta en los percentiles. Para cada modo de
+servicio y cada tasa se informa de p50/p95/p99, tasa de errores y
+rendimiento conseguido; el rendimiento de saturación es la mayor tasa
+servida cumpliendo el objetivo de p95 y de errores.
+
+Modos:
+    single     servidor de desarrollo de Flask sin hilos (una petición a la vez)
+    threaded   servidor de desarrollo con un hilo por petición (app.run)
+    prefork    serve.py con --workers procesos
+    asgi       asgi.py: DBpedia asíncrono y --workers hilos para la búsqueda local
+
+Uso:
+    python loadtest.py --modes threaded,prefork --rates 5,10,20,40 --duration 20
+    python loadtest.py --log consultas.jsonl --rates 10,20 --json informe.json
+    python loadtest.py --url http://127.0.0.1:8000 --rates 50     (servidor ya arrancado)
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from bench_workers import wait_until_ready
+from dbpedia_standin import StandInConfig, make_standin
+from run_report import percentile
+
+SEARCH_TERMS = {
+    'es': ['chocolate', 'harina', 'pastel', 'azucar', 'galleta', 'mantequilla', 'tarta', 'fresa',
+           'vainilla', 'crema', 'limon', 'almendra', 'bizcocho', 'canela', 'merengue', 'horno'],
+    'en': ['chocolate', 'cake', 'cookie', 'butter', 'flour', 'sugar', 'pie', 'vanilla', 'cream', 'lemon'],
+    'fr': ['chocolat', 'gateau', 'tarte', 'beurre', 'farine', 'sucre', 'creme', 'vanille'],
+}
+LANGUAGE_WEIGHTS = {'es': 0.6, 'en': 0.3, 'fr': 0.1}
+DEFAULT_MIX = "page=0.35,api=0.3,suggest=0.15,dbpedia=0.2"
+CLIENT_THREADS = 256
+
+
+# ----------------------------------------------------------------------
+# Carga de trabajo
+# ----------------------------------------------------------------------
+def parse_mix(text):
+    """'page=0.4,api=0.6' -> {'page': 0.4, 'api': 0.6}"""
+    mix = {}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in REQUEST_BUILDERS:
+            raise ValueError(f"Tipo de petición desconocido: {kind} (válidos: {', '.join(REQUEST_BUILDERS)})")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+
+def _pick_term(rng, language, fresh):
+    """Términos con popularidad tipo Zipf; una fracción 'fresh' nunca se repite (fallo de cache)"""
+    terms = SEARCH_TERMS[language]
+    term = rng.choices(terms, weights=[1.0 / (rank + 1) for rank in range(len(terms))])[0]
+    if rng.random() < fresh:
+        term += f" {rng.randrange(10 ** 9)}"
+    return term
+
+
+def _page_path(term, language):
+    return "/?" + urllib.parse.urlencode({"term": term, "language": language})
+
+
+def _api_path(term, language):
+    return "/api/search?" + urllib.parse.urlencode({"q": term, "lang": language})
+
+
+def _dbpedia_path(term, language, offset=0):
+    return "/dbpedia_search?" + urllib.parse.urlencode(
+        {"term": term, "language": language, "limit": 3, "offset": offset})
+
+
+# Ruta de cada origen del registro de consultas de la aplicación
+LOGGED_SOURCES = {"page": _page_path, "api": _api_path, "dbpedia": _dbpedia_path}
+
+
+def _page_request(rng, language, fresh):
+    return "GET", _page_path(_pick_term(rng, language, fresh), language), None
+
+
+def _api_request(rng, language, fresh):
+    return "GET", _api_path(_pick_term(rng, language, fresh), language), None
+
+
+def _suggest_request(rng, language, fresh):
+    term = _pick_term(rng, language, 0)
+    return "GET", "/api/suggest?" + urllib.parse.urlencode({"q": term[:rng.randint(2, 4)], "lang": language}), None
+
+
+def _dbpedia_request(rng, language, fresh):
+    offset = rng.choice([0, 0, 0, 3, 6])     # La mayoría no pasa de la primera página
+    return "GET", _dbpedia_path(_pick_term(rng, language, fresh), language, offset), None
+
+
+REQUEST_BUILDERS = {
+    "page": _page_request,
+    "api": _api_request,
+    "suggest": _suggest_request,
+    "dbpedia": _dbpedia_request,
+}
+
+
+def synthetic_requests(mix, fresh=0.2, seed=1):
+    """Secuencia infinita de peticiones (método, ruta, datos) según la mezcla"""
+    rng = random.Random(seed)
+    kinds, weights = list(mix), list(mix.values())
+    languages, language_weights = list(LANGUAGE_WEIGHTS), list(LANGUAGE_WEIGHTS.values())
+    while True:
+        kind = rng.choices(kinds, weights)[0]
+        language = rng.choices(languages, language_weights)[0]
+        yield REQUEST_BUILDERS[kind](rng, language, fresh)
+
+
+def load_log(path):
+    """Peticiones de un registro de consultas (JSON por línea o rutas sueltas)"""
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                if "tokens" in entry:
+                    path = LOGGED_SOURCES[entry["source"]](" ".join(entry["tokens"]), entry["lang"])
+                    requests.append(("GET", path, None))
+                else:
+                    requests.append((entry.get("method", "GET"), entry["path"], entry.get("data")))
+            else:
+                requests.append(("GET", line, None))
+    if not requests:
+        raise ValueError(f"El registro {path} no tiene peticiones")
+    return requests
+
+
+def replay_requests(requests):
+    """Repetir el registro en orden tantas veces como haga falta"""
+    while True:
+        yield from requests
+
+
+def request_kind(path):
+    """Tipo de petición para el desglose del informe"""
+    route = urllib.parse.urlsplit(path).path
+    for prefix, kind in (("/api/search", "api"), ("/api/suggest", "suggest"), ("/dbpedia_search", "dbpedia")):
+        if route.startswith(prefix):
+            return kind
+    return "page" if route == "/" else route
+
+
+# ----------------------------------------------------------------------
+# Generación de carga
+# ----------------------------------------------------------------------
+def send(base_url, method, path, data, timeout):
+    """(estado HTTP o None, tipo de error o None)"""
+    body = urllib.parse.urlencode(data).encode() if data else None
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status, None
+    except urllib.error.HTTPError as e:
+        return e.code, f"http_{e.code}"
+    except OSError as e:
+        return None, "timeout" if "timed out" in str(e) else type(e).__name__
+
+
+def run_rate(base_url, requests, rate, duration, timeout=30, seed=1, client_threads=CLIENT_THREADS):
+    """
+    Enviar peticiones a 'rate' por segundo durante 'duration' segundos
+    (llegadas de Poisson) y devolver una muestra por petición:
+    (tipo, latencia en s desde la hora prevista, estado, error)
+    """
+    rng = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+
+    def fire(scheduled, method, path, data):
+        status, error = send(base_url, method, path, data, timeout)
+        latency = time.perf_counter() - scheduled
+        with lock:
+            samples.append((request_kind(path), latency, status, error))
+
+    start = time.perf_counter()
+    scheduled = start
+    sent = 0
+    with ThreadPoolExecutor(max_workers=client_threads) as pool:
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled - start > duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            method, path, data = next(requests)
+            pool.submit(fire, scheduled, method, path, data)
+            sent += 1
+    # La ventana de medida es la duración completa aunque la última llegada
+    # sea antes (a tasas bajas el rendimiento superaría la tasa ofrecida)
+    elapsed = max(duration, time.perf_counter() - start)
+    return samples, sent, elapsed
+
+
+def summarize(samples, elapsed):
+    """Percentiles (ms), errores y rendimiento de un conjunto de muestras"""
+    latencies = [latency for _, latency, _, error in samples if error is None]
+    errors = {}
+    for _, _, _, error in samples:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    count = len(samples)
+
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "requests": count,
+        "ok": len(latencies),
+        "error_rate": round(sum(errors.values()) / count, 4) if count else 0.0,
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 0.50)),
+        "p95_ms": ms(percentile(latencies, 0.95)),
+        "p99_ms": ms(percentile(latencies, 0.99)),
+        "max_ms": ms(max(latencies) if latencies else None),
+    }
+
+
+def measure_rate(base_url, requests, rate, args):
+    samples, sent, elapsed = run_rate(base_url, requests, rate, args.duration, args.timeout,
+                                      seed=args.seed + int(rate * 1000), client_threads=args.client_threads)
+    result = dict(summarize(samples, elapsed), offered_rate=rate)
+    by_kind = {}
+    for sample in samples:
+        by_kind.setdefault(sample[0], []).append(sample)
+    result["by_kind"] = {kind: summarize(kind_samples, elapsed) for kind, kind_samples in sorted(by_kind.items())}
+    return result
+
+
+def saturation(results, slo_ms, max_error_rate):
+    """Mayor rendimiento conseguido cumpliendo el p95 y la tasa de errores objetivo"""
+    sustained = [r["throughput"] for r in results
+                 if r["p95_ms"] is not None and r["p95_ms"] <= slo_ms and r["error_rate"] <= max_error_rate]
+    return {
+        "sustained_throughput": max(sustained) if sustained else 0.0,
+        "peak_throughput": max((r["throughput"] for r in results), default=0.0),
+    }
+
+
+# ----------------------------------------------------------------------
+# Servidores
+# ----------------------------------------------------------------------
+def start_server(mode, port, workers, env):
+    if mode == "prefork":
+        command = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port)]
+    elif mode == "asgi":
+        command = [sys.executable, "asgi.py", "--local-threads", str(workers), "--port", str(port)]
+    elif mode in ("threaded", "single"):
+        command = [sys.executable, "-c",
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, "
+                   f"threaded={mode == 'threaded'}, use_reloader=False)"]
+    else:
+        raise ValueError(f"Modo desconocido: {mode} (válidos: single, threaded, prefork, asgi)")
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def warm_up(base_url, requests, count, timeout):
+    """Peticiones secuenciales antes de medir (caches, páginas y JIT de plantillas)"""
+    for _ in range(count):
+        method, path, data = next(requests)
+        send(base_url, method, path, data, timeout)
+
+
+def run_mode(base_url, make_requests, args):
+    requests = make_requests()
+    warm_up(base_url, requests, args.warmup, args.timeout)
+    results = []
+    for rate in args.rates:
+        result = measure_rate(base_url, requests, rate, args)
+        results.append(result)
+        print_row(result)
+        time.sleep(args.pause)
+    return results
+
+
+def print_header(title):
+    print(f"\n{title}")
+    print(f"{'tasa':>7} {'servidas/s':>10} {'peticiones':>10} {'errores':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+
+
+def print_row(result):
+    def cell(value):
+        return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+    print(f"{result['offered_rate']:>7g} {result['throughput']:>10.2f} {result['requests']:>10} "
+          f"{result['error_rate']:>8.1%} {cell(result['p50_ms'])} {cell(result['p95_ms'])} "
+          f"{cell(result['p99_ms'])} {cell(result['max_ms'])}", flush=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prueba de carga del buscador de repostería")
+    parser.add_argument("--modes", default="threaded,prefork",
+                        help="Modos de servicio a comparar: single, threaded, prefork, asgi")
+    parser.add_argument("--url", help="Medir un servidor ya arrancado en lugar de lanzar los modos")
+    parser.add_argument("--rates", default="5,10,20,40", help="Tasas de llegada (peticiones/s)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Segundos por tasa")
+    parser.add_argument("--log", help="Registro de consultas a reproducir (si no, mezcla sintética)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Mezcla sintética: page, api, suggest, dbpedia")
+    parser.add_argument("--fresh", type=float, default=0.2, help="Fracción de términos nunca vistos")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Trabajadores de prefork")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Timeout de cada petición (s)")
+    parser.add_argument("--warmup", type=int, default=30, help="Peticiones de calentamiento por modo")
+    parser.add_argument("--pause", type=float, default=2.0, help="Pausa entre tasas (s)")
+    parser.add_argument("--client-threads", type=int, default=CLIENT_THREADS)
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="p95 objetivo para la saturación")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--dbpedia-url", help="Endpoint SPARQL real en lugar del sustituto local")
+    parser.add_argument("--standin-port", type=int, default=8890)
+    parser.add_argument("--standin-latency-ms", type=float, default=150.0)
+    parser.add_argument("--standin-error-rate", type=float, default=0.0)
+    parser.add_argument("--standin-no-text-index", dest="standin_text_index", action="store_false",
+                        help="El sustituto rechaza bif:contains (la app vuelve a CONTAINS)")
+    parser.add_argument("--standin-scan-factor", type=float, default=1.0,
+                        help="Multiplicador de latencia del sustituto para CONTAINS")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Guardar el informe completo en este fichero")
+    args = parser.parse_args()
+    args.rates = [float(rate) for rate in args.rates.split(",")]
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.log:
+        logged = load_log(args.log)
+        make_requests = lambda: replay_requests(logged)
+        source = f"registro {args.log} ({len(logged)} peticiones)"
+    else:
+        mix = parse_mix(args.mix)
+        make_requests = lambda: synthetic_requests(mix, args.fresh, args.seed)
+        source = f"mezcla sintética {args.mix}"
+
+    report = {"source": source, "rates": args.rates, "duration": args.duration,
+              "slo_ms": args.slo_ms, "max_error_rate": args.max_error_rate, "modes": {}}
+
+    if args.url:
+        print_header(f"Servidor {args.url} · {source}")
+        results = run_mode(args.url.rstrip("/"), make_requests, args)
+        report["modes"]["external"] = {"results": results, **saturation(results, args.slo_ms, args.max_error_rate)}
+    else:
+        standin = None
+        env = dict(os.environ, PYTHONUNBUFFERED="1")
+        if args.dbpedia_url:
+            env["DBPEDIA_SPARQL_URL"] = args.dbpedia_url
+        else:
+            standin = make_standin("127.0.0.1", args.standin_port,
+                                   StandInConfig(args.standin_latency_ms, error_rate=args.standin_error_rate,
+                                                 seed=args.seed, text_index=args.standin_text_index,
+                                                 scan_factor=args.standin_scan_factor))
+            threading.Thread(target=standin.serve_forever, daemon=True).start()
+            env["DBPEDIA_SPARQL_URL"] = f"http://127.0.0.1:{args.standin_port}/sparql"
+            # Sin réplica local: las búsquedas de DBpedia tienen que llegar al sustituto
+            env["DBPEDIA_MIRROR"] = ""
+
+        try:
+            for mode in args.modes.split(","):
+                base_url = f"http://127.0.0.1:{args.port}"
+                process = start_server(mode, args.port, args.workers, env)
+                try:
+                    if not wait_until_ready(base_url):
+                        raise RuntimeError(f"el servidor ({mode}) no arrancó a tiempo")
+                    label = {"prefork": f"prefork ({args.workers} trabajadores)",
+                             "asgi": f"asgi ({args.workers} hilos locales)"}.get(mode, mode)
+                    print_header(f"Modo {label} · {source}")
+                    results = run_mode(base_url, make_requests, args)
+                finally:
+                    stop_server(process)
+                report["modes"][mode] = {"results": results, **saturation(results, args.slo_ms, args.max_error_rate)}
+        finally:
+            if standin is not None:
+                standin.shutdown()
+                standin.server_close()
+
+    print(f"\nSaturación (p95 ≤ {args.slo_ms:.0f} ms y errores ≤ {args.max_error_rate:.1%}):")
+    for mode, summary in report["modes"].items():
+        print(f"  {mode:<10} {summary['sustained_throughput']:>8.2f} peticiones/s "
+              f"(máximo servido: {summary['peak_throughput']:.2f}/s)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ Informe guardado en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Versiones de la ontología cargada y recarga en caliente.
+
+Un OntologySnapshot agrupa el grafo y todos sus índices derivados, y
+nunca se modifica una vez construido. El OntologyManager mantiene la
+referencia a la versión activa: una recarga construye la nueva versión
+en un hilo en segundo plano y después sustituye la referencia de una
+sola vez. Las peticiones en curso terminan con la versión que tomaron
+al empezar y las nuevas ven ya la nueva versión.
+
+Antes del cambio se puede precalentar la nueva versión (warmer): así la
+primera petición tras arrancar o recargar ya encuentra sus caches llenas.
+"""
+import os
+import sys
+import threading
+import time
+
+# Intervalo de cambio de hilo (segundos) mientras se reconstruye: más
+# corto que el de por defecto para que el hilo de recarga no acapare el
+# GIL y las peticiones no noten la reconstrucción
+REBUILD_SWITCH_INTERVAL = 0.0005
+
+
+class OntologySnapshot:
+    """Versión inmutable de la ontología con sus índices derivados"""
+
+    def __init__(self, version, source, graph, **indexes):
+        self.version = version
+        self.source = source
+        # El grafo rdflib solo se usa para construir los índices: no se
+        # retiene, para no duplicar en memoria todos sus literales
+        self.triples = len(graph)
+        self.loaded_at = time.time()
+        for name, index in indexes.items():
+            setattr(self, name, index)
+
+    def status(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "triples": self.triples,
+            "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.loaded_at)),
+        }
+
+
+class OntologyManager:
+    """Mantiene la versión activa y la reconstruye en segundo plano"""
+
+    def __init__(self, source, builder, revision=None, warmer=None):
+        self.source = source
+        self._builder = builder          # builder(source, version) -> OntologySnapshot
+        # revision(source) -> valor que cambia con cada cambio del origen
+        # (por defecto la fecha de modificación del fichero)
+        self._revision = revision
+        # warmer(snapshot) -> dict con lo precalentado, antes de activar la versión
+        self._warmer = warmer
+        self._warm_up = None
+        self._current = None
+        self._version = 0
+        self._lock = threading.Lock()    # Solo una reconstrucción a la vez
+        self._reloading = False
+        self._reload_lock = threading.Lock()   # Protege la comprobación y el cambio de _reloading
+        self._last_error = None
+        self._listeners = []
+        self._watched_revision = None
+
+        # Permite sustituir cómo se pide una recarga (p. ej. serve.py avisa al maestro)
+        self.reload_hook = None
+
+    @property
+    def current(self):
+        return self._current
+
+    def add_listener(self, callback):
+        """callback(old_snapshot, new_snapshot) tras cada cambio de versión"""
+        self._listeners.append(callback)
+
+    def load(self):
+        """Carga síncrona (arranque)"""
+        self._build_and_swap()
+        return self._current
+
+    def _build_and_swap(self):
+        with self._lock:
+            version = self._version + 1
+            revision = self._source_revision()
+            start = time.perf_counter()
+            snapshot = self._builder(self.source, version)
+            built = time.perf_counter()
+            self._warm(snapshot)
+            old, self._current = self._current, snapshot
+            self._version = version
+            self._watched_revision = revision
+            print(f"✓ Ontología v{version} lista en {built - start:.2f}s ({self.source})")
+
+        for callback in self._listeners:
+            callback(old, snapshot)
+
+    def _warm(self, snapshot):
+        """Precalentar la versión nueva; un fallo no impide activarla"""
+        if self._warmer is None:
+            return
+        start = time.perf_counter()
+        try:
+            summary = self._warmer(snapshot) or {}
+        except Exception as e:
+            summary = {"error": str(e)}
+            print(f"⚠ Error precalentando la ontología v{snapshot.version}: {e}")
+        self._warm_up = dict(summary, version=snapshot.version,
+                             seconds=round(time.perf_counter() - start, 3))
+
+    @property
+    def ready(self):
+        """Hay una versión activa (y ya precalentada)"""
+        return self._current is not None
+
+    def reload(self):
+        """
+        Pedir una recarga. Devuelve False si ya hay una en curso.
+        La construcción ocurre en un hilo aparte; esta llamada no bloquea.
+        """
+        if self.reload_hook is not None:
+            return self.reload_hook()
+
+        with self._reload_lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+        threading.Thread(target=self._reload_worker, name="ontology-reload", daemon=True).start()
+        return True
+
+    def _reload_worker(self):
+        previous_interval = sys.getswitchinterval()
+        sys.setswitchinterval(REBUILD_SWITCH_INTERVAL)
+        try:
+            self._build_and_swap()
+            self._last_error = None
+        except Exception as e:
+            # Si falla, se sigue sirviendo la versión anterior
+            self._last_error = str(e)
+            print(f"✗ Error recargando la ontología: {e}")
+        finally:
+            sys.setswitchinterval(previous_interval)
+            self._reloading = False
+
+    def _source_revision(self):
+        if self._revision is not None:
+            return self._revision(self.source)
+        try:
+            return os.stat(self.source).st_mtime_ns
+        except OSError:
+            return None
+
+    def start_watcher(self, interval=2.0):
+        """Vigilar el origen y recargar cuando cambie"""
+        def watch():
+            while True:
+                time.sleep(interval)
+                revision = self._source_revision()
+                if revision is not None and revision != self._watched_revision and not self._reloading:
+                    print(f"🔄 Cambio detectado en {self.source}, recargando...")
+                    self._watched_revision = revision
+                    self.reload()
+
+        threading.Thread(target=watch, name="ontology-watcher", daemon=True).start()
+
+    def status(self):
+        status = self._current.status() if self._current else {}
+        status["reloading"] = self._reloading
+        status["last_error"] = self._last_error
+        status["warm_up"] = self._warm_up
+        return status
@@ -0,0 +1,137 @@
+"""
+"¿Qué puedo hornear con esto?": postres cubiertos por una despensa.
+
+Los ingredientes de la ontología están duplicados por idioma
+(Ing_Zucker_de, Ing_sucre_fr...), pero el poblador les pone a todos un
+:nombre en inglés. Ese nombre normalizado identifica el concepto, así
+que "azúcar", "Zucker" y "sugar" marcan la misma columna.
+
+Cada postre es una fila de una matriz booleana postres × conceptos. Con
+la despensa convertida en un vector booleano, los ingredientes que le
+faltan a todos los postres se cuentan en una sola operación de NumPy.
+"""
+import numpy as np
+from rdflib import Literal
+
+from text_utils import normalize_text
+
+
+def _local_name(uri):
+    return str(uri).split("#")[-1]
+
+
+def ingredient_concept(store, ns, ingredient):
+    """Clave del concepto de un ingrediente: su :nombre en inglés normalizado"""
+    labels = [v for v in store.objects(ingredient, ns.nombre) if isinstance(v, Literal)]
+    english = [v for v in labels if v.language == 'en']
+    chosen = english or labels
+    return normalize_text(chosen[0]) if chosen else normalize_text(_local_name(ingredient))
+
+
+class PantryIndex:
+    """Matriz de incidencia postre × concepto de ingrediente"""
+
+    def __init__(self, desserts, concepts, matrix, aliases, names):
+        self.desserts = desserts        # fila -> nombre local del postre
+        self.concepts = concepts        # columna -> clave del concepto
+        self.matrix = matrix            # bool (postres, conceptos)
+        self._aliases = aliases         # texto normalizado / nombre local -> {columnas}
+        self._names = names             # nombre local o concepto -> {idioma: nombre}
+        self._row_sizes = matrix.sum(axis=1)
+
+    @classmethod
+    def from_store(cls, store, ns):
+        concept_of = {}                 # URI del ingrediente -> clave del concepto
+        aliases = {}
+        names = {}
+
+        rows = {}
+        for dessert, ingredient in store.subject_objects(ns.tieneIngrediente):
+            if ingredient not in concept_of:
+                key = concept_of[ingredient] = ingredient_concept(store, ns, ingredient)
+                concept_names = names.setdefault(key, {})
+                aliases.setdefault(_local_name(ingredient).lower(), set()).add(key)
+                aliases.setdefault(key, set()).add(key)
+                for value in store.objects(ingredient, ns.nombre):
+                    if isinstance(value, Literal):
+                        aliases.setdefault(normalize_text(value), set()).add(key)
+                        concept_names.setdefault(value.language, str(value))
+            rows.setdefault(dessert, set()).add(concept_of[ingredient])
+
+        desserts = sorted(rows, key=str)
+        concepts = sorted({key for keys in rows.values() for key in keys})
+        column = {key: i for i, key in enumerate(concepts)}
+
+        matrix = np.zeros((len(desserts), len(concepts)), dtype=bool)
+        for i, dessert in enumerate(desserts):
+            matrix[i, [column[key] for key in rows[dessert]]] = True
+            names[_local_name(dessert)] = {
+                v.language: str(v) for v in store.objects(dessert, ns.nombre) if isinstance(v, Literal)
+            }
+
+        aliases = {text: frozenset(column[key] for key in keys) for text, keys in aliases.items()}
+        return cls([_local_name(d) for d in desserts], concepts, matrix, aliases, names)
+
+    def resolve(self, ingredients):
+        """
+        Columnas de la despensa. Acepta nombres en cualquier idioma, nombres
+        locales o URIs. Devuelve (columnas, ingredientes no reconocidos).
+        """
+        columns = set()
+        unknown = []
+        for ingredient in ingredients:
+            text = ingredient.strip()
+            if not text:
+                continue
+            if text.startswith(("http://", "https://")):
+                text = _local_name(text)
+            normalized = normalize_text(text)
+            matched = (self._aliases.get(normalized) or self._aliases.get(text.lower())
+                       # Plural sencillo: "eggs" -> "egg", "huevos" -> "huevo", "tomatoes" -> "tomato"
+                       or (normalized.endswith('s') and self._aliases.get(normalized[:-1]))
+                       or (normalized.endswith('es') and self._aliases.get(normalized[:-2])))
+            if matched:
+                columns |= matched
+            else:
+                unknown.append(ingredient)
+        return columns, unknown
+
+    def _name(self, key, language):
+        names = self._names.get(key, {})
+        return names.get(language) or names.get('en') or next(iter(names.values()), key)
+
+    def can_bake(self, ingredients, language='es', max_missing=1, limit=20, allowed=None):
+        """
+        Postres cuyos ingredientes están cubiertos por la despensa o a los
+        que les faltan como mucho max_missing, ordenados por lo que falta.
+        allowed restringe los postres (p. ej. a la partición del idioma).
+        """
+        columns, unknown = self.resolve(ingredients)
+        pantry = np.zeros(len(self.concepts), dtype=bool)
+        pantry[list(columns)] = True
+
+        missing = (self.matrix & ~pantry).sum(axis=1)
+        have = self._row_sizes - missing
+        candidates = np.flatnonzero((missing <= max_missing) & (have > 0))
+
+        results = []
+        for row in sorted(candidates, key=lambda r: (missing[r], -have[r], self.desserts[r])):
+            name = self.desserts[row]
+            if allowed is not None and name not in allowed:
+                continue
+            results.append({
+                "id": name,
+                "nombre": self._name(name, language),
+                "ingredientes": int(self._row_sizes[row]),
+                "tiene": int(have[row]),
+                "faltan": [self._name(self.concepts[col], language)
+                           for col in np.flatnonzero(self.matrix[row] & ~pantry)],
+            })
+            if len(results) >= limit:
+                break
+
+        return results, unknown
+
+    def stats(self):
+        return {"desserts": len(self.desserts), "concepts": len(self.concepts),
+                "matrix_bytes": int(self.matrix.nbytes)}
@@ -0,0 +1,138 @@
+"""
+Registro muestreado de consultas, con rotación por tamaño.
+
+Cada petición de búsqueda puede dejar una línea JSON con la consulta
+normalizada (palabras en minúsculas), el idioma y su origen (page, api,
+dbpedia). Registrar cuesta una comparación con un número aleatorio y,
+si la consulta entra en la muestra, añadir una tupla a una lista: un
+hilo en segundo plano escribe el lote cada pocos segundos.
+
+Varios procesos (serve.py) pueden escribir en el mismo fichero: cada
+lote se escribe con una sola llamada en modo append bajo un bloqueo de
+fichero (fcntl, si existe), que protege también la rotación
+(consultas.jsonl -> .1 -> .2 ...).
+
+top_queries() cuenta las consultas del registro y sus copias rotadas;
+la aplicación las ejecuta al arrancar y tras cada recarga para que los
+primeros usuarios no paguen la cache vacía. loadtest.py reproduce el
+mismo fichero con --log.
+"""
+from collections import Counter
+import json
+import os
+import random
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:     # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+
+class QueryLog:
+    """Registro de consultas muestreado, en lotes y con rotación"""
+
+    def __init__(self, path, sample_rate=0.1, max_bytes=5 * 1024 * 1024, backups=3, flush_seconds=2.0):
+        self.path = path
+        self.sample_rate = sample_rate if path else 0.0
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self._pending = []
+        self._lock = threading.Lock()
+        self._pid = None                # Proceso con hilo de escritura (se rehace tras fork)
+        self.recorded = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def record(self, tokens, language, source):
+        """Anotar una consulta si entra en la muestra"""
+        if not tokens or random.random() >= self.sample_rate:
+            return
+        entry = (round(time.time(), 3), list(tokens), language, source)
+        with self._lock:
+            if self._pid != os.getpid():
+                # Primer registro en este proceso (o en un trabajador recién creado)
+                self._pid = os.getpid()
+                self._pending = []
+                threading.Thread(target=self._flush_loop, name="query-log", daemon=True).start()
+            self._pending.append(entry)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+    def flush(self):
+        """Escribir las consultas pendientes (un write por lote)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        data = "".join(json.dumps({"t": t, "tokens": tokens, "lang": language, "source": source},
+                                  ensure_ascii=False) + "\n"
+                       for t, tokens, language, source in pending).encode("utf-8")
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path + ".lock", "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self._rotate_if_needed(len(data))
+                with open(self.path, "ab") as f:
+                    f.write(data)
+            self.recorded += len(pending)
+        except OSError as e:
+            self.dropped += len(pending)
+            print(f"⚠ No se pudo escribir el registro de consultas: {e}")
+
+    def _rotate_if_needed(self, incoming):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def files(self):
+        """Registro actual y copias rotadas que existan"""
+        candidates = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backups + 1)]
+        return [path for path in candidates if path and os.path.exists(path)]
+
+    def stats(self):
+        return {"path": self.path, "sample_rate": self.sample_rate, "recorded": self.recorded,
+                "pending": len(self._pending), "dropped": self.dropped}
+
+
+def read_entries(paths):
+    """Entradas (tokens, idioma, origen) de los ficheros dados; ignora líneas dañadas"""
+    for path in paths:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        yield tuple(entry["tokens"]), entry["lang"], entry["source"]
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            continue
+
+
+def top_queries(paths, n, sources=None):
+    """Las n consultas más frecuentes como (origen, idioma, tokens)"""
+    counts = Counter((source, language, tokens) for tokens, language, source in read_entries(paths)
+                     if tokens and (sources is None or source in sources))
+    return [query for query, _ in counts.most_common(n)]
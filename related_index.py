@@ -0,0 +1,214 @@
+"""
+Postres relacionados y sugerencias de maridaje de ingredientes.
+
+Al cargar la ontología se construye una matriz dispersa (formato CSR con
+arrays de NumPy) postre × característica, donde las características son
+los conceptos de ingrediente, herramienta y técnica. Los ingredientes
+que :combinaBienCon alguno del postre entran también con un peso menor,
+así que dos postres se parecen aunque usen ingredientes distintos si
+estos combinan bien entre sí.
+
+Con esa matriz se precalcula para cada postre su lista de vecinos y sus
+sugerencias de ingredientes (co-ocurrencia ponderada por combinaBienCon).
+Las listas viven en el snapshot y se reconstruyen en cada recarga.
+"""
+import math
+
+import numpy as np
+from rdflib import RDFS, Literal
+
+from pantry_index import ingredient_concept
+
+# Peso de un ingrediente que no está en el postre pero combina bien con uno que sí
+PAIRING_FEATURE_WEIGHT = 0.5
+# Peso extra de un par :combinaBienCon frente a una co-ocurrencia simple
+PAIRING_COOCCURRENCE_WEIGHT = 3.0
+# Postres distintos (conceptos, no traducciones) guardados como vecinos de
+# cada postre, con todas sus versiones: se filtran por idioma al consultar
+MAX_NEIGHBOURS = 50
+MAX_PAIRINGS = 10
+
+
+def _local_name(uri):
+    return str(uri).split("#")[-1]
+
+
+class RelatedIndex:
+    """Vecinos y maridajes precalculados por postre"""
+
+    def __init__(self, neighbours, pairings, names, stats):
+        self._neighbours = neighbours    # postre -> [(postre, puntuación)]
+        self._pairings = pairings        # postre -> [(concepto, puntuación)]
+        self._names = names              # postre o concepto -> {idioma: nombre}
+        self._stats = stats
+
+    @classmethod
+    def from_store(cls, store, ns):
+        predicates = {'ing': ns.tieneIngrediente, 'her': ns.usaHerramienta, 'tec': ns.requiereTecnica}
+        names = {}
+
+        def feature(kind, node):
+            key = f"{kind}:{ingredient_concept(store, ns, node)}"
+            concept_names = names.setdefault(key, {})
+            for value in store.objects(node, ns.nombre):
+                if isinstance(value, Literal):
+                    concept_names.setdefault(value.language, str(value))
+            return key
+
+        # Características de cada postre
+        dessert_features = {}
+        for kind, predicate in predicates.items():
+            for dessert, node in store.subject_objects(predicate):
+                dessert_features.setdefault(dessert, set()).add(feature(kind, node))
+
+        # Pares :combinaBienCon entre conceptos de ingrediente (simétrico)
+        pairs = set()
+        for a, b in store.subject_objects(ns.combinaBienCon):
+            ka, kb = feature('ing', a), feature('ing', b)
+            pairs.add((ka, kb))
+            pairs.add((kb, ka))
+
+        desserts = sorted(dessert_features, key=str)
+        features = sorted({f for fs in dessert_features.values() for f in fs} | {a for a, _ in pairs})
+        column = {f: i for i, f in enumerate(features)}
+        pair_columns = {}
+        for a, b in pairs:
+            pair_columns.setdefault(column[a], set()).add(column[b])
+
+        # Matriz CSR: filas = postres, pesos binarios ampliados con los maridajes
+        indptr, indices, data = [0], [], []
+        for dessert in desserts:
+            row = {column[f]: 1.0 for f in dessert_features[dessert]}
+            for col in list(row):
+                for partner in pair_columns.get(col, ()):
+                    row.setdefault(partner, PAIRING_FEATURE_WEIGHT)
+            for col in sorted(row):
+                indices.append(col)
+                data.append(row[col])
+            indptr.append(len(indices))
+        indptr = np.asarray(indptr, dtype=np.int32)
+        indices = np.asarray(indices, dtype=np.int32)
+        data = np.asarray(data, dtype=np.float32)
+
+        # IDF: compartir "azúcar" dice menos que compartir "cardamomo"
+        doc_freq = np.bincount(indices, minlength=len(features))
+        idf = np.log((1 + len(desserts)) / (1 + doc_freq)).astype(np.float32) + 1.0
+        data *= idf[indices]
+        for i in range(len(desserts)):
+            start, end = indptr[i], indptr[i + 1]
+            norm = math.sqrt(float(np.dot(data[start:end], data[start:end]))) or 1.0
+            data[start:end] /= norm
+
+        # Transpuesta (CSC) para recorrer los postres de cada característica
+        order = np.argsort(indices, kind="stable")
+        col_rows = np.repeat(np.arange(len(desserts), dtype=np.int32), np.diff(indptr))[order]
+        col_data = data[order]
+        col_ptr = np.concatenate(([0], np.cumsum(doc_freq))).astype(np.int32)
+
+        # Las traducciones de un postre comparten recurso de DBpedia (rdfs:seeAlso)
+        # y todas sus características: son el mismo concepto, no vecinos
+        concept = []
+        for dessert in desserts:
+            resources = sorted(str(r) for r in store.objects(dessert, RDFS.seeAlso))
+            concept.append(resources[0] if resources else str(dessert))
+
+        local_names = [_local_name(d) for d in desserts]
+        neighbours = {}
+        for i in range(len(desserts)):
+            scores = np.zeros(len(desserts), dtype=np.float32)
+            for col, weight in zip(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]):
+                start, end = col_ptr[col], col_ptr[col + 1]
+                scores[col_rows[start:end]] += weight * col_data[start:end]
+            scores[i] = 0.0
+            # Los MAX_NEIGHBOURS conceptos más parecidos, cada uno con todas
+            # sus versiones: cada idioma conserva sus MAX_NEIGHBOURS vecinos
+            kept, concepts = [], set()
+            for j in np.argsort(-scores, kind="stable"):
+                if scores[j] <= 0:
+                    break
+                if concept[j] == concept[i]:
+                    continue
+                if concept[j] not in concepts:
+                    if len(concepts) >= MAX_NEIGHBOURS:
+                        continue
+                    concepts.add(concept[j])
+                kept.append((local_names[j], round(float(scores[j]), 4)))
+            neighbours[local_names[i]] = kept
+
+        # Co-ocurrencia de ingredientes (sobre la pertenencia real, sin
+        # ampliar) sin materializar la matriz ingredientes × ingredientes:
+        # incidencia postre × ingrediente en CSR y su transpuesta, y para
+        # cada postre se suman las filas de los postres que comparten algo
+        ingredient_cols = np.asarray([i for i, f in enumerate(features) if f.startswith('ing:')], dtype=np.int32)
+        position = {col: i for i, col in enumerate(ingredient_cols)}
+        inc_indptr, inc_indices = [0], []
+        for dessert in desserts:
+            inc_indices.extend(sorted(position[column[f]] for f in dessert_features[dessert]
+                                      if f.startswith('ing:')))
+            inc_indptr.append(len(inc_indices))
+        inc_indptr = np.asarray(inc_indptr, dtype=np.int32)
+        inc_indices = np.asarray(inc_indices, dtype=np.int32)
+        inc_rows = np.repeat(np.arange(len(desserts), dtype=np.int32), np.diff(inc_indptr))
+        inc_order = np.argsort(inc_indices, kind="stable")
+        ing_rows = inc_rows[inc_order]
+        ing_ptr = np.concatenate(([0], np.cumsum(np.bincount(inc_indices, minlength=len(ingredient_cols)))))
+        ing_pairs = {position[a]: [position[b] for b in partners] for a, partners in pair_columns.items()}
+
+        pairings = {}
+        for i in range(len(desserts)):
+            present = inc_indices[inc_indptr[i]:inc_indptr[i + 1]]
+            if not len(present):
+                continue
+            # Ingredientes compartidos con cada postre
+            shared = np.zeros(len(desserts), dtype=np.float32)
+            for a in present:
+                shared[ing_rows[ing_ptr[a]:ing_ptr[a + 1]]] += 1.0
+            touched = np.flatnonzero(shared)
+            starts, lengths = inc_indptr[touched], np.diff(inc_indptr)[touched]
+            nonzeros = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            scores = np.bincount(inc_indices[nonzeros], weights=np.repeat(shared[touched], lengths),
+                                 minlength=len(ingredient_cols)).astype(np.float32)
+            for a in present:
+                for b in ing_pairs.get(a, ()):
+                    scores[b] += PAIRING_COOCCURRENCE_WEIGHT
+            scores[present] = 0.0
+            top = np.argsort(-scores, kind="stable")[:MAX_PAIRINGS]
+            pairings[local_names[i]] = [(features[ingredient_cols[j]], float(scores[j]))
+                                        for j in top if scores[j] > 0]
+
+        for dessert, name in zip(desserts, local_names):
+            names[name] = {v.language: str(v) for v in store.objects(dessert, ns.nombre)
+                           if isinstance(v, Literal)}
+
+        stats = {"desserts": len(desserts), "features": len(features), "nonzeros": int(len(indices)),
+                 "pairs": len(pairs) // 2}
+        return cls(neighbours, pairings, names, stats)
+
+    def _name(self, key, language):
+        names = self._names.get(key, {})
+        return names.get(language) or names.get('en') or next(iter(names.values()), key.split(':', 1)[-1])
+
+    def related(self, local_name, language='es', k=5, allowed=None):
+        """
+        Postres parecidos y maridajes sugeridos. Devuelve None si el postre
+        no existe. allowed restringe los vecinos (p. ej. al idioma).
+        """
+        if local_name not in self._neighbours:
+            return None
+
+        similar = []
+        for name, score in self._neighbours[local_name]:
+            if allowed is not None and name not in allowed:
+                continue
+            similar.append({"id": name, "nombre": self._name(name, language), "score": score})
+            if len(similar) >= k:
+                break
+
+        pairings = [{"nombre": self._name(key, language), "score": score}
+                    for key, score in self._pairings.get(local_name, [])[:k]]
+
+        return {"id": local_name, "nombre": self._name(local_name, language),
+                "similares": similar, "maridajes": pairings}
+
+    def stats(self):
+        return dict(self._stats)
@@ -0,0 +1,53 @@
+"""
+Cache LRU en memoria, segura entre hilos, para resultados de búsqueda.
+
+Las claves incluyen la versión de la ontología, así que un resultado de
+una versión anterior nunca se sirve; además, al cambiar de versión,
+retain() descarta las entradas de las versiones anteriores para liberar
+la memoria y conserva las de la nueva, que ya vienen precalentadas.
+"""
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """Diccionario con tamaño máximo que descarta lo usado hace más tiempo"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def retain(self, keep):
+        """Descartar las entradas cuya clave no cumple keep(clave)"""
+        with self._lock:
+            for key in [key for key in self._data if not keep(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,144 @@
+"""
+Informe JSON de una ejecución del poblador.
+
+Recoge, sin depender del resto del poblador:
+
+- tiempo de reloj por fase (exclusivo: si una traducción ocurre dentro
+  de la construcción del grafo, su tiempo cuenta solo en la traducción);
+- número de llamadas, errores y latencias (p50/p95/máx) por tipo de
+  llamada remota (SPARQL, traducción);
+- aciertos de cache, reintentos y contadores libres;
+- trazas por postre (tiempo y fases de cada uno), solo en modo detallado.
+
+El JSON resultante se puede guardar tras cada ejecución y comparar para
+ver qué fase optimizar y detectar pérdidas de rendimiento.
+"""
+from contextlib import contextmanager
+import json
+import time
+
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano de una lista (None si está vacía)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, int(round(len(ordered) * fraction)) - 1)]
+
+
+class RunReport:
+    """Métricas de una ejecución: fases, llamadas, caches y trazas"""
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.phases = {}              # fase -> segundos (exclusivos)
+        self._stack = []              # [fase, inicio, tiempo de fases hijas]
+        self.calls = {}               # tipo -> {"latencies": [...], "errors": n}
+        self.cache = {}               # tipo -> {"hits": n, "misses": n}
+        self.retries = {}             # tipo -> n
+        self.counters = {}
+        self.traces = []
+        self._trace = None
+
+    # ------------------------------------------------------------------
+    # Fases y llamadas
+    # ------------------------------------------------------------------
+    @contextmanager
+    def phase(self, name):
+        frame = [name, time.perf_counter(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            total = time.perf_counter() - frame[1]
+            self.phases[name] = self.phases.get(name, 0.0) + total - frame[2]
+            if self._stack:
+                self._stack[-1][2] += total
+
+    @contextmanager
+    def call(self, kind):
+        """Medir una llamada remota; una excepción cuenta como error y se propaga"""
+        stats = self.calls.setdefault(kind, {"latencies": [], "errors": 0})
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["latencies"].append(time.perf_counter() - start)
+
+    def cache_lookup(self, kind, hit):
+        stats = self.cache.setdefault(kind, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    def retry(self, kind):
+        self.retries[kind] = self.retries.get(kind, 0) + 1
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # ------------------------------------------------------------------
+    # Trazas por elemento (modo detallado)
+    # ------------------------------------------------------------------
+    def begin_trace(self, **fields):
+        if self.verbose:
+            self._trace = (fields, time.perf_counter(), dict(self.phases),
+                           {kind: len(stats["latencies"]) for kind, stats in self.calls.items()})
+
+    def end_trace(self, **fields):
+        if not self.verbose or self._trace is None:
+            return
+        start_fields, start, phases_before, calls_before = self._trace
+        self._trace = None
+        trace = dict(start_fields, **fields)
+        trace["seconds"] = round(time.perf_counter() - start, 4)
+        trace["phases"] = {name: round(total - phases_before.get(name, 0.0), 4)
+                           for name, total in self.phases.items()
+                           if total - phases_before.get(name, 0.0) > 0}
+        trace["calls"] = {kind: len(stats["latencies"]) - calls_before.get(kind, 0)
+                          for kind, stats in self.calls.items()
+                          if len(stats["latencies"]) > calls_before.get(kind, 0)}
+        self.traces.append(trace)
+
+    # ------------------------------------------------------------------
+    # Resultado
+    # ------------------------------------------------------------------
+    def to_dict(self, items_counter="desserts"):
+        elapsed = time.perf_counter() - self._start
+        report = {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "wall_seconds": round(elapsed, 3),
+            "phases": {name: round(seconds, 3) for name, seconds in
+                       sorted(self.phases.items(), key=lambda item: -item[1])},
+            "calls": {},
+            "cache": {},
+            "retries": dict(self.retries),
+            "counters": dict(self.counters),
+        }
+        for kind, stats in self.calls.items():
+            latencies = stats["latencies"]
+            report["calls"][kind] = {
+                "count": len(latencies),
+                "errors": stats["errors"],
+                "total_seconds": round(sum(latencies), 3),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 1) if latencies else None,
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+                "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+            }
+        for kind, stats in self.cache.items():
+            lookups = stats["hits"] + stats["misses"]
+            report["cache"][kind] = dict(stats, hit_rate=round(stats["hits"] / lookups, 3) if lookups else None)
+        items = self.counters.get(items_counter, 0)
+        report["throughput"] = {f"{items_counter}_per_second": round(items / elapsed, 3) if elapsed else None}
+        if self.verbose:
+            report["traces"] = self.traces
+        return report
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
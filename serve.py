@@ -0,0 +1,177 @@
+"""
+Punto de entrada de producción con varios procesos (pre-fork).
+
+El proceso maestro importa app.py una sola vez (parseo de la ontología
+y construcción de todos los índices), congela el recolector de basura
+y después crea los procesos trabajadores con fork(). Los trabajadores
+heredan la memoria del maestro con copy-on-write y comparten además el
+índice vectorial, que está mapeado desde disco.
+
+Recarga sin cortes: al recibir SIGHUP (o POST /admin/reload en
+cualquier trabajador, o un cambio del fichero con ONTOLOGY_WATCH=1) el
+maestro reconstruye la ontología, arranca una nueva generación de
+trabajadores y pide a los anteriores que terminen sus peticiones en
+curso y salgan.
+
+Uso:
+    python serve.py --workers 4 --port 8000
+    kill -HUP <pid del maestro>      # recargar la ontología
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Servidor pre-fork del buscador de repostería")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="Número de procesos trabajadores")
+    parser.add_argument("--backlog", type=int, default=128)
+    return parser.parse_args()
+
+
+def preload():
+    """Cargar la aplicación en el maestro y dejar la memoria lista para compartir"""
+    start = time.perf_counter()
+    import app as application
+
+    # Congelar los objetos ya creados: el GC no volverá a recorrerlos, así
+    # que no escribirá en sus cabeceras y las páginas no se copiarán en
+    # cada trabajador al recolectar
+    gc.collect()
+    gc.freeze()
+
+    print(f"✓ Aplicación precargada en {time.perf_counter() - start:.2f}s "
+          f"({gc.get_freeze_count()} objetos congelados)")
+    return application
+
+
+def run_worker(application, listener, host, port, master_pid):
+    """Bucle de un trabajador: atiende peticiones sobre el socket heredado"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+
+    # Las recargas las hace el maestro para todos los trabajadores a la vez
+    def request_reload():
+        os.kill(master_pid, signal.SIGHUP)
+        return True
+    application.ontology.reload_hook = request_reload
+
+    server = make_server(host, port, application.app, threaded=True, fd=listener.fileno())
+
+    # SIGTERM: dejar de aceptar conexiones y terminar las peticiones en curso
+    def graceful_stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, graceful_stop)
+
+    try:
+        server.serve_forever()
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and thread.name.startswith("Thread"):
+                thread.join(timeout=30)
+    finally:
+        # os._exit no pasa por atexit: escribir antes las consultas pendientes
+        application.query_log.flush()
+        os._exit(0)
+
+
+def spawn(application, listener, host, port):
+    master_pid = os.getpid()
+    pid = os.fork()
+    if pid == 0:
+        run_worker(application, listener, host, port, master_pid)
+    return pid
+
+
+def terminate(pids):
+    for pid in list(pids):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+
+
+def main():
+    args = parse_args()
+    application = preload()
+
+    listener = socket.create_server((args.host, args.port), backlog=args.backlog, reuse_port=False)
+    listener.set_inheritable(True)
+
+    workers = set()
+    retiring = set()
+    shutting_down = False
+    reload_requested = False
+
+    def stop(signum, frame):
+        nonlocal shutting_down
+        shutting_down = True
+        terminate(workers | retiring)
+
+    def request_reload(signum=None, frame=None):
+        nonlocal reload_requested
+        reload_requested = True
+        return True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGHUP, request_reload)
+    # El vigilante de ficheros (ONTOLOGY_WATCH=1) corre en el maestro
+    application.ontology.reload_hook = request_reload
+
+    for _ in range(args.workers):
+        workers.add(spawn(application, listener, args.host, args.port))
+
+    print(f"✓ Servidor escuchando en http://{args.host}:{args.port} "
+          f"con {args.workers} trabajadores (maestro {os.getpid()})", flush=True)
+
+    while workers or retiring:
+        if reload_requested and not shutting_down:
+            reload_requested = False
+            print("🔄 Recargando la ontología en el maestro...", flush=True)
+            try:
+                gc.unfreeze()
+                application.ontology.load()
+                gc.collect()
+                gc.freeze()
+            except Exception as e:
+                print(f"✗ Error recargando, se mantiene la versión anterior: {e}", flush=True)
+            else:
+                # Nueva generación primero; la anterior termina lo que tiene en curso
+                previous = workers
+                workers = {spawn(application, listener, args.host, args.port) for _ in range(args.workers)}
+                retiring |= previous
+                terminate(previous)
+
+        # Recoger trabajadores terminados y reemplazar los que fallen
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.2)
+            continue
+        if pid in retiring:
+            retiring.discard(pid)
+            continue
+        workers.discard(pid)
+        if not shutting_down:
+            print(f"⚠ Trabajador {pid} terminó (estado {status}), reiniciando...", flush=True)
+            workers.add(spawn(application, listener, args.host, args.port))
+
+    listener.close()
+    print("✓ Servidor detenido")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""
+Almacén persistente de la ontología en SQLite (plugin de Store de rdflib).
+
+Las tripletas se guardan como ids enteros en una tabla con tres índices
+(SPO como clave primaria, POS y OSP), y cada término (URI, nodo en
+blanco o literal con idioma/tipo) una sola vez en la tabla de términos.
+Un Graph(store=SQLiteStore(...)) se usa igual que uno en memoria, pero
+los patrones se resuelven con los índices de SQLite sin cargar el grafo.
+
+- El poblador escribe en modo lectura/escritura: las tripletas se
+  acumulan en una transacción y graph.commit() las confirma de una vez
+  (y aumenta el número de revisión).
+- La aplicación abre el fichero en solo lectura: abrirlo no parsea nada
+  y read_revision() le dice cuándo hay confirmaciones nuevas.
+
+El diario WAL permite leer mientras el poblador escribe: los lectores
+ven siempre la última revisión confirmada.
+
+Uso:
+    python sqlite_store.py import reposteria_poblada_google.rdf ontologia.sqlite
+    python sqlite_store.py export ontologia.sqlite salida.rdf
+    python sqlite_store.py stats ontologia.sqlite
+"""
+from contextlib import contextmanager
+import argparse
+import os
+import sqlite3
+import threading
+import uuid
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import Store
+
+STORE_EXTENSIONS = (".sqlite", ".sqlite3", ".db")
+
+# Términos que se guardan en memoria en cada sentido (id <-> término rdflib)
+TERM_CACHE_SIZE = 200000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    lang TEXT NOT NULL DEFAULT '',
+    datatype TEXT NOT NULL DEFAULT '',
+    UNIQUE (value, kind, lang, datatype)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def is_store_file(path):
+    return bool(path) and path.lower().endswith(STORE_EXTENSIONS)
+
+
+def _encode(term):
+    """Término rdflib -> (kind, value, lang, datatype)"""
+    if isinstance(term, Literal):
+        return ("L", str(term), term.language or "", str(term.datatype) if term.datatype else "")
+    if isinstance(term, BNode):
+        return ("B", str(term), "", "")
+    return ("U", str(term), "", "")
+
+
+def _decode(kind, value, lang, datatype):
+    if kind == "L":
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    if kind == "B":
+        return BNode(value)
+    return URIRef(value)
+
+
+class SQLiteStore(Store):
+    """Store de rdflib sobre SQLite con índices SPO/POS/OSP"""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None, read_only=False):
+        self.read_only = read_only
+        self.path = None
+        self._local = threading.local()
+        self._writer = None
+        self._in_transaction = False
+        self._ids = {}       # término -> id (solo términos existentes)
+        self._terms = {}     # id -> término
+        super().__init__(configuration, identifier)
+
+    # ------------------------------------------------------------------
+    # Conexiones
+    # ------------------------------------------------------------------
+    def open(self, configuration, create=True):
+        self.path = configuration
+        if self.read_only:
+            if not os.path.exists(configuration):
+                raise FileNotFoundError(configuration)
+            return
+        # Escritor único, en modo autocommit: las transacciones se abren a mano
+        self._writer = sqlite3.connect(configuration, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        self._writer.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)", (uuid.uuid4().hex,))
+        self._writer.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', '0')")
+
+    def _connection(self):
+        if self._writer is not None:
+            return self._writer
+        # Una conexión por hilo y por proceso (no se comparten tras fork())
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, isolation_level=None)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def close(self, commit_pending_transaction=False):
+        if self._writer is not None:
+            if self._in_transaction:
+                self.commit() if commit_pending_transaction else self.rollback()
+            self._writer.close()
+            self._writer = None
+
+    # ------------------------------------------------------------------
+    # Transacciones
+    # ------------------------------------------------------------------
+    def _begin(self):
+        if self.read_only:
+            raise PermissionError(f"{self.path} está abierto en solo lectura")
+        if not self._in_transaction:
+            self._writer.execute("BEGIN IMMEDIATE")
+            self._in_transaction = True
+
+    def commit(self):
+        if self._in_transaction:
+            self._writer.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'revision'")
+            self._writer.execute("COMMIT")
+            self._in_transaction = False
+
+    def rollback(self):
+        if self._in_transaction:
+            self._writer.execute("ROLLBACK")
+            self._in_transaction = False
+            # Los ids creados en la transacción ya no existen
+            self._ids.clear()
+            self._terms.clear()
+
+    @contextmanager
+    def read_snapshot(self):
+        """Todas las lecturas del bloque ven la misma revisión confirmada"""
+        if self._writer is not None:
+            yield self
+            return
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+            yield self
+        finally:
+            conn.execute("COMMIT")
+
+    def revision(self):
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else 0
+
+    def signature(self):
+        """Identifica el contenido confirmado (fichero + revisión)"""
+        row = self._connection().execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()
+        return f"sqlite:{row[0] if row else ''}:{self.revision()}"
+
+    # ------------------------------------------------------------------
+    # Términos
+    # ------------------------------------------------------------------
+    def _id(self, term, create=False):
+        term_id = self._ids.get(term)
+        if term_id is not None:
+            return term_id
+        key = _encode(term)
+        conn = self._connection()
+        row = conn.execute("SELECT id FROM terms WHERE value = ? AND kind = ? AND lang = ? AND datatype = ?",
+                           (key[1], key[0], key[2], key[3])).fetchone()
+        if row is None:
+            if not create:
+                return None
+            term_id = conn.execute("INSERT INTO terms (kind, value, lang, datatype) VALUES (?, ?, ?, ?)",
+                                   key).lastrowid
+        else:
+            term_id = row[0]
+        if len(self._ids) >= TERM_CACHE_SIZE:
+            self._ids.clear()
+        self._ids[term] = term_id
+        return term_id
+
+    def _term(self, term_id):
+        term = self._terms.get(term_id)
+        if term is None:
+            row = self._connection().execute(
+                "SELECT kind, value, lang, datatype FROM terms WHERE id = ?", (term_id,)).fetchone()
+            term = _decode(*row)
+            if len(self._terms) >= TERM_CACHE_SIZE:
+                self._terms.clear()
+            self._terms[term_id] = term
+        return term
+
+    def _where(self, triple):
+        """Cláusula WHERE del patrón, o None si algún término no existe"""
+        clauses, params = [], []
+        for column, term in zip("spo", triple):
+            if term is None:
+                continue
+            term_id = self._id(term)
+            if term_id is None:
+                return None
+            clauses.append(f"{column} = ?")
+            params.append(term_id)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # ------------------------------------------------------------------
+    # Interfaz de Store
+    # ------------------------------------------------------------------
+    def add(self, triple, context=None, quoted=False):
+        self._begin()
+        s, p, o = (self._id(term, create=True) for term in triple)
+        self._writer.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", (s, p, o))
+
+    def remove(self, triple, context=None):
+        self._begin()
+        where = self._where(triple)
+        if where is not None:
+            self._writer.execute("DELETE FROM triples" + where[0], where[1])
+
+    def triples(self, triple_pattern, context=None):
+        where = self._where(triple_pattern)
+        if where is None:
+            return
+        # Cursor recorrido de forma perezosa: no se cargan todas las filas
+        rows = self._connection().execute("SELECT s, p, o FROM triples" + where[0], where[1])
+        term = self._term
+        for s, p, o in rows:
+            yield (term(s), term(p), term(o)), iter(())
+
+    def __len__(self, context=None):
+        return self._connection().execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        if self.read_only:
+            return
+        existing = self.namespace(prefix)
+        if existing is not None and not override:
+            return
+        if existing != namespace:
+            self._begin()
+            self._writer.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                                 (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        row = self._connection().execute("SELECT uri FROM namespaces WHERE prefix = ?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        row = self._connection().execute("SELECT prefix FROM namespaces WHERE uri = ?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        for prefix, uri in self._connection().execute("SELECT prefix, uri FROM namespaces").fetchall():
+            yield prefix, URIRef(uri)
+
+
+def open_graph(path, read_only=False):
+    """Graph de rdflib sobre el almacén SQLite de 'path'"""
+    store = SQLiteStore(read_only=read_only)
+    store.open(path)
+    return Graph(store=store, bind_namespaces="none")
+
+
+def read_revision(path):
+    """Revisión confirmada del almacén (consulta barata para detectar cambios)"""
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return int(row[0]) if row else None
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def import_rdf(rdf_file, path, rdf_format="xml"):
+    """Cargar un fichero RDF en el almacén en una sola transacción"""
+    source = Graph(bind_namespaces="core")
+    source.parse(rdf_file, format=rdf_format)
+    graph = open_graph(path)
+    try:
+        for prefix, namespace in source.namespaces():
+            graph.bind(prefix, namespace)
+        for triple in source:
+            graph.add(triple)
+        graph.commit()
+        return len(graph)
+    finally:
+        graph.close()
+
+
+def export_rdf(path, rdf_file, rdf_format="xml"):
+    graph = open_graph(path, read_only=True)
+    target = Graph()
+    for prefix, namespace in graph.namespaces():
+        target.bind(prefix, namespace)
+    for triple in graph:
+        target.add(triple)
+    target.serialize(destination=rdf_file, format=rdf_format)
+    return len(target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Almacén SQLite de la ontología")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import", help="Cargar un fichero RDF/XML en el almacén")
+    p_import.add_argument("rdf_file")
+    p_import.add_argument("store")
+    p_export = sub.add_parser("export", help="Volcar el almacén a RDF/XML")
+    p_export.add_argument("store")
+    p_export.add_argument("rdf_file")
+    p_stats = sub.add_parser("stats")
+    p_stats.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        print(f"✓ {import_rdf(args.rdf_file, args.store)} tripletas en {args.store}")
+    elif args.command == "export":
+        print(f"✓ {export_rdf(args.store, args.rdf_file)} tripletas escritas en {args.rdf_file}")
+    else:
+        graph = open_graph(args.store, read_only=True)
+        print(f"{args.store}: {len(graph)} tripletas, revisión {graph.store.revision()}")
+
+
+if __name__ == "__main__":
+    main()
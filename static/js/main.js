@@ -32,6 +32,14 @@ const translations = {
         noLocalResults: 'No se encontraron resultados locales en',
         tryChangingLanguage: 'Intenta cambiar el idioma o realizar otra búsqueda',
         performSearch: 'Realiza una búsqueda para ver resultados locales',
+        showingResultsFor: 'Mostrando resultados para',
+        subclasses: 'Subclases',
+        instances: 'Instancias',
+        facetClass: 'Clase',
+        facetIngredient: 'Tipo de ingrediente',
+        facetCountry: 'País de origen',
+        showDetails: 'Ver detalles',
+        hideDetails: 'Ocultar detalles',
         
         // DBpedia
         searching: 'Buscando en DBpedia',
@@ -48,6 +56,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia no está disponible para este idioma',
         dbpediaOnlyAvailable: 'DBpedia solo está disponible en: Español, English y Français',
         dbpediaDisabled: 'No disponible',
+        dbpediaUnavailable: 'DBpedia no responde',
+        dbpediaDegraded: 'DBpedia lenta',
         loadMore: 'Cargar más resultados',
         loading: 'Cargando'
     },
@@ -78,6 +88,14 @@ const translations = {
         noLocalResults: 'No local results found in',
         tryChangingLanguage: 'Try changing the language or performing another search',
         performSearch: 'Perform a search to see local results',
+        showingResultsFor: 'Showing results for',
+        subclasses: 'Subclasses',
+        instances: 'Instances',
+        facetClass: 'Class',
+        facetIngredient: 'Ingredient type',
+        facetCountry: 'Country of origin',
+        showDetails: 'Show details',
+        hideDetails: 'Hide details',
         
         searching: 'Searching DBpedia',
         pleaseWait: 'This may take a few seconds',
@@ -93,6 +111,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia is not available for this language',
         dbpediaOnlyAvailable: 'DBpedia is only available in: Español, English and Français',
         dbpediaDisabled: 'Not available',
+        dbpediaUnavailable: 'DBpedia not responding',
+        dbpediaDegraded: 'DBpedia degraded',
         loadMore: 'Load more results',
         loading: 'Loading'
     },
@@ -123,6 +143,14 @@ const translations = {
         noLocalResults: 'Aucun résultat local trouvé en',
         tryChangingLanguage: 'Essayez de changer la langue ou effectuez une autre recherche',
         performSearch: 'Effectuez une recherche pour voir les résultats locaux',
+        showingResultsFor: 'Résultats affichés pour',
+        subclasses: 'Sous-classes',
+        instances: 'Instances',
+        facetClass: 'Classe',
+        facetIngredient: 'Type d\'ingrédient',
+        facetCountry: 'Pays d\'origine',
+        showDetails: 'Voir les détails',
+        hideDetails: 'Masquer les détails',
         
         searching: 'Recherche sur DBpedia',
         pleaseWait: 'Cela peut prendre quelques secondes',
@@ -138,6 +166,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia n\'est pas disponible pour cette langue',
         dbpediaOnlyAvailable: 'DBpedia est uniquement disponible en: Español, English et Français',
         dbpediaDisabled: 'Non disponible',
+        dbpediaUnavailable: 'DBpedia ne répond pas',
+        dbpediaDegraded: 'DBpedia dégradé',
         loadMore: 'Charger plus de résultats',
         loading: 'Chargement'
     },
@@ -168,6 +198,14 @@ const translations = {
         noLocalResults: 'Nessun risultato locale trovato in',
         tryChangingLanguage: 'Prova a cambiare lingua o esegui un\'altra ricerca',
         performSearch: 'Esegui una ricerca per vedere i risultati locali',
+        showingResultsFor: 'Risultati mostrati per',
+        subclasses: 'Sottoclassi',
+        instances: 'Istanze',
+        facetClass: 'Classe',
+        facetIngredient: 'Tipo di ingrediente',
+        facetCountry: 'Paese di origine',
+        showDetails: 'Mostra dettagli',
+        hideDetails: 'Nascondi dettagli',
         
         searching: 'Ricerca su DBpedia',
         pleaseWait: 'Questo potrebbe richiedere alcuni secondi',
@@ -183,6 +221,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia non è disponibile per questa lingua',
         dbpediaOnlyAvailable: 'DBpedia è disponibile solo in: Español, English e Français',
         dbpediaDisabled: 'Non disponibile',
+        dbpediaUnavailable: 'DBpedia non risponde',
+        dbpediaDegraded: 'DBpedia rallentata',
         loadMore: 'Carica più risultati',
         loading: 'Caricamento'
     },
@@ -213,6 +253,14 @@ const translations = {
         noLocalResults: 'Keine lokalen Ergebnisse gefunden in',
         tryChangingLanguage: 'Versuchen Sie die Sprache zu ändern oder eine andere Suche durchzuführen',
         performSearch: 'Führen Sie eine Suche durch, um lokale Ergebnisse zu sehen',
+        showingResultsFor: 'Ergebnisse werden angezeigt für',
+        subclasses: 'Unterklassen',
+        instances: 'Instanzen',
+        facetClass: 'Klasse',
+        facetIngredient: 'Zutatentyp',
+        facetCountry: 'Herkunftsland',
+        showDetails: 'Details anzeigen',
+        hideDetails: 'Details ausblenden',
         
         searching: 'Suche auf DBpedia',
         pleaseWait: 'Dies kann einige Sekunden dauern',
@@ -228,6 +276,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia ist für diese Sprache nicht verfügbar',
         dbpediaOnlyAvailable: 'DBpedia ist nur verfügbar in: Español, English und Français',
         dbpediaDisabled: 'Nicht verfügbar',
+        dbpediaUnavailable: 'DBpedia antwortet nicht',
+        dbpediaDegraded: 'DBpedia eingeschränkt',
         loadMore: 'Weitere Ergebnisse laden',
         loading: 'Laden'
     },
@@ -258,6 +308,14 @@ const translations = {
         noLocalResults: 'Nenhum resultado local encontrado em',
         tryChangingLanguage: 'Tente mudar o idioma ou realizar outra pesquisa',
         performSearch: 'Realize uma pesquisa para ver resultados locais',
+        showingResultsFor: 'Mostrando resultados para',
+        subclasses: 'Subclasses',
+        instances: 'Instâncias',
+        facetClass: 'Classe',
+        facetIngredient: 'Tipo de ingrediente',
+        facetCountry: 'País de origem',
+        showDetails: 'Ver detalhes',
+        hideDetails: 'Ocultar detalhes',
         
         searching: 'Pesquisando no DBpedia',
         pleaseWait: 'Isso pode levar alguns segundos',
@@ -273,6 +331,8 @@ const translations = {
         dbpediaNotAvailable: 'DBpedia não está disponível para este idioma',
         dbpediaOnlyAvailable: 'DBpedia está disponível apenas em: Español, English e Français',
         dbpediaDisabled: 'Não disponível',
+        dbpediaUnavailable: 'DBpedia não responde',
+        dbpediaDegraded: 'DBpedia instável',
         loadMore: 'Carregar mais resultados',
         loading: 'Carregando'
     }
@@ -322,9 +382,28 @@ function updateDBpediaBadge(language) {
         badge.textContent = '';
         badge.className = 'dbpedia-badge';
         tabButton.title = '';
+        refreshDBpediaStatus(language);
     }
 }
 
+function refreshDBpediaStatus(language) {
+    // Estado de los cortocircuitos del servidor: avisar antes de que el usuario espere
+    fetch('/api/dbpedia_status')
+        .then(res => res.json())
+        .then(data => {
+            const badge = document.getElementById('dbpediaBadge');
+            const availability = data.languages?.[language];
+            if (availability === 'unavailable') {
+                badge.textContent = t('dbpediaUnavailable', language);
+                badge.className = 'dbpedia-badge disabled';
+            } else if (availability === 'degraded') {
+                badge.textContent = t('dbpediaDegraded', language);
+                badge.className = 'dbpedia-badge degraded';
+            }
+        })
+        .catch(err => console.error('Error consultando el estado de DBpedia:', err));
+}
+
 // ==================== SISTEMA DE PESTAÑAS ====================
 function initTabs() {
     const tabButtons = document.querySelectorAll('.tab-button');
@@ -410,22 +489,32 @@ function loadDBpediaResults(term, language, append = false) {
     isLoadingMore = true;
 
     // Realizar búsqueda en DBpedia con el idioma seleccionado
-    fetch("/dbpedia_search", {
-        method: "POST",
-        headers: { 
-            "Content-Type": "application/json" 
-        },
-        body: JSON.stringify({ 
-            term: term,
-            language: language,
-            limit: 3,
-            offset: currentOffset
-        })
-    })
+    // GET: el navegador puede reutilizar o revalidar (ETag) las páginas ya vistas
+    const params = new URLSearchParams({
+        term: term,
+        language: language,
+        limit: 3,
+        offset: currentOffset
+    });
+    fetch(`/dbpedia_search?${params}`)
     .then(res => res.json())
     .then(data => {
         isLoadingMore = false;
         
+        // Endpoint caído: el servidor responde al instante sin consultar
+        if (data.error === 'dbpedia_unavailable') {
+            container.innerHTML = `
+                <div class="no-results warning-message">
+                    ⚠️ ${t('dbpediaUnavailable', language)}
+                    <br><br>
+                    <small style="opacity: 0.8;">${t('tryAgain', language)}</small>
+                </div>
+            `;
+            countElement.textContent = t('dbpediaUnavailable', language);
+            updateDBpediaBadge(language);
+            return;
+        }
+
         // Verificar si hay error por idioma no habilitado
         if (data.error === 'dbpedia_disabled') {
             container.innerHTML = `
@@ -637,6 +726,17 @@ function setupSearchValidation() {
             top: 0,
             behavior: 'smooth'
         });
+
+        // Con JavaScript la búsqueda se pide a la API y se pinta según llega;
+        // sin él, el formulario sigue funcionando con la página renderizada
+        if (window.fetch && window.ReadableStream) {
+            e.preventDefault();
+            const lang = languageSelector.value;
+            // Misma URL que el formulario GET: recargar la página reutiliza su ETag
+            history.replaceState(null, '', `/?${new URLSearchParams({ term: searchTerm, language: lang })}`);
+            searchLocal(searchTerm, lang);
+            loadDBpediaResults(searchTerm, lang);
+        }
     });
 
     // Detectar cambio de idioma y aplicar traducciones + actualizar badge
@@ -671,6 +771,340 @@ function setupSearchValidation() {
     });
 }
 
+// ==================== FACETAS ====================
+function setupFacets() {
+    // Al marcar o desmarcar un valor se repite la búsqueda con el nuevo filtro
+    document.querySelectorAll('.facet-option input[type="checkbox"]').forEach(checkbox => {
+        checkbox.addEventListener('change', () => {
+            const term = document.getElementById('searchInput').value.trim();
+            searchLocal(term, document.getElementById('languageSelector').value, getFacetSelections());
+        });
+    });
+}
+
+function getFacetSelections() {
+    return Array.from(document.querySelectorAll('.facet-option input:checked'))
+        .map(checkbox => [checkbox.name, checkbox.value]);
+}
+
+function renderFacets(facets, selections, language) {
+    const titles = { clase: 'facetClass', ingrediente: 'facetIngredient', pais: 'facetCountry' };
+    const panel = document.createElement('div');
+    panel.className = 'facets-panel';
+    panel.id = 'facetsPanel';
+
+    for (const [facet, values] of Object.entries(facets || {})) {
+        const entries = Object.entries(values);
+        if (entries.length === 0) continue;
+        const selected = selections?.[facet] || [];
+
+        panel.innerHTML += `
+            <div class="facet-group">
+                <div class="section-title">${t(titles[facet], language)}</div>
+                <div class="tag-container">
+                    ${entries.map(([value, count]) => `
+                        <label class="facet-option">
+                            <input type="checkbox" form="searchForm" name="${facet}" value="${escapeHtml(value)}"
+                                   ${selected.includes(value) ? 'checked' : ''}>
+                            ${escapeHtml(value)} <span class="facet-count">(${count})</span>
+                        </label>
+                    `).join('')}
+                </div>
+            </div>
+        `;
+    }
+    return panel;
+}
+
+// ==================== BÚSQUEDA LOCAL (API) ====================
+let localSearchController = null;
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text ?? '';
+    return div.innerHTML;
+}
+
+function tagList(values) {
+    return values.map(value => `<span class="tag">${escapeHtml(value)}</span>`).join('');
+}
+
+function cardSection(titleKey, content, language) {
+    return `
+        <div class="card-section">
+            <div class="section-title">${t(titleKey, language)}</div>
+            ${content}
+        </div>
+    `;
+}
+
+function createLocalCard(item, language) {
+    // Tarjeta resumida; el detalle completo se pide a /api/item al abrirla
+    const card = document.createElement('div');
+    card.className = 'card local-result';
+    card.dataset.itemId = item.id;
+    card.dataset.relevance = item.relevance || 0;
+
+    const langInfo = window.APP_DATA?.languages?.[item.idioma];
+    let html = `
+        <div class="card-header">
+            <h3>
+                ${escapeHtml(item.nombre)}
+                <span class="source-badge source-local">LOCAL</span>
+                ${langInfo ? `<span class="lang-badge">${langInfo.flag}</span>` : ''}
+            </h3>
+        </div>
+    `;
+
+    if (item.tipo === 'clase') {
+        html += cardSection('type', `<div class="tag-container"><span class="tag">owl:Class</span>
+            <span class="tag">${item.num_instancias || 0} ${t('instances', language)}</span></div>`, language);
+    } else {
+        if (item.clases?.length) {
+            html += cardSection('classification', `<div class="tag-container">${tagList(item.clases)}</div>`, language);
+        }
+        if (item.descripcion) {
+            html += `<div class="card-section"><p class="card-summary">${escapeHtml(item.descripcion)}</p></div>`;
+        }
+    }
+
+    html += `
+        <div class="card-details"></div>
+        <button type="button" class="details-btn">${t('showDetails', language)}</button>
+    `;
+    card.innerHTML = html;
+    return card;
+}
+
+function renderCardDetails(item, language) {
+    let html = '';
+
+    if (item.tipo === 'clase') {
+        if (item.superclases?.length) {
+            html += cardSection('superclasses', `<div class="tag-container">${tagList(item.superclases)}</div>`, language);
+        }
+        if (item.subclases?.length) {
+            html += cardSection('subclasses', `<div class="tag-container">${tagList(item.subclases)}</div>`, language);
+        }
+        if (item.instancias?.length) {
+            html += cardSection('instances', `<div class="tag-container">${tagList(item.instancias)}</div>`, language);
+        }
+        return html;
+    }
+
+    const langInfo = window.APP_DATA?.languages?.[item.idioma];
+    if (langInfo) {
+        html += cardSection('language', `<div class="tag-container"><span class="tag">${langInfo.flag} ${langInfo.name}</span></div>`, language);
+    }
+    if (item.superclases?.length) {
+        html += cardSection('superclasses', `<div class="tag-container">${tagList(item.superclases)}</div>`, language);
+    }
+    if (item.es_producto) {
+        [['ingredients', item.ingredientes], ['tools', item.herramientas], ['techniques', item.tecnicas]]
+            .forEach(([key, values]) => {
+                if (values?.length) {
+                    html += cardSection(key, `<ul>${values.map(v => `<li>${escapeHtml(v)}</li>`).join('')}</ul>`, language);
+                }
+            });
+    }
+    if (item.atributos && Object.keys(item.atributos).length > 0) {
+        html += cardSection('attributes', `<div class="attributes-grid">
+            ${Object.entries(item.atributos).map(([key, values]) => `
+                <div class="attribute-item">
+                    <div class="attribute-key">${escapeHtml(key)}</div>
+                    <div class="attribute-values">${escapeHtml(values.join(', '))}</div>
+                </div>
+            `).join('')}
+        </div>`, language);
+    }
+    if (item.usada_en?.length) {
+        html += cardSection('usedIn', `<div class="tag-container">${tagList(item.usada_en)}</div>`, language);
+    }
+    return html;
+}
+
+function setupCardDetails() {
+    // Delegación: sirve para las tarjetas renderizadas y para las que llegan por la API
+    document.addEventListener('click', function(e) {
+        const button = e.target.closest('.details-btn');
+        if (!button) return;
+
+        const card = button.closest('.local-result');
+        const details = card.querySelector('.card-details');
+        const language = document.getElementById('languageSelector').value;
+
+        if (card.classList.contains('expanded')) {
+            card.classList.remove('expanded');
+            button.textContent = t('showDetails', language);
+            return;
+        }
+
+        const expand = () => {
+            card.classList.add('expanded');
+            button.disabled = false;
+            button.textContent = t('hideDetails', language);
+        };
+
+        if (details.dataset.loaded === language) {
+            expand();
+            return;
+        }
+
+        button.disabled = true;
+        button.textContent = `${t('loading', language)}...`;
+        // El navegador revalida con ETag: si la tarjeta no cambió recibe un 304
+        fetch(`/api/item/${encodeURIComponent(card.dataset.itemId)}?lang=${language}`)
+            .then(res => res.json())
+            .then(item => {
+                details.innerHTML = renderCardDetails(item, language);
+                details.dataset.loaded = language;
+                expand();
+            })
+            .catch(err => {
+                console.error('Error cargando el detalle:', err);
+                button.disabled = false;
+                button.textContent = t('showDetails', language);
+            });
+    });
+}
+
+function insertByRelevance(grid, card) {
+    // Los resultados llegan según se puntúan: mantener la rejilla ordenada
+    const relevance = Number(card.dataset.relevance);
+    const next = Array.from(grid.children).find(other => Number(other.dataset.relevance) < relevance);
+    grid.insertBefore(card, next || null);
+}
+
+function searchLocal(term, language, selections = []) {
+    const container = document.getElementById('local-results');
+    if (!container || !term) return;
+
+    // Una búsqueda nueva cancela el flujo de la anterior
+    if (localSearchController) {
+        localSearchController.abort();
+    }
+    localSearchController = new AbortController();
+
+    const params = new URLSearchParams({ q: term, lang: language, stream: '1' });
+    selections.forEach(([facet, value]) => params.append(facet, value));
+
+    container.innerHTML = `
+        <div class="section-header">
+            <h2>${t('localOntologyResults', language)}</h2>
+            <span class="results-count" id="local-count">0 ${t('resultsCount', language)}</span>
+        </div>
+        <div class="results-grid" id="local-results-grid"></div>
+    `;
+    const grid = document.getElementById('local-results-grid');
+    const countElement = document.getElementById('local-count');
+    let shown = 0;
+    let selectionsFromServer = {};
+
+    function handleMessage(message) {
+        if (message.type === 'result') {
+            insertByRelevance(grid, createLocalCard(message.item, language));
+            shown += 1;
+            countElement.textContent = `${shown} ${t('resultsCount', language)}`;
+        } else if (message.type === 'meta') {
+            selectionsFromServer = message.selections;
+        } else if (message.type === 'done') {
+            countElement.textContent = `${message.count} ${t('resultsCount', language)}`;
+            if (message.corrected_term) {
+                const notice = document.createElement('div');
+                notice.className = 'corrected-term';
+                notice.innerHTML = `🔤 ${t('showingResultsFor', language)} <strong>${escapeHtml(message.corrected_term)}</strong>`;
+                container.insertBefore(notice, grid);
+            }
+            const hasSelection = Object.values(selectionsFromServer || {}).some(values => values.length);
+            if (message.count > 0 || hasSelection) {
+                container.insertBefore(renderFacets(message.facets, selectionsFromServer, language), container.firstChild);
+                setupFacets();
+            }
+            if (message.count === 0) {
+                grid.outerHTML = `
+                    <div class="no-results">
+                        🔍 ${t('noLocalResults', language)}
+                        <strong>${window.APP_DATA?.languages?.[language]?.name || language}</strong>
+                        <br><small style="margin-top: 10px; display: block; opacity: 0.7;">
+                            ${t('tryChangingLanguage', language)}
+                        </small>
+                    </div>
+                `;
+            }
+        }
+    }
+
+    fetch(`/api/search?${params}`, { signal: localSearchController.signal })
+        .then(async res => {
+            // NDJSON: cada línea completa es un mensaje
+            const reader = res.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => handleMessage(JSON.parse(line)));
+            }
+            if (buffer.trim()) {
+                handleMessage(JSON.parse(buffer));
+            }
+        })
+        .catch(err => {
+            if (err.name !== 'AbortError') {
+                console.error('Error en la búsqueda local:', err);
+            }
+        });
+}
+
+// ==================== AUTOCOMPLETADO ====================
+const SUGGEST_DEBOUNCE_MS = 150;
+
+function setupAutocomplete() {
+    const searchInput = document.getElementById('searchInput');
+    const languageSelector = document.getElementById('languageSelector');
+    const datalist = document.getElementById('suggestionsList');
+    let debounceTimer = null;
+    let pendingRequest = null;
+
+    searchInput.addEventListener('input', function() {
+        clearTimeout(debounceTimer);
+        const query = searchInput.value.trim();
+
+        if (!query) {
+            datalist.innerHTML = '';
+            return;
+        }
+
+        debounceTimer = setTimeout(() => {
+            // Cancelar la petición anterior si aún no ha respondido
+            if (pendingRequest) {
+                pendingRequest.abort();
+            }
+            pendingRequest = new AbortController();
+
+            const params = new URLSearchParams({ q: query, lang: languageSelector.value });
+            fetch(`/api/suggest?${params}`, { signal: pendingRequest.signal })
+                .then(res => res.json())
+                .then(data => {
+                    datalist.innerHTML = '';
+                    (data.suggestions || []).forEach(suggestion => {
+                        const option = document.createElement('option');
+                        option.value = suggestion.nombre;
+                        datalist.appendChild(option);
+                    });
+                })
+                .catch(err => {
+                    if (err.name !== 'AbortError') {
+                        console.error('Error obteniendo sugerencias:', err);
+                    }
+                });
+        }, SUGGEST_DEBOUNCE_MS);
+    });
+}
+
 // ==================== INICIALIZACIÓN ====================
 document.addEventListener('DOMContentLoaded', function() {
     // Inicializar sistema de pestañas
@@ -679,6 +1113,15 @@ document.addEventListener('DOMContentLoaded', function() {
     // Setup validación de búsqueda
     setupSearchValidation();
 
+    // Sugerencias mientras se escribe
+    setupAutocomplete();
+
+    // Filtros por faceta
+    setupFacets();
+
+    // Detalle de cada tarjeta bajo demanda
+    setupCardDetails();
+
     // Obtener datos de la aplicación
     const term = window.APP_DATA?.searchTerm || '';
     const language = window.APP_DATA?.currentLanguage || 'es';
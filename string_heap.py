@@ -0,0 +1,198 @@
+"""
+Montón de cadenas en disco, abierto con memoria mapeada.
+
+Los literales largos (descripciones traducidas, abstracts de DBpedia)
+ocupan la mayor parte de la memoria de la ontología y casi ninguna
+petición los muestra. En lugar de guardarlos como cadenas de Python en
+cada proceso, se escriben una vez en un blob UTF-8 con un array de
+desplazamientos (la cadena i va de offsets[i] a offsets[i+1]) y se
+mapean en memoria: las páginas las comparte el sistema operativo entre
+trabajadores y solo se leen las de los textos que se usan.
+
+Se guarda también una copia en minúsculas para buscar un término con
+mmap.find sin decodificar el texto. En el almacén de tripletas el hueco
+del literal queda vacío y LongTexts crea al vuelo un HeapText (índice en
+el montón + idioma) cuando se lee; el texto se decodifica solo al pintar
+la tarjeta. No queda ningún objeto de Python por literal.
+"""
+from array import array
+import mmap
+import os
+
+import numpy as np
+from rdflib import Literal, URIRef
+
+HEAP_NAME = "text_heap"
+
+
+class HeapText:
+    """Manejador de un literal largo guardado en el montón"""
+
+    __slots__ = ("heap", "index", "language", "datatype")
+
+    def __init__(self, heap, index, language=None, datatype=None):
+        self.heap = heap
+        self.index = index
+        self.language = language
+        self.datatype = datatype
+
+    def __str__(self):
+        return self.heap.text(self.index)
+
+    def contains(self, token):
+        """token (en minúsculas) aparece en el texto en minúsculas"""
+        return self.heap.contains(self.index, token)
+
+    def __repr__(self):
+        return f"HeapText({self.index}, lang={self.language!r})"
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        # El mapeo sigue siendo válido aunque el fichero se sustituya después
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class StringHeap:
+    """Cadenas como desplazamientos + blob UTF-8 (y su copia en minúsculas)"""
+
+    def __init__(self, offsets, blob, lower_offsets, lower_blob):
+        self.offsets = offsets
+        self.blob = blob
+        self.lower_offsets = lower_offsets
+        self.lower_blob = lower_blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def text(self, i):
+        return self.blob[int(self.offsets[i]):int(self.offsets[i + 1])].decode("utf-8")
+
+    def contains(self, i, token):
+        start, end = int(self.lower_offsets[i]), int(self.lower_offsets[i + 1])
+        return self.lower_blob.find(token.encode("utf-8"), start, end) != -1
+
+    def nbytes(self):
+        return len(self.blob) + len(self.lower_blob) + self.offsets.nbytes + self.lower_offsets.nbytes
+
+    @staticmethod
+    def _paths(directory, name):
+        base = os.path.join(directory, name)
+        return {
+            "blob": base + ".blob",
+            "offsets": base + "_offsets.npy",
+            "lower_blob": base + "_lower.blob",
+            "lower_offsets": base + "_lower_offsets.npy",
+        }
+
+    @classmethod
+    def write(cls, texts, directory, name=HEAP_NAME):
+        """
+        Escribir texts() (función que devuelve un iterable nuevo en cada
+        llamada) cadena a cadena, sin juntar el blob en memoria, y abrirlo.
+        Cada fichero se sustituye de forma atómica: quien tenga mapeada la
+        versión anterior la sigue leyendo.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = cls._paths(directory, name)
+        for blob_key, offsets_key, transform in (("blob", "offsets", None),
+                                                 ("lower_blob", "lower_offsets", str.lower)):
+            offsets = array("q", [0])
+            tmp_blob = paths[blob_key] + ".tmp"
+            with open(tmp_blob, "wb") as f:
+                for text in texts():
+                    encoded = (transform(text) if transform else text).encode("utf-8")
+                    f.write(encoded)
+                    offsets.append(offsets[-1] + len(encoded))
+            tmp_offsets = paths[offsets_key] + ".tmp"
+            with open(tmp_offsets, "wb") as f:
+                np.save(f, np.frombuffer(offsets, dtype=np.int64))
+            os.replace(tmp_blob, paths[blob_key])
+            os.replace(tmp_offsets, paths[offsets_key])
+        return cls.open(directory, name)
+
+    @classmethod
+    def open(cls, directory, name=HEAP_NAME):
+        paths = cls._paths(directory, name)
+        return cls(np.load(paths["offsets"], mmap_mode="r"), _map(paths["blob"]),
+                   np.load(paths["lower_offsets"], mmap_mode="r"), _map(paths["lower_blob"]))
+
+
+class LongTexts:
+    """id de término -> HeapText, con arrays compactos (sin un objeto por literal)"""
+
+    def __init__(self, heap, slots, language_codes, languages, datatype_codes, datatypes):
+        self.heap = heap
+        self._slots = slots                    # id de término -> posición en el montón (-1 si no)
+        self._language_codes = language_codes  # posición -> índice en languages
+        self._languages = languages
+        self._datatype_codes = datatype_codes
+        self._datatypes = datatypes
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __call__(self, term_id):
+        slot = int(self._slots[term_id])
+        return HeapText(self.heap, slot, self._languages[self._language_codes[slot]],
+                        self._datatypes[self._datatype_codes[slot]])
+
+
+def _objects_only_of(triples, predicate_ids):
+    """Ids que solo aparecen como objeto de los predicados dados (nunca como sujeto ni con otros)"""
+    allowed = np.isin(triples[:, 1], predicate_ids)
+    candidates = np.setdiff1d(np.unique(triples[allowed, 2]), triples[~allowed, 2])
+    return np.setdiff1d(candidates, triples[:, 0])
+
+
+def externalize_long_literals(terms, triples, min_length, predicates, directory, name=HEAP_NAME,
+                              min_total_bytes=0):
+    """
+    Mover al montón mapeado los literales de 'terms' (lista de términos
+    rdflib; triples, array de ids) con al menos min_length caracteres que
+    solo son objeto de 'predicates'. Sus huecos en 'terms' quedan a None y
+    se resuelven con el LongTexts devuelto (None si no hay ninguno). El
+    resto del código (nombres, países...) sigue viendo Literal.
+
+    Si esos literales suman menos de min_total_bytes (UTF-8) no se mueve
+    nada: el montón tiene un coste fijo (arrays por término, mapeos) que
+    con pocos textos supera lo que ahorra.
+    """
+    predicate_ids = [i for i, term in enumerate(terms) if isinstance(term, URIRef) and term in predicates]
+    if not predicate_ids:
+        return None
+    candidates = _objects_only_of(triples, predicate_ids)
+    is_long = np.fromiter((isinstance(terms[i], Literal) and len(terms[i]) >= min_length for i in candidates),
+                          dtype=bool, count=len(candidates))
+    positions = candidates[is_long]
+    if len(positions) == 0:
+        return None
+    if min_total_bytes:
+        total_bytes = sum(len(str(terms[i]).encode("utf-8")) for i in positions)
+        if total_bytes < min_total_bytes:
+            print(f"  Textos largos en memoria: {len(positions)} ({total_bytes // 1024} KB, "
+                  f"menos que el mínimo del montón de {min_total_bytes // 1024} KB)")
+            return None
+
+    try:
+        heap = StringHeap.write(lambda: (terms[i] for i in positions), directory, name)
+    except OSError as e:
+        print(f"⚠ No se pudo guardar el montón de textos: {e}")
+        return None
+
+    languages, datatypes = [None], [None]
+    language_codes = np.zeros(len(positions), dtype=np.uint8)
+    datatype_codes = np.zeros(len(positions), dtype=np.uint8)
+    slots = np.full(len(terms), -1, dtype=np.int32)
+    for slot, i in enumerate(positions):
+        literal = terms[i]
+        for value, values, codes in ((literal.language, languages, language_codes),
+                                     (literal.datatype, datatypes, datatype_codes)):
+            if value not in values:
+                values.append(value)
+            codes[slot] = values.index(value)
+        slots[i] = slot
+        terms[i] = None
+    return LongTexts(heap, slots, language_codes, languages, datatype_codes, datatypes)
@@ -0,0 +1,138 @@
+"""
+Índice de autocompletado por prefijo sobre los nombres multiidioma
+de la ontología (rdfs:label / :nombre).
+
+Se construye una sola vez a partir del grafo y guarda, por idioma, un
+array ordenado de claves normalizadas. Cada consulta es un par de
+búsquedas binarias (bisect) sobre ese array, por lo que puede llamarse
+en cada pulsación de tecla.
+"""
+from array import array
+from bisect import bisect_left
+import heapq
+
+from rdflib import RDFS, Literal
+
+from text_utils import normalize_text
+
+# Propiedades objeto cuyo "fan-in" se usa como popularidad a priori
+POPULARITY_PROPERTIES = ('tieneIngrediente', 'usaHerramienta', 'requiereTecnica')
+
+# Prefijos cortos (1-2 caracteres) cuyo top se precalcula al construir
+PRECOMPUTED_PREFIX_LENGTH = 2
+PRECOMPUTED_TOP = 20
+
+
+class SuggestIndex:
+    """Índice de sugerencias por prefijo, particionado por idioma"""
+
+    def __init__(self):
+        self._keys = {}         # {lang: [clave_normalizada, ...]} ordenadas
+        self._refs = {}         # {lang: array('I')} clave -> posición en entries
+        self._entries = []      # [(nombre, nombre_local, popularidad, clave_completa)]
+        self._top_cache = {}    # {(lang, prefijo_corto): [posiciones]}
+
+    @classmethod
+    def from_graph(cls, graph, ns, languages):
+        """Construir el índice a partir del grafo cargado"""
+        index = cls()
+
+        # Popularidad: número de veces que cada recurso es usado por otro
+        popularity = {}
+        for prop_name in POPULARITY_PROPERTIES:
+            for obj in graph.objects(None, ns[prop_name]):
+                popularity[obj] = popularity.get(obj, 0) + 1
+
+        # Agrupar por (idioma, nombre normalizado) para no repetir sugerencias
+        merged = {}
+        for prop in (ns.nombre, RDFS.label):
+            for subj, literal in graph.subject_objects(prop):
+                if not isinstance(literal, Literal):
+                    continue
+                lang = getattr(literal, 'language', None)
+                if lang not in languages:
+                    continue
+                key = normalize_text(literal)
+                if not key:
+                    continue
+                score = popularity.get(subj, 0)
+                local_name = str(subj).split("#")[-1]
+                current = merged.get((lang, key))
+                if current is None:
+                    merged[(lang, key)] = [str(literal), local_name, score, score]
+                else:
+                    # Conservar el recurso más usado y sumar la popularidad total
+                    current[3] += score
+                    if score > current[2]:
+                        current[0], current[1], current[2] = str(literal), local_name, score
+
+        by_lang = {}
+        for (lang, key), (display, local_name, _, total) in merged.items():
+            position = len(index._entries)
+            index._entries.append((display, local_name, total, key))
+            # Indexar el nombre completo y cada inicio de palabra
+            pairs = by_lang.setdefault(lang, [])
+            start = 0
+            for word in key.split(' '):
+                pairs.append((key[start:], position))
+                start += len(word) + 1
+
+        for lang, pairs in by_lang.items():
+            pairs.sort()
+            index._keys[lang] = [key for key, _ in pairs]
+            index._refs[lang] = array('I', (position for _, position in pairs))
+            index._precompute_short_prefixes(lang)
+
+        return index
+
+    def _precompute_short_prefixes(self, lang):
+        """Guardar el top de los prefijos cortos, que abarcan rangos grandes"""
+        prefixes = set()
+        for key in self._keys[lang]:
+            for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+                prefixes.add(key[:length])
+        for prefix in prefixes:
+            self._top_cache[(lang, prefix)] = self._rank(lang, prefix, PRECOMPUTED_TOP)
+
+    def _rank(self, lang, prefix, limit):
+        keys = self._keys[lang]
+        refs = self._refs[lang]
+        lo = bisect_left(keys, prefix)
+        hi = bisect_left(keys, prefix + '\uffff', lo)
+
+        best = {}
+        for i in range(lo, hi):
+            position = refs[i]
+            display, _, score, full_key = self._entries[position]
+            # Coincidir con el inicio del nombre pesa más que con una palabra interior
+            rank = (full_key.startswith(prefix), score, -len(display))
+            if position not in best or rank > best[position]:
+                best[position] = rank
+
+        top = heapq.nlargest(limit, best.items(), key=lambda item: item[1])
+        return [position for position, _ in top]
+
+    def suggest(self, prefix, language, limit=8):
+        """Obtener sugerencias para un prefijo en un idioma"""
+        prefix = normalize_text(prefix)
+        if not prefix or language not in self._keys:
+            return []
+
+        if len(prefix) <= PRECOMPUTED_PREFIX_LENGTH and limit <= PRECOMPUTED_TOP:
+            positions = self._top_cache.get((language, prefix), [])[:limit]
+        else:
+            positions = self._rank(language, prefix, limit)
+
+        suggestions = []
+        for position in positions:
+            display, local_name, score, _ = self._entries[position]
+            suggestions.append({
+                "nombre": display,
+                "id": local_name,
+                "popularidad": score
+            })
+        return suggestions
+
+    def stats(self):
+        """Tamaño del índice por idioma"""
+        return {lang: len(keys) for lang, keys in self._keys.items()}
@@ -0,0 +1,120 @@
+"""
+Pruebas de dbpedia_text.py contra el sustituto local de DBpedia.
+
+dbpedia_standin.py se arranca como proceso en un puerto libre, con y sin
+índice de texto (--no-text-index), para comprobar la detección de
+bif:contains y la vuelta a CONTAINS sin tocar los endpoints públicos.
+
+    python -m pytest -q test_dbpedia_text.py
+"""
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import app
+from circuit_breaker import BreakerRegistry
+from dbpedia_text import (TextIndexCapabilities, bif_contains_expression, label_filter,
+                          probe_bif_contains, sparql_string)
+
+STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dbpedia_standin.py")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_standin(*flags):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, STANDIN, "--port", str(port), "--latency-ms", "0", "--tail", "0", *flags],
+        stdout=subprocess.PIPE, text=True)
+    # La primera línea se escribe cuando el servidor ya escucha
+    if "sparql" not in process.stdout.readline():
+        process.kill()
+        pytest.fail("dbpedia_standin.py no arrancó")
+    return process, f"http://127.0.0.1:{port}/sparql"
+
+
+@pytest.fixture(scope="module")
+def text_index_endpoint():
+    process, endpoint = _start_standin()
+    yield endpoint
+    process.terminate()
+    process.wait()
+
+
+@pytest.fixture(scope="module")
+def plain_endpoint():
+    process, endpoint = _start_standin("--no-text-index")
+    yield endpoint
+    process.terminate()
+    process.wait()
+
+
+# ----------------------------------------------------------------------
+# Expresiones
+# ----------------------------------------------------------------------
+def test_expression_requires_every_word_with_prefix():
+    assert bif_contains_expression(["tarta", "manzana"]) == '"tarta*" AND "manzana*"'
+    # Menos de 4 caracteres: sin comodín (Virtuoso lo rechazaría)
+    assert bif_contains_expression(["pie"]) == '"pie"'
+
+
+def test_expression_adds_unaccented_variant():
+    assert bif_contains_expression(["crème", "brûlée"]) == '("crème*" OR "creme*") AND ("brûlée*" OR "brulee*")'
+    assert bif_contains_expression(["Ñoño"]) == '("ñoño*" OR "nono*")'
+
+
+def test_expression_drops_quotes_and_operators():
+    expression = bif_contains_expression(['tarta"', "') . } DROP", 'a\\"b'])
+    assert expression == '"tarta*" AND "drop*" AND "a" AND "b"'
+    assert bif_contains_expression(['"', "'", "()"]) is None
+
+
+def test_sparql_string_escapes_special_characters():
+    assert sparql_string('di "hola"') == '"di \\"hola\\""'
+    assert sparql_string("a\\b\nc") == '"a\\\\b\\nc"'
+
+
+def test_label_filter_text_index_and_fallback():
+    assert label_filter(["tarta", "crème"], text_index=True) == \
+        '?label bif:contains "\\"tarta*\\" AND (\\"crème*\\" OR \\"creme*\\")" .'
+    # Sin índice: CONTAINS del primer token, con su variante sin acentos
+    assert label_filter(["crème", "tarta"]) == \
+        'FILTER((CONTAINS(LCASE(?label), LCASE("crème")) || CONTAINS(LCASE(?label), LCASE("creme"))))'
+    assert label_filter(['pa"n']) == 'FILTER(CONTAINS(LCASE(?label), LCASE("pa\\"n")))'
+    # Sin palabras para bif:contains se usa también CONTAINS
+    assert label_filter(['"'], text_index=True).startswith("FILTER(CONTAINS")
+
+
+# ----------------------------------------------------------------------
+# Endpoint
+# ----------------------------------------------------------------------
+def test_probe_detects_text_index(text_index_endpoint, plain_endpoint):
+    assert probe_bif_contains(text_index_endpoint) is True
+    assert probe_bif_contains(plain_endpoint) is False
+
+
+def test_probe_unreachable_endpoint_is_unknown():
+    assert probe_bif_contains(f"http://127.0.0.1:{_free_port()}/sparql", timeout=2) is None
+
+
+def test_search_falls_back_to_contains_in_same_request(plain_endpoint, monkeypatch):
+    # El endpoint se da por compatible (p. ej. comprobado antes de perder el
+    # índice): la consulta con bif:contains recibe un 400 y se repite con CONTAINS
+    capabilities = TextIndexCapabilities(probe=lambda endpoint: True)
+    breakers = BreakerRegistry()
+    monkeypatch.setattr(app, "dbpedia_text_index", capabilities)
+    monkeypatch.setattr(app, "dbpedia_breakers", breakers)
+    monkeypatch.setitem(app.DBPEDIA_ENDPOINTS, "es", plain_endpoint)
+
+    results = app._search_in_endpoint(["tarta"], "es", "es", limit=5, fetch_ingredients=False)
+
+    assert results
+    assert breakers.get(plain_endpoint).status()["failures"] == 0
+    assert capabilities.status() == {plain_endpoint: False}
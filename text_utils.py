@@ -0,0 +1,18 @@
+"""
+Utilidades de normalización de texto compartidas por los índices
+de búsqueda (autocompletado, coincidencia aproximada, etc.)
+"""
+import unicodedata
+
+
+def strip_accents(text):
+    """Eliminar acentos y diacríticos ('crème' → 'creme')"""
+    nfd = unicodedata.normalize('NFD', text)
+    return ''.join(char for char in nfd if unicodedata.category(char) != 'Mn')
+
+
+def normalize_text(text):
+    """Normalizar texto para comparar: minúsculas, sin acentos y sin espacios extra"""
+    if not text:
+        return ""
+    return ' '.join(strip_accents(str(text)).lower().split())
@@ -0,0 +1,217 @@
+"""
+Almacén de tripletas compacto y de solo lectura para la ruta de consulta.
+
+Cada URI y literal del grafo se interna una única vez con un id entero,
+y las tripletas se guardan como tres permutaciones ordenadas (SPO, POS,
+OSP) en arrays de NumPy. Cualquier patrón con el primer término (o los
+dos primeros) fijado se resuelve con búsquedas binarias (searchsorted)
+en lugar de pasar por la maquinaria genérica de patrones de rdflib.
+"""
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+from rdflib import RDF, RDFS, OWL
+
+# Orden de columnas (s=0, p=1, o=2) de cada permutación
+PERMUTATIONS = {
+    'spo': (0, 1, 2),
+    'pos': (1, 2, 0),
+    'osp': (2, 0, 1),
+}
+
+
+class CompactTripleStore:
+    """Tripletas como ids enteros en permutaciones SPO/POS/OSP ordenadas"""
+
+    def __init__(self, terms, triples, external=None):
+        self._terms = terms                                  # id -> término rdflib
+        # Términos guardados fuera (hueco None en terms): external(id) -> término
+        self._external = external
+        self._ids = {term: i for i, term in enumerate(terms) if term is not None}
+        self._indexes = {}
+        self._offsets = {}
+        for name, order in PERMUTATIONS.items():
+            columns = [triples[:, c] for c in order]
+            sort = np.lexsort((columns[2], columns[1], columns[0]))
+            self._indexes[name] = tuple(np.ascontiguousarray(col[sort]) for col in columns)
+            # Inicio de cada id en la primera columna: el primer nivel es O(1)
+            first = self._indexes[name][0]
+            self._offsets[name] = np.searchsorted(first, np.arange(len(terms) + 1)).astype(np.int64)
+        self._closure_cache = {}
+
+    @classmethod
+    def from_graph(cls, graph, externalize=None):
+        """
+        Internar todos los términos del grafo y construir las permutaciones.
+        externalize(terms, triples) puede sacar términos de la lista (dejando
+        None) y devolver la función que los resuelve por id (p. ej. textos
+        largos en string_heap).
+        """
+        terms = []
+        ids = {}
+        rows = []
+        for s, p, o in graph:
+            row = []
+            for term in (s, p, o):
+                term_id = ids.get(term)
+                if term_id is None:
+                    term_id = ids[term] = len(terms)
+                    terms.append(term)
+                row.append(term_id)
+            rows.append(row)
+        triples = np.array(rows, dtype=np.int32).reshape(-1, 3)
+        del ids
+        external = externalize(terms, triples) if externalize is not None else None
+        return cls(terms, triples, external)
+
+    def __len__(self):
+        return len(self._indexes['spo'][0])
+
+    # ------------------------------------------------------------------
+    # Acceso de bajo nivel
+    # ------------------------------------------------------------------
+    def id_of(self, term):
+        return self._ids.get(term)
+
+    def term(self, term_id):
+        term = self._terms[term_id]
+        return term if term is not None else self._external(term_id)
+
+    def _range(self, index_name, first, second=None):
+        """Posiciones [lo, hi) de la permutación con primer (y segundo) término fijado"""
+        offsets = self._offsets[index_name]
+        lo, hi = int(offsets[first]), int(offsets[first + 1])
+        if second is not None and hi > lo:
+            # El rango de un único término es pequeño: bisect directo sobre el array
+            col1 = self._indexes[index_name][1]
+            lo = bisect_left(col1, second, lo, hi)
+            hi = bisect_right(col1, second, lo, hi)
+        return lo, hi
+
+    def _ids_for(self, index_name, first, second=None, column=2):
+        lo, hi = self._range(index_name, first, second)
+        return self._indexes[index_name][column][lo:hi]
+
+    def _decode(self, ids):
+        terms = self._terms
+        if self._external is None:
+            return [terms[i] for i in ids.tolist()]
+        return [self.term(i) for i in ids.tolist()]
+
+    # ------------------------------------------------------------------
+    # Patrones de tripletas
+    # ------------------------------------------------------------------
+    def objects(self, subject, predicate):
+        """Objetos de (subject, predicate, ?)"""
+        s, p = self._ids.get(subject), self._ids.get(predicate)
+        if s is None or p is None:
+            return []
+        return self._decode(self._ids_for('spo', s, p))
+
+    def subjects(self, predicate, obj):
+        """Sujetos de (?, predicate, obj)"""
+        p, o = self._ids.get(predicate), self._ids.get(obj)
+        if p is None or o is None:
+            return []
+        return self._decode(self._ids_for('pos', p, o))
+
+    def predicate_objects(self, subject):
+        """Pares (predicado, objeto) de (subject, ?, ?)"""
+        s = self._ids.get(subject)
+        if s is None:
+            return []
+        lo, hi = self._range('spo', s)
+        _, predicates, objects = self._indexes['spo']
+        terms = self._terms
+        if self._external is None:
+            return [(terms[p], terms[o]) for p, o in zip(predicates[lo:hi].tolist(), objects[lo:hi].tolist())]
+        return [(terms[p], self.term(o)) for p, o in zip(predicates[lo:hi].tolist(), objects[lo:hi].tolist())]
+
+    def referencing_subjects(self, obj):
+        """Sujetos distintos que apuntan a obj con cualquier predicado (?, ?, obj)"""
+        o = self._ids.get(obj)
+        if o is None:
+            return []
+        lo, hi = self._range('osp', o)
+        return self._decode(np.unique(self._indexes['osp'][1][lo:hi]))
+
+    def subjects_with_predicate(self, predicate):
+        """Sujetos distintos que tienen al menos una tripleta con predicate"""
+        p = self._ids.get(predicate)
+        if p is None:
+            return []
+        lo, hi = self._range('pos', p)
+        return self._decode(np.unique(self._indexes['pos'][2][lo:hi]))
+
+    def subject_objects(self, predicate):
+        """Pares (sujeto, objeto) de (?, predicate, ?)"""
+        p = self._ids.get(predicate)
+        if p is None:
+            return []
+        lo, hi = self._range('pos', p)
+        _, objects, subjects = self._indexes['pos']
+        terms = self._terms
+        if self._external is None:
+            return [(terms[s], terms[o]) for s, o in zip(subjects[lo:hi].tolist(), objects[lo:hi].tolist())]
+        return [(terms[s], self.term(o)) for s, o in zip(subjects[lo:hi].tolist(), objects[lo:hi].tolist())]
+
+    # ------------------------------------------------------------------
+    # Jerarquía de clases
+    # ------------------------------------------------------------------
+    def _closure(self, start, index_name, predicate):
+        """Cierre transitivo siguiendo predicate (cacheado: el almacén es inmutable)"""
+        key = (start, index_name)
+        cached = self._closure_cache.get(key)
+        if cached is not None:
+            return cached
+
+        p = self._ids.get(predicate)
+        start_id = self._ids.get(start)
+        found = set()
+        if p is not None and start_id is not None:
+            pending = [start_id]
+            while pending:
+                current = pending.pop()
+                if index_name == 'spo':
+                    next_ids = self._ids_for('spo', current, p)     # current subClassOf ?
+                else:
+                    next_ids = self._ids_for('pos', p, current)     # ? subClassOf current
+                for next_id in next_ids.tolist():
+                    if next_id not in found:
+                        found.add(next_id)
+                        pending.append(next_id)
+
+        result = frozenset(self._terms[i] for i in found)
+        self._closure_cache[key] = result
+        return result
+
+    def subclasses(self, cls):
+        """Todas las subclases (transitivas) de cls"""
+        return self._closure(cls, 'pos', RDFS.subClassOf)
+
+    def superclasses(self, cls):
+        """Todas las superclases (transitivas) de cls"""
+        return self._closure(cls, 'spo', RDFS.subClassOf)
+
+    def instances_of_class(self, cls):
+        """Instancias de cls o de cualquiera de sus subclases (cacheado)"""
+        key = (cls, 'instances')
+        cached = self._closure_cache.get(key)
+        if cached is None:
+            instances = set()
+            for c in {cls} | self.subclasses(cls):
+                instances.update(self.subjects(RDF.type, c))
+            cached = self._closure_cache[key] = frozenset(instances)
+        return cached
+
+    def classes(self):
+        """Clases declaradas como owl:Class o rdfs:Class"""
+        return set(self.subjects(RDF.type, OWL.Class)) | set(self.subjects(RDF.type, RDFS.Class))
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def memory_bytes(self):
+        """Memoria de los arrays de permutaciones (sin contar la tabla de términos)"""
+        return (sum(col.nbytes for index in self._indexes.values() for col in index)
+                + sum(offsets.nbytes for offsets in self._offsets.values()))
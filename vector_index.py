@@ -0,0 +1,237 @@
+"""
+Índice vectorial local (sin red) para búsqueda por similitud.
+
+Cada instancia con nombre en un idioma se convierte en un documento con
+su nombre, su descripción y los nombres de sus ingredientes. Los textos
+se vectorizan con el "hashing trick" (palabras + trigramas de caracteres)
+ponderado con TF-IDF y normalizado, y se guardan como una matriz float32
+de NumPy en disco. La matriz se abre con memoria mapeada, de modo que
+varios procesos del servidor comparten las mismas páginas.
+"""
+import hashlib
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+from rdflib import RDFS, Literal
+
+from text_utils import normalize_text
+
+DEFAULT_INDEX_DIR = "indices"
+DEFAULT_DIMENSIONS = 1024
+NAME_WEIGHT = 2     # El nombre cuenta doble frente a descripción e ingredientes
+
+
+def _features(text):
+    """Palabras y trigramas de caracteres de un texto normalizado"""
+    features = []
+    for word in re.findall(r'\w+', normalize_text(text)):
+        if len(word) < 2:
+            continue
+        features.append(f"w:{word}")
+        padded = f"#{word}#"
+        features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return features
+
+
+def _hash_vector(texts, dimensions):
+    """Frecuencias con signo por cubeta (hashing trick con crc32, estable entre procesos)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for text, weight in texts:
+        for feature in _features(text):
+            h = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            vector[h % dimensions] += sign * weight
+    return vector
+
+
+def _file_signature(path):
+    """Huella del fichero de origen para saber si el índice está desactualizado"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _literal_in(graph, subject, prop, language):
+    """Primer literal de subject/prop en el idioma dado (o None)"""
+    for value in graph.objects(subject, prop):
+        if isinstance(value, Literal) and getattr(value, 'language', None) == language:
+            return str(value)
+    return None
+
+
+class VectorIndex:
+    """Matriz de embeddings (memoria mapeada) + metadatos de cada fila"""
+
+    def __init__(self, matrix, idf, ids, names, language_ranges, dimensions):
+        self.matrix = matrix                    # np.ndarray / np.memmap (n, dimensions) float32
+        self.idf = idf                          # (dimensions,) float32
+        self.ids = ids                          # nombre local de cada fila
+        self.names = names                      # nombre a mostrar de cada fila
+        self.language_ranges = language_ranges  # {lang: (inicio, fin)} filas contiguas
+        self.dimensions = dimensions
+        self._rows = {}
+        for lang, (start, end) in language_ranges.items():
+            for row in range(start, end):
+                self._rows[(ids[row], lang)] = row
+
+    # ------------------------------------------------------------------
+    # Construcción
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(cls, graph, ns, languages, dimensions=DEFAULT_DIMENSIONS):
+        """Vectorizar todas las instancias con nombre en cada idioma"""
+        ids, names, rows = [], [], []
+        language_ranges = {}
+
+        for lang in languages:
+            start = len(ids)
+            documents = {}
+            for prop in (ns.nombre, RDFS.label):
+                for subject, literal in graph.subject_objects(prop):
+                    if isinstance(literal, Literal) and getattr(literal, 'language', None) == lang:
+                        documents.setdefault(subject, str(literal))
+
+            # Los ingredientes traducidos guardan también su nombre inglés: un
+            # documento por nombre, prefiriendo el recurso propio del idioma
+            unique = {}
+            for subject in sorted(documents, key=lambda s: (not str(s).endswith(f"_{lang}"), str(s))):
+                unique.setdefault(normalize_text(documents[subject]), subject)
+
+            for subject in sorted(unique.values(), key=str):
+                name = documents[subject]
+                texts = [(name, NAME_WEIGHT)]
+                description = _literal_in(graph, subject, ns.descripcion, lang)
+                if description:
+                    texts.append((description, 1))
+                for ingredient in graph.objects(subject, ns.tieneIngrediente):
+                    ingredient_name = (_literal_in(graph, ingredient, ns.nombre, lang)
+                                       or _literal_in(graph, ingredient, ns.nombre, 'en'))
+                    if ingredient_name:
+                        texts.append((ingredient_name, 1))
+
+                ids.append(str(subject).split("#")[-1])
+                names.append(name)
+                rows.append(_hash_vector(texts, dimensions))
+            language_ranges[lang] = (start, len(ids))
+
+        matrix = np.vstack(rows) if rows else np.zeros((0, dimensions), dtype=np.float32)
+
+        # IDF por cubeta: las cubetas presentes en muchos documentos pesan menos
+        document_frequency = np.count_nonzero(matrix, axis=0).astype(np.float32)
+        idf = (np.log((1.0 + len(rows)) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+        matrix *= idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+
+        return cls(matrix.astype(np.float32), idf, ids, names, language_ranges, dimensions)
+
+    def save(self, index_dir, signature):
+        """Guardar la matriz y los metadatos de forma atómica"""
+        os.makedirs(index_dir, exist_ok=True)
+        matrix_path = os.path.join(index_dir, "vectors.npy")
+        idf_path = os.path.join(index_dir, "vectors_idf.npy")
+        meta_path = os.path.join(index_dir, "vectors_meta.json")
+
+        for path, array in ((matrix_path, self.matrix), (idf_path, self.idf)):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+            os.replace(tmp_path, path)
+
+        # Los metadatos se escriben al final: son los que marcan el índice como válido
+        meta = {
+            "signature": signature,
+            "dimensions": self.dimensions,
+            "ids": self.ids,
+            "names": self.names,
+            "language_ranges": self.language_ranges,
+        }
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    @classmethod
+    def load(cls, index_dir, signature=None):
+        """Abrir un índice guardado (memoria mapeada). None si no existe o está desactualizado"""
+        meta_path = os.path.join(index_dir, "vectors_meta.json")
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            if signature is not None and meta.get("signature") != signature:
+                return None
+            matrix = np.load(os.path.join(index_dir, "vectors.npy"), mmap_mode='r')
+            idf = np.load(os.path.join(index_dir, "vectors_idf.npy"))
+        except (OSError, ValueError):
+            return None
+
+        language_ranges = {lang: tuple(r) for lang, r in meta["language_ranges"].items()}
+        return cls(matrix, idf, meta["ids"], meta["names"], language_ranges, meta["dimensions"])
+
+    @classmethod
+    def load_or_build(cls, graph, ns, languages, source_path, index_dir=DEFAULT_INDEX_DIR, signature=None):
+        """
+        Reutilizar el índice en disco si corresponde al origen; si no, reconstruirlo.
+        signature identifica el contenido del origen (por defecto, hash del fichero).
+        """
+        if signature is None:
+            signature = _file_signature(source_path)
+        index = cls.load(index_dir, signature)
+        if index is not None:
+            print(f"✓ Índice vectorial cargado de {index_dir} ({len(index.ids)} documentos)")
+            return index
+
+        print("  Construyendo índice vectorial...")
+        built = cls.build(graph, ns, languages)
+        try:
+            built.save(index_dir, signature)
+        except OSError as e:
+            print(f"⚠ No se pudo guardar el índice vectorial: {e}")
+            return built
+        print(f"✓ Índice vectorial guardado en {index_dir} ({len(built.ids)} documentos)")
+        # Reabrir desde disco para compartir las páginas entre procesos
+        return cls.load(index_dir, signature) or built
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _top_k(self, vector, language, k, exclude_row=None):
+        start, end = self.language_ranges.get(language, (0, 0))
+        if end <= start:
+            return []
+
+        scores = np.asarray(self.matrix[start:end] @ vector)
+        if exclude_row is not None and start <= exclude_row < end:
+            scores[exclude_row - start] = -np.inf
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        return [{
+            "id": self.ids[start + i],
+            "nombre": self.names[start + i],
+            "score": round(float(scores[i]), 4)
+        } for i in top if np.isfinite(scores[i]) and scores[i] > 0]
+
+    def similar_to(self, local_name, language, k=5):
+        """Instancias más parecidas a una instancia dada ("más como esto")"""
+        row = self._rows.get((local_name, language))
+        if row is None:
+            return None
+        return self._top_k(np.asarray(self.matrix[row]), language, k, exclude_row=row)
+
+    def search(self, text, language, k=5):
+        """Búsqueda semántica por texto libre"""
+        vector = _hash_vector([(text, 1)], self.dimensions) * self.idf
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return []
+        return self._top_k(vector / norm, language, k)